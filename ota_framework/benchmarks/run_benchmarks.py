@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ota_framework.core.campaign import Campaign
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_setup import DeviceSetup
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.fake_device import FakeDeviceFarm, LatencyProfile
+from ota_framework.core.ota import OTA
+from ota_framework.core.ota_precon import Precon
+from ota_framework.core.shell import Shell, device_context
+
+# Initialize the logger for this module
+logger = CustomLogger('BenchmarkLogger')
+
+class Benchmark:
+    """
+    Time the framework flows against a simulated device farm.
+
+    Every device answers from a FakeDevice, so the measured time is the
+    simulated device latency (LatencyProfile scaled by `scale`) plus the
+    framework overhead: polling, fixed sleeps, logging and serialization
+    between devices. Comparing runs at the same scale shows regressions.
+    """
+    def __init__(self, device_count, scale=0.05, work_dir=None):
+        """
+        :param device_count: Number of simulated devices, all run in parallel.
+        :param scale: Multiplier applied to every simulated latency.
+        :param work_dir: Directory for logs and campaign results, defaults to a temporary one.
+        """
+        self.device_count = device_count
+        self.scale = scale
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='ota_benchmark_')
+        self.farm = FakeDeviceFarm.create(device_count, latency=LatencyProfile(scale=scale))
+        self.serials = list(self.farm.devices)
+
+    def on_devices(self, action):
+        """
+        Run action(serial) on every device at once, each inside its device_context.
+        :return: Wall clock seconds until the last device finished.
+        """
+        def run(serial):
+            with device_context(serial):
+                return action(serial)
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.device_count, thread_name_prefix='benchmark') as executor:
+            list(executor.map(run, self.serials))
+        return time.monotonic() - start
+
+    def logs_dir(self, serial):
+        return os.path.join(self.work_dir, 'logs', serial)
+
+    def setup(self, serial):
+        return DeviceSetup(Precon(logs_dir=self.logs_dir(serial)), logs_dir=self.logs_dir(serial))
+
+    def bench_perform_setup(self):
+        return self.on_devices(lambda serial: self.setup(serial).perform_setup())
+
+    def bench_start_ota_process(self):
+        def start(serial):
+            ota = OTA(delay=5, test_case_name='benchmark', log_folder=self.logs_dir(serial))
+            try:
+                ota.start_ota_process()
+            finally:
+                ota.stop_log_collection()
+
+        for device in self.farm.devices.values():
+            device.ota_synced = False
+            device.ota_state = 'IDLE'
+        elapsed = self.on_devices(start)
+        # Let the simulated installs started above run out before the next benchmark
+        self.on_devices(lambda serial: self.wait_idle(self.farm.devices[serial]))
+        return elapsed
+
+    def wait_idle(self, device):
+        while device.ota_state in ('DOWNLOADING', 'VERIFYING', 'INSTALLING') or not device.is_booted():
+            time.sleep(0.1)
+
+    def bench_post_ota_actions(self):
+        def post_ota(serial):
+            setup = self.setup(serial)
+            setup.initial_version = str(int(self.farm.devices[serial].software_version) - 1)
+            setup.post_ota_actions()
+
+        for device in self.farm.devices.values():
+            device.active_slot = '_b'
+        return self.on_devices(post_ota)
+
+    def bench_campaign(self):
+        # Start from a freshly flashed N-1 build on slot _a, as the campaign would after flashing
+        for device in self.farm.devices.values():
+            device.active_slot = '_a'
+        campaign = Campaign(self.serials, build_name='n_1_to_n', max_parallel=self.device_count,
+                            results_dir=os.path.join(self.work_dir, 'results'), flash=False)
+        start = time.monotonic()
+        results = campaign.run()
+        elapsed = time.monotonic() - start
+        failed = [result for result in results if not result['success']]
+        if failed:
+            logger.error(f"{len(failed)} simulated devices failed the campaign, first error: {failed[0]['error']}")
+        return elapsed
+
+    def run(self, names=None):
+        """
+        Run the selected benchmarks (all by default) with the simulator installed in Shell.
+        :return: A dictionary of benchmark name to wall clock seconds.
+        """
+        benchmarks = {
+            'perform_setup': self.bench_perform_setup,
+            'start_ota_process': self.bench_start_ota_process,
+            'post_ota_actions': self.bench_post_ota_actions,
+            'campaign': self.bench_campaign,
+        }
+        timings = {}
+        Shell.use_simulator(self.farm)
+        try:
+            for name in names or benchmarks:
+                for serial in self.serials:
+                    DeviceSnapshot.invalidate_device(serial)
+                logger.info(f"Running benchmark {name} on {self.device_count} simulated devices")
+                timings[name] = round(benchmarks[name](), 3)
+                logger.info(f"Benchmark {name} on {self.device_count} devices took {timings[name]} seconds")
+        finally:
+            Shell.use_simulator(None)
+        return timings
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the OTA framework against simulated devices.")
+    parser.add_argument('--devices', default='1,10,100', help="Comma separated device counts to benchmark.")
+    parser.add_argument('--scale', type=float, default=0.05, help="Multiplier applied to every simulated latency.")
+    parser.add_argument('--only', default=None,
+                        help="Comma separated subset of perform_setup, start_ota_process, post_ota_actions, campaign.")
+    parser.add_argument('--output', default=None, help="Write the timings as JSON to this file.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    names = [name.strip() for name in args.only.split(',')] if args.only else None
+    report = {'scale': args.scale, 'runs': {}}
+    for count in [int(count) for count in args.devices.split(',')]:
+        report['runs'][count] = Benchmark(count, scale=args.scale).run(names)
+
+    print(f"{'devices':>8} " + ' '.join(f"{name:>18}" for name in next(iter(report['runs'].values()))))
+    for count, timings in report['runs'].items():
+        print(f"{count:>8} " + ' '.join(f"{seconds:>18.3f}" for seconds in timings.values()))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
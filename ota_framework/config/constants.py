@@ -25,9 +25,13 @@ class RegistrationCommands:
 class SystemCommands:
     SHOW_OS_RELEASE = "adb shell vdcm get com.amazon.devconf/system/device-info/software-version"
     ENABLE_ALEXA = "adb shell vdcm set com.amazon.devconf/system/oobe/oobe-complete 'true'"
+    ALEXA_STATUS = "adb shell vdcm get com.amazon.devconf/system/oobe/oobe-complete"
     ADB_DEVICES = "adb devices"
     FLASH = "python3 flashimage.py"
     DEVICE_NAME = "adb shell ace hal device_info cli -l -n"
+    DEVICE_STATE = "adb get-state"
+    BOOT_COMPLETED = "adb shell systemctl is-system-running"
+    JOURNAL_FOLLOW = "adb shell journalctl -f -n 0"
 
 class DeviceCommands:
     FLAG_440 = "adb shell idme dev_flags 0x440"
@@ -35,17 +39,23 @@ class DeviceCommands:
     REBOOT = "adb shell reboot"
     FLAG_CHECK = "adb shell idme print | grep flags"
     BOOT_CONTROL = "adb shell boot_control_utility"
-    SCREENSHOT_COMMAND = 'adb shell screenshooter -r /tmp/filename.png'
-    PULL_SCREENSHOT = 'adb pull /tmp/filename.png'
+    # Streams the PNG from the screenshooter's stdout, nothing is stored on the device
+    SCREENSHOT_STREAM = 'adb exec-out screenshooter -r /dev/stdout'
 
 class AppCommands:
     PUSH_COMMAND = "adb push {local_path} {device_path}"
     INSTALL_COMMAND = "adb shell vpm install {device_path}"
     LIST_APPS_COMMAND = "adb shell vpm list apps"
+    CHECKSUM_COMMAND = "adb shell sha256sum {device_path}"
     LAUNCH_COMMAND_PATTERN = "adb shell vlcm launch-app orpheus://com.amazon.systemtest.{app_name}.main"
+    PACKAGE_ID_PATTERN = "com.amazon.systemtest.{app_name}.main"
+    # sha256 of the artifact each package was installed from, kept in the device KVS
+    GET_DIGEST_COMMAND = "adb shell ace hal kvs cli -g -k app_digest.{package_id}"
+    SET_DIGEST_COMMAND = "adb shell ace hal kvs cli -s -k app_digest.{package_id} -v {digest}"
 
 class OOBECommands:
     USER_SETUP_COMPLETE = "adb shell ace hal kvs cli -s -k user_setup_complete -v 1"
+    USER_SETUP_STATUS = "adb shell ace hal kvs cli -g -k user_setup_complete"
     DCS_CONFIG = "adb shell vdcm set com.amazon.devconf/system/oobe/oobe-complete 'true'"
     HOME_SCREEN = "adb shell vpm set default com.amazon.category.launcher com.amazon.homelauncher.main"
 
@@ -54,7 +64,7 @@ class OTACommands:
     FORCE_UPDATE_OTA = "adb shell ace mw ota forceUpdate"
     START_OTA = "adb shell ace mw ota start"
     SHOW_OTA_STATUS = "adb shell ace mw ota show_status"
-    OTA_LOG_COMMAND = "adb shell journalctl -f | grep ace_otad"
+    OTA_LOG_COMMAND = "adb shell journalctl -f -n 0 | grep --line-buffered ace_otad"
     
 class Profiles:
     TV = "callie"
@@ -0,0 +1,301 @@
+import os
+import select
+import socket
+import struct
+import time
+from ota_framework.core.context import timed_out_result
+from ota_framework.core.custom_logger import CustomLogger
+
+# Initialize the logger for this module
+logger = CustomLogger('AdbClientLogger')
+
+# Shell protocol v2 packet ids
+SHELL_STDIN = 0
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+
+SYNC_CHUNK_SIZE = 64 * 1024
+
+class AdbError(Exception):
+    """
+    Raised when the adb server answers FAIL or the connection breaks mid-request.
+    """
+
+
+class AdbClient:
+    """
+    Client for the adb host protocol spoken by the local adb server.
+
+    Every request opens one socket to the server, so no `adb` client process is
+    spawned per command. The server address follows the adb conventions:
+    ANDROID_ADB_SERVER_ADDRESS and ANDROID_ADB_SERVER_PORT (default 127.0.0.1:5037).
+    """
+    def __init__(self, host=None, port=None, timeout=30):
+        self.host = host or os.getenv('ANDROID_ADB_SERVER_ADDRESS', '127.0.0.1')
+        self.port = int(port or os.getenv('ANDROID_ADB_SERVER_PORT', 5037))
+        self.timeout = timeout
+
+    # ------------------------------------------------------------------ wire helpers
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise AdbError(f"Connection closed by adb server after {len(data)} of {size} bytes")
+            data.extend(chunk)
+        return bytes(data)
+
+    @staticmethod
+    def _read_until(sock, end):
+        """
+        Make the next reads on a socket raise TimeoutError once `end` passed.
+        :param end: time.monotonic() deadline, None for no limit.
+        """
+        if end is None:
+            sock.settimeout(None)
+            return
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("adb command deadline passed")
+        sock.settimeout(remaining)
+
+    @staticmethod
+    def _read_hex_block(sock):
+        length = int(AdbClient._recv_exact(sock, 4), 16)
+        return AdbClient._recv_exact(sock, length)
+
+    @staticmethod
+    def _send_request(sock, request):
+        """
+        Send one length-prefixed request and check the OKAY/FAIL status.
+        """
+        payload = request.encode()
+        sock.sendall(b'%04x' % len(payload) + payload)
+        status = AdbClient._recv_exact(sock, 4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise AdbError(AdbClient._read_hex_block(sock).decode(errors='replace'))
+        raise AdbError(f"Unexpected adb server status {status!r} for request {request!r}")
+
+    def _transport(self, serial):
+        """
+        Open a socket switched to the transport of the given device.
+        """
+        sock = self._connect()
+        try:
+            self._send_request(sock, f"host:transport:{serial}" if serial else "host:transport-any")
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    # ------------------------------------------------------------------ host services
+
+    def version(self):
+        """
+        :return: The adb server protocol version as an int.
+        """
+        with self._connect() as sock:
+            self._send_request(sock, "host:version")
+            return int(self._read_hex_block(sock), 16)
+
+    def devices(self):
+        """
+        :return: A list of (serial, state) tuples for every device the server knows.
+        """
+        with self._connect() as sock:
+            self._send_request(sock, "host:devices")
+            return self.parse_device_list(self._read_hex_block(sock).decode())
+
+    def track_devices(self, heartbeat=None):
+        """
+        Stream the device list from `host:track-devices`.
+        Yields a list of (serial, state) tuples each time the server reports a change.
+        Closing the generator closes the connection.
+        :param heartbeat: Optional seconds after which None is yielded when nothing changed,
+                          so a consumer thread can check whether it should stop.
+        """
+        sock = self._connect()
+        sock.settimeout(None)
+        try:
+            self._send_request(sock, "host:track-devices")
+            while True:
+                if heartbeat is not None and not select.select([sock], [], [], heartbeat)[0]:
+                    yield None
+                    continue
+                yield self.parse_device_list(self._read_hex_block(sock).decode())
+        finally:
+            sock.close()
+
+    @staticmethod
+    def parse_device_list(text):
+        devices = []
+        for line in text.splitlines():
+            fields = line.split()
+            if len(fields) >= 2:
+                devices.append((fields[0], fields[1]))
+        return devices
+
+    # ------------------------------------------------------------------ device services
+
+    def shell(self, serial, command, timeout=None, on_connect=None):
+        """
+        Run a command on the device using shell protocol v2, which keeps stdout,
+        stderr and the exit code separate.
+        :param serial: Device serial number, or None for the only attached device.
+        :param command: Command to run in the device shell.
+        :param timeout: Seconds the command may run, None for no limit. Only opening the
+                        connection is bound by the client timeout.
+        :param on_connect: Optional callable receiving the socket once the command was sent,
+                           so another thread can stop the command by shutting the socket down.
+        :return: A dictionary with 'success', 'output', and 'error' keys, plus 'timed_out' on timeout.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._transport(serial) as sock:
+            self._send_request(sock, f"shell,v2,raw:{command}")
+            if on_connect is not None:
+                on_connect(sock)
+            stdout, stderr = bytearray(), bytearray()
+            exit_code = None
+            try:
+                while exit_code is None:
+                    self._read_until(sock, end)
+                    header = sock.recv(5)
+                    if not header:
+                        break
+                    if len(header) < 5:
+                        header += self._recv_exact(sock, 5 - len(header))
+                    packet_id, length = struct.unpack('<BI', header)
+                    data = self._recv_exact(sock, length)
+                    if packet_id == SHELL_STDOUT:
+                        stdout.extend(data)
+                    elif packet_id == SHELL_STDERR:
+                        stderr.extend(data)
+                    elif packet_id == SHELL_EXIT:
+                        exit_code = data[0] if data else 0
+            except TimeoutError:
+                # Closing the connection stops the command on the device
+                return timed_out_result(timeout, stdout.decode(errors='replace'), stderr.decode(errors='replace'))
+            except (AdbError, OSError):
+                # The connection was shut down, e.g. by a cancellation
+                pass
+            if exit_code is None:
+                stderr.extend(b'adb shell connection closed before exit status')
+            return {
+                'success': exit_code == 0,
+                'output': stdout.decode(errors='replace'),
+                'error': stderr.decode(errors='replace')
+            }
+
+    def exec_out(self, serial, command, timeout=None):
+        """
+        Run a command with `exec:` and return its raw stdout bytes, as `adb exec-out` does.
+        :param timeout: Seconds the command may run, None for no limit.
+        :raises TimeoutError: If the command did not finish in time.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._transport(serial) as sock:
+            self._send_request(sock, f"exec:{command}")
+            chunks = []
+            while True:
+                self._read_until(sock, end)
+                chunk = sock.recv(SYNC_CHUNK_SIZE)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+
+    def _sync(self, serial):
+        sock = self._transport(serial)
+        try:
+            self._send_request(sock, "sync:")
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    @staticmethod
+    def _sync_request(sock, command, data=b''):
+        sock.sendall(command + struct.pack('<I', len(data)) + data)
+
+    @staticmethod
+    def _sync_response(sock):
+        header = AdbClient._recv_exact(sock, 8)
+        return header[:4], struct.unpack('<I', header[4:])[0]
+
+    def push(self, serial, local_path, remote_path, mode=0o644):
+        """
+        Push a local file to the device over the sync service.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        with self._sync(serial) as sock, open(local_path, 'rb') as file:
+            self._sync_request(sock, b'SEND', f"{remote_path},{0o100000 | mode}".encode())
+            size = 0
+            for chunk in iter(lambda: file.read(SYNC_CHUNK_SIZE), b''):
+                self._sync_request(sock, b'DATA', chunk)
+                size += len(chunk)
+            mtime = int(os.path.getmtime(local_path))
+            sock.sendall(b'DONE' + struct.pack('<I', mtime))
+            status, length = self._sync_response(sock)
+            if status == b'FAIL':
+                error = self._recv_exact(sock, length).decode(errors='replace')
+                return {'success': False, 'output': '', 'error': error}
+            self._sync_request(sock, b'QUIT')
+            return {'success': True, 'output': f"{local_path}: 1 file pushed. {size} bytes", 'error': ''}
+
+    def pull_bytes(self, serial, remote_path):
+        """
+        Read a file from the device over the sync service.
+        :return: The file content as bytes.
+        """
+        with self._sync(serial) as sock:
+            self._sync_request(sock, b'RECV', remote_path.encode())
+            chunks = []
+            while True:
+                status, length = self._sync_response(sock)
+                if status == b'DATA':
+                    chunks.append(self._recv_exact(sock, length))
+                elif status == b'DONE':
+                    break
+                elif status == b'FAIL':
+                    raise AdbError(self._recv_exact(sock, length).decode(errors='replace'))
+                else:
+                    raise AdbError(f"Unexpected sync response {status!r}")
+            self._sync_request(sock, b'QUIT')
+            return b''.join(chunks)
+
+    def pull(self, serial, remote_path, local_path):
+        """
+        Pull a file from the device to a local path.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        try:
+            content = self.pull_bytes(serial, remote_path)
+        except AdbError as e:
+            return {'success': False, 'output': '', 'error': str(e)}
+        with open(local_path, 'wb') as file:
+            file.write(content)
+        return {'success': True, 'output': f"{remote_path}: 1 file pulled. {len(content)} bytes", 'error': ''}
+
+    def wait_for_server(self, timeout=5):
+        """
+        Wait until the adb server accepts connections.
+        :return: True if the server answered within the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                self.version()
+                return True
+            except (OSError, AdbError):
+                time.sleep(0.1)
+        logger.error(f"adb server at {self.host}:{self.port} did not answer within {timeout} seconds")
+        return False
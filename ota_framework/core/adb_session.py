@@ -0,0 +1,208 @@
+import atexit
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from ota_framework.core import tracing
+from ota_framework.core.context import timed_out_result
+from ota_framework.core.custom_logger import CustomLogger
+
+# Initialize the logger for this module
+logger = CustomLogger('AdbSessionLogger')
+
+class AdbShellSession:
+    """
+    A long-lived `adb shell` process for a single device.
+
+    Commands are written to the shell's stdin one at a time and every command is
+    followed by a sentinel line carrying its exit code, so the output of each
+    command can be split back out of the shared stdout/stderr streams.
+    """
+    SENTINEL_PREFIX = '__OTA_SESSION_DONE__'
+
+    def __init__(self, serial=None, adb_path='adb'):
+        """
+        :param serial: Device serial number, or None to use the only attached device.
+        :param adb_path: Path to the adb binary.
+        """
+        self.serial = serial
+        self.adb_path = adb_path
+        self.process = None
+        self._stdout_lines = queue.Queue()
+        self._stderr_lines = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the underlying `adb shell` process and its reader threads.
+        """
+        argv = [self.adb_path]
+        if self.serial:
+            argv += ['-s', self.serial]
+        argv.append('shell')
+        # A new session so close() can stop adb together with anything it started
+        self.process = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        start_new_session=True)
+        for stream, lines in ((self.process.stdout, self._stdout_lines), (self.process.stderr, self._stderr_lines)):
+            reader = threading.Thread(target=self._read_lines, args=(stream, lines))
+            reader.daemon = True
+            reader.start()
+        logger.debug(f"Started adb shell session for device: {self.serial or 'default'}")
+
+    @staticmethod
+    def _read_lines(stream, lines):
+        for line in iter(stream.readline, b''):
+            lines.put(line)
+        # None marks the end of the stream
+        lines.put(None)
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def run(self, command, timeout=None):
+        """
+        Run a command in the session and wait for its sentinel.
+        :param command: Command to run in the device shell (without the `adb shell` prefix).
+        :param timeout: Seconds to wait for the command, None for no limit. On timeout the
+                        session is closed, which also stops the command on the device.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        with self._lock:
+            if not self.is_alive():
+                self.start()
+
+            # close() from another thread swaps these, keep using the ones of this process
+            process, stdout_lines, stderr_lines = self.process, self._stdout_lines, self._stderr_lines
+            marker = f"{self.SENTINEL_PREFIX}{uuid.uuid4().hex}"
+            # The command runs in a group with stdin detached so it cannot consume
+            # the session's input, then the sentinels are printed on a fresh line.
+            script = (
+                f"{{ {command}\n}} </dev/null; "
+                f"printf '\\n{marker} %d\\n' $?; "
+                f"printf '\\n{marker}\\n' >&2\n"
+            )
+            try:
+                process.stdin.write(script.encode())
+                process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.close()
+                return {'success': False, 'output': '', 'error': f"adb shell session closed: {e}"}
+
+            end = None if timeout is None else time.monotonic() + timeout
+            try:
+                output, exit_code = self._collect(stdout_lines, marker, end)
+                error, _ = self._collect(stderr_lines, marker, end)
+            except TimeoutError as e:
+                self.close()
+                return timed_out_result(timeout, e.args[0] if e.args else '')
+
+            tracing.annotate(exit_code=exit_code)
+            if exit_code is None:
+                self.close()
+                return {'success': False, 'output': output, 'error': error or 'adb shell session closed unexpectedly'}
+
+            return {
+                'success': exit_code == 0,
+                'output': output,
+                'error': error
+            }
+
+    @staticmethod
+    def _collect(lines, marker, end=None):
+        """
+        Read lines until the sentinel is seen.
+        :param end: time.monotonic() deadline, None to wait forever.
+        :return: The decoded text before the sentinel and the exit code (None if the stream ended first).
+        :raises TimeoutError: With the text read so far, if the deadline passes first.
+        """
+        chunks = []
+        while True:
+            try:
+                line = lines.get(timeout=None if end is None else max(end - time.monotonic(), 0))
+            except queue.Empty:
+                raise TimeoutError(b''.join(chunks).decode(errors='replace'))
+            if line is None:
+                lines.put(None)
+                return b''.join(chunks).decode(errors='replace'), None
+            if line.startswith(marker.encode()):
+                text = b''.join(chunks).decode(errors='replace')
+                # Drop the newline printed ahead of the sentinel
+                if text.endswith('\n'):
+                    text = text[:-1]
+                fields = line.split()
+                exit_code = int(fields[1]) if len(fields) > 1 else 0
+                return text, exit_code
+            chunks.append(line)
+
+    def close(self):
+        """
+        Terminate the session process. A command still waiting for its output, e.g. when
+        the session is closed by a cancellation, returns right away.
+        """
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                process.stdin.close()
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error closing adb shell session for {self.serial or 'default'}: {e}")
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        # End of stream for a waiting command, the next command starts a fresh process
+        self._stdout_lines.put(None)
+        self._stderr_lines.put(None)
+        self._stdout_lines = queue.Queue()
+        self._stderr_lines = queue.Queue()
+
+
+class AdbSessionPool:
+    """
+    Keeps one AdbShellSession per device serial.
+    """
+    def __init__(self, adb_path='adb'):
+        self.adb_path = adb_path
+        self.sessions = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close_all)
+
+    def get(self, serial=None):
+        """
+        Return the session for a serial, creating it on first use.
+        """
+        with self._lock:
+            session = self.sessions.get(serial)
+            if session is None:
+                session = AdbShellSession(serial=serial, adb_path=self.adb_path)
+                self.sessions[serial] = session
+            return session
+
+    def run(self, serial, command, timeout=None):
+        """
+        Run a device-side command on the session for the given serial.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        return self.get(serial).run(command, timeout=timeout)
+
+    def close(self, serial=None):
+        """
+        Close and forget the session for a serial, e.g. after the device reboots.
+        """
+        with self._lock:
+            session = self.sessions.pop(serial, None)
+        if session:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
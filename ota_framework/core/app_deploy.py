@@ -0,0 +1,148 @@
+import configparser
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ota_framework.config.constants import AppCommands
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.parsers import parse_kvs_value
+from ota_framework.core.shell import Shell, device_context, current_serial
+
+# Initialize the logger for this module
+logger = CustomLogger('AppDeployLogger')
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/config.ini')
+DEVICE_APP_DIR = '/data'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Local path -> (mtime_ns, size, sha256), so every artifact is hashed once per change
+_digests = {}
+_digests_lock = threading.Lock()
+
+def file_digest(path):
+    """
+    Return the sha256 of a local file, cached by path, modification time and size.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _digests_lock:
+        cached = _digests.get(path)
+    if cached and cached[:2] == key:
+        return cached[2]
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+    with _digests_lock:
+        _digests[path] = key + (digest,)
+    return digest
+
+def clear_digest_cache():
+    with _digests_lock:
+        _digests.clear()
+
+def parse_checksum(output):
+    """
+    :return: The digest from `sha256sum` output, or None.
+    """
+    fields = output.split()
+    return fields[0] if fields and len(fields[0]) == 64 else None
+
+class AppDeployer:
+    """
+    Deploys the apps from the [apps] section of config.ini to the current device.
+
+    The artifact already on the device is compared by sha256 with the local one.
+    Every install records the sha256 of its artifact in the device KVS under the
+    package id, so an app is skipped only when `vpm list apps` lists its package
+    and the recorded digest matches; when only the install is missing the push
+    is skipped. Several apps are deployed concurrently, so installs overlap with
+    the pushes of the next packages.
+    """
+    def __init__(self, apps=None, max_parallel=None, packages=None):
+        """
+        :param apps: Mapping of app name to local artifact path, defaults to the [apps] section of config.ini.
+        :param max_parallel: Maximum number of apps deployed at once, defaults to [app_deploy] max_parallel.
+        :param packages: Mapping of app name to package id, defaults to the [app_packages] section of config.ini.
+        """
+        config = configparser.ConfigParser()
+        config.read(CONFIG_PATH)
+        self.apps = dict(apps if apps is not None else config.items('apps') if config.has_section('apps') else {})
+        self.max_parallel = max_parallel or config.getint('app_deploy', 'max_parallel', fallback=3)
+        self.packages = dict(packages if packages is not None else
+                             config.items('app_packages') if config.has_section('app_packages') else {})
+
+    @staticmethod
+    def device_path(app_path):
+        return f"{DEVICE_APP_DIR}/{os.path.basename(app_path)}"
+
+    def package_id(self, app_name):
+        """
+        :return: The id vpm lists for the installed app.
+        """
+        return self.packages.get(app_name) or AppCommands.PACKAGE_ID_PATTERN.format(app_name=app_name)
+
+    def deploy(self, app_name, app_path=None):
+        """
+        Push and install one app unless the device already has it.
+        :param app_name: The name of the app as specified in the [apps] section.
+        :param app_path: Local artifact path, defaults to the configured one.
+        :return: A dictionary with 'success', 'output', 'error', 'pushed' and 'installed' keys.
+        """
+        app_path = app_path or self.apps.get(app_name)
+        if not app_path or not os.path.exists(app_path):
+            error = f"App path for {app_name} is invalid or does not exist."
+            logger.error(error)
+            return {'success': False, 'output': '', 'error': error, 'pushed': False, 'installed': False}
+
+        device_path = AppDeployer.device_path(app_path)
+        package_id = self.package_id(app_name)
+        digest = file_digest(app_path)
+        checksum, installed_apps, recorded = Shell.execute_batch([
+            AppCommands.CHECKSUM_COMMAND.format(device_path=device_path),
+            AppCommands.LIST_APPS_COMMAND,
+            AppCommands.GET_DIGEST_COMMAND.format(package_id=package_id)
+        ], stop_on_error=False)
+        on_device = parse_checksum(checksum['output']) == digest
+        up_to_date = (package_id in installed_apps['output'].split()
+                      and recorded['success'] and parse_kvs_value(recorded['output']) == digest)
+        if up_to_date:
+            logger.info(f"App {app_name} is already installed from an identical package, skipping.")
+            return {'success': True, 'output': f"{app_name} unchanged", 'error': '', 'pushed': False, 'installed': False}
+
+        if on_device:
+            logger.info(f"Package of {app_name} already on the device, skipping the push.")
+        else:
+            result = Shell.execute_command(AppCommands.PUSH_COMMAND.format(local_path=app_path, device_path=device_path))
+            if not result['success']:
+                logger.error(f"Failed to push {app_name} to device: {result['error']}")
+                return dict(result, pushed=False, installed=False)
+
+        result = Shell.execute_command(AppCommands.INSTALL_COMMAND.format(device_path=device_path))
+        if result['success']:
+            logger.info(f"App {app_name} installed successfully.")
+            record = Shell.execute_command(AppCommands.SET_DIGEST_COMMAND.format(package_id=package_id, digest=digest))
+            if not record['success']:
+                logger.warning(f"Could not record the installed digest of {package_id}: {record['error']}")
+        else:
+            logger.error(f"Failed to install {app_name} on device: {result['error']}")
+        return dict(result, pushed=not on_device, installed=result['success'])
+
+    def deploy_all(self, names=None):
+        """
+        Deploy the given apps (all configured apps by default) concurrently.
+        :return: A dictionary of app name to its deploy result.
+        """
+        names = list(names or self.apps)
+        serial = current_serial()
+
+        def deploy(name):
+            with device_context(serial):
+                return self.deploy(name)
+
+        if len(names) <= 1:
+            return {name: deploy(name) for name in names}
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='app_deploy') as executor:
+            return dict(zip(names, executor.map(deploy, names)))
@@ -0,0 +1,387 @@
+import asyncio
+import configparser
+import os
+from ota_framework.config.constants import (WiFiCommands, RegistrationCommands, SystemCommands, DeviceCommands,
+                                            OOBECommands, OTACommands, Profiles)
+from ota_framework.core.app_deploy import AppDeployer
+from ota_framework.core.async_shell import AsyncShell
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_monitor import DeviceMonitor, parse_devices_output, is_listed_online
+from ota_framework.core.parsers import (parse_software_version, parse_product_name, parse_dev_flags_value,
+                                         parse_boot_slots, parse_net_state, parse_registration, parse_scan_results,
+                                         is_devconf_set, OOBE_COMPLETE_KEY)
+from ota_framework.core.ota_journal import OTAJournalMonitor, OTAJournalParser, OTAPhase
+from ota_framework.core.retry import RetryPolicy
+from ota_framework.core.screenshots import ScreenshotCapture
+from ota_framework.core.shell import device_context, current_serial
+from ota_framework.core import waits
+
+# Initialize the logger for this module
+logger = CustomLogger('AsyncActionsLogger')
+
+async def run_on_devices(serials, action, max_parallel=None):
+    """
+    Run a coroutine function once per device on the current event loop.
+    Each call runs inside a device_context, so every command it issues targets that device.
+    :param serials: List of device serial numbers.
+    :param action: Coroutine function called with the serial.
+    :param max_parallel: Maximum number of devices worked on at once, unlimited if None.
+    :return: A list of results (or exceptions) in the order of `serials`.
+    """
+    semaphore = asyncio.Semaphore(max_parallel or len(serials) or 1)
+
+    async def run(serial):
+        async with semaphore:
+            with device_context(serial):
+                return await action(serial)
+
+    return await asyncio.gather(*(run(serial) for serial in serials), return_exceptions=True)
+
+
+class AsyncWiFi:
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def connect(ssid, password):
+        """
+        Connect to the WiFi network using the provided SSID and password.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        commands = [
+            (WiFiCommands.SCAN, "Scanning for WiFi networks"),
+            (WiFiCommands.GET_SCAN_RESULTS, "Getting scan results"),
+            (WiFiCommands.ADD_NETWORK.format(ssid=ssid, password=password), "Adding WiFi network"),
+            (WiFiCommands.GET_CONFIG, "Getting WiFi configuration"),
+            (WiFiCommands.CONNECT_WIFI.format(ssid=ssid), "Connecting to WiFi"),
+            (WiFiCommands.SAVE_CONFIG, "Saving WiFi configuration")
+        ]
+        for command, description in commands:
+            logger.info(description)
+            result = await AsyncShell.execute_command(command)
+            if not result['success']:
+                logger.error(f"Failed at step: {description}")
+                return result
+            # The network is only added when the scan sees it
+            if command == WiFiCommands.GET_SCAN_RESULTS and \
+                    ssid not in [network.ssid for network in parse_scan_results(result['output'])]:
+                result = dict(result, success=False, error=f"WiFi SSID {ssid} not found in the scan results")
+                logger.error(result['error'])
+                return result
+        return await AsyncWiFi.validate_connection(ssid)
+
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def validate_connection(ssid, retries=None, delay=None):
+        """
+        Validate if the device is connected to the WiFi network.
+        Retries follow the 'wifi_validation' policy from config.ini.
+        :param retries: Optional override of the maximum number of attempts
+        :param delay: Optional override of the initial delay between attempts
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        async def validate():
+            result = await AsyncShell.execute_command(WiFiCommands.VALIDATE)
+            result['success'] = parse_net_state(result['output']) == 'CONNECTED'
+            return result
+
+        policy = RetryPolicy.for_device('wifi_validation', max_attempts=retries, initial_delay=delay)
+        result = await policy.async_run(validate, description=f"Validating connection to WiFi SSID: {ssid}")
+        if result['success']:
+            logger.info(f"Successfully connected to WiFi SSID: {ssid} on attempt {result['attempts']}")
+            return result
+        result['error'] = f"Failed to validate connection to WiFi SSID: {ssid} after {result['attempts']} attempts. Output: {result['output']}"
+        logger.error(result['error'])
+        return result
+
+
+class AsyncRegistration:
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def register_device(username, password):
+        """
+        Register the device using the provided username and password.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        command = RegistrationCommands.REGISTER_DEVICE.format(username=username, password=password)
+        logger.info(f"Registering device for user: {username}")
+        result = await AsyncShell.execute_command(command)
+        if result['success']:
+            logger.info("Device registration successful.")
+        else:
+            logger.error("Failed to register device.")
+        return result
+
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def validate_registration(username, retries=None, delay=None):
+        """
+        Validate if the device registration was successful.
+        Retries follow the 'registration_validation' policy from config.ini.
+        :param retries: Optional override of the maximum number of attempts
+        :param delay: Optional override of the initial delay between attempts
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        async def validate():
+            result = await AsyncShell.execute_command(RegistrationCommands.VALIDATE_REGISTRATION)
+            result['success'] = parse_registration(result['output']) == 'DEVICE_REGISTERED'
+            return result
+
+        policy = RetryPolicy.for_device('registration_validation', max_attempts=retries, initial_delay=delay)
+        result = await policy.async_run(validate, description=f"Validating device registration for user: {username}")
+        if result['success']:
+            logger.info(f"Device registration validated successfully for user: {username} on attempt {result['attempts']}")
+            return result
+        result['error'] = f"Failed to validate device registration for user: {username} after {result['attempts']} attempts. Output: {result['output']}"
+        logger.error(result['error'])
+        return result
+
+
+class AsyncFlags:
+    @staticmethod
+    async def _set_flag(command, expected):
+        result = await AsyncShell.execute_command(command)
+        if not result['success']:
+            return result
+        reboot_result = await AsyncShell.execute_command(DeviceCommands.REBOOT)
+        if not reboot_result['success']:
+            return reboot_result
+        boot_result = await waits.async_wait_for_reboot()
+        if not boot_result['success']:
+            return boot_result
+        return await AsyncFlags._validate_flag(expected)
+
+    @staticmethod
+    async def _validate_flag(expected):
+        validation_result = await AsyncShell.execute_command(DeviceCommands.FLAG_CHECK)
+        if parse_dev_flags_value(validation_result['output']) == int(expected, 16):
+            validation_result['success'] = True
+        else:
+            validation_result['success'] = False
+            validation_result['error'] = f'Expected dev_flags: {expected}, but got: {validation_result["output"]}'
+        return validation_result
+
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def set_flag_0():
+        """
+        Set the device flag to 0, reboot, and validate.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        return await AsyncFlags._set_flag(DeviceCommands.FLAG_0, '0')
+
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def set_flag_440():
+        """
+        Set the device flag to 0x440, reboot, and validate.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        return await AsyncFlags._set_flag(DeviceCommands.FLAG_440, '0x440')
+
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def validate_flag_0():
+        return await AsyncFlags._validate_flag('0')
+
+    @staticmethod
+    @logger.log_decorator(level='info')
+    async def validate_flag_440():
+        return await AsyncFlags._validate_flag('0x440')
+
+
+class AsyncOTA:
+    def __init__(self, delay=5, test_case_name='default', log_folder='logs'):
+        self.delay = delay
+        self.test_case_name = test_case_name
+        self.log_folder = log_folder
+        self.log_file = os.path.join(self.log_folder, f'{test_case_name}_ota_logs.txt')
+        self.journal = OTAJournalParser()
+        self.journal_monitor = None
+        os.makedirs(self.log_folder, exist_ok=True)
+
+    async def start_log_collection(self):
+        """
+        Follow the OTA journal through Shell.start_process, writing it to the log file and feeding self.journal.
+        """
+        self.journal_monitor = OTAJournalMonitor(OTACommands.OTA_LOG_COMMAND, self.log_file, self.journal)
+        return await asyncio.to_thread(self.journal_monitor.start)
+
+    async def stop_log_collection(self):
+        """
+        Stop the journal command together with its whole pipeline.
+        """
+        if self.journal_monitor:
+            await asyncio.to_thread(self.journal_monitor.stop)
+
+    @logger.log_decorator(level='info')
+    async def start_ota_process(self):
+        """
+        Start the OTA process by executing defined commands with a delay.
+        :return: A list of result dictionaries.
+        """
+        await self.start_log_collection()
+        results = []
+        for command in (OTACommands.FORCE_SYNC_OTA, OTACommands.FORCE_UPDATE_OTA,
+                        OTACommands.START_OTA, OTACommands.SHOW_OTA_STATUS):
+            logger.info(f"Executing OTA command: {command}")
+            result = await AsyncShell.execute_command(command)
+            results.append(result)
+            if not result['success']:
+                logger.error(f"Failed to execute OTA command: {command}")
+                break
+            await asyncio.sleep(self.delay)
+        return results
+
+    async def wait_for_installation(self, timeout=15 * 60):
+        """
+        Wait until the journal shows the OTA installed, returning early if it fails.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        try:
+            phase = await asyncio.wait_for(asyncio.wrap_future(self.journal.phase_future(OTAPhase.REBOOT_PENDING)), timeout)
+            return {'success': True, 'output': phase, 'error': ''}
+        except asyncio.TimeoutError:
+            error = f"OTA did not finish installing within {timeout} seconds, last phase: {self.journal.phase}"
+        except Exception as e:
+            error = str(e)
+        logger.error(error)
+        return {'success': False, 'output': self.journal.phase, 'error': error}
+
+
+class AsyncDeviceActions:
+    def __init__(self, logs_dir):
+        self.config = configparser.ConfigParser()
+        self.config.read(os.path.join(os.path.dirname(__file__), '../config/config.ini'))
+        self.logs_dir = logs_dir
+        os.makedirs(self.logs_dir, exist_ok=True)
+
+    @logger.log_decorator(level='info')
+    async def reboot_device(self):
+        return await AsyncShell.execute_command(DeviceCommands.REBOOT)
+
+    @logger.log_decorator(level='info')
+    async def take_screenshot(self, filename=None, step='screenshot'):
+        """
+        Take a screenshot on the device and stream it to the logs folder.
+        :return: Path to the saved screenshot file.
+        """
+        result = await asyncio.to_thread(ScreenshotCapture(self.logs_dir).capture, step, filename)
+        if not result['success']:
+            raise Exception(result['error'])
+        return result['output']
+
+    @logger.log_decorator(level='info')
+    async def check_device_online(self):
+        """
+        Coroutine counterpart of DeviceActions.check_device_online, retried by the 'device_online' policy.
+        :return: True if the device is online, False otherwise.
+        """
+        serial = current_serial()
+        policy = RetryPolicy.for_device('device_online')
+        monitor = await asyncio.to_thread(DeviceMonitor.shared)
+        if monitor.connected:
+            if await monitor.async_wait_for_state(serial, timeout=policy.deadline):
+                logger.info(f"Device found: {serial or 'default device'}")
+                return True
+            if monitor.connected:
+                logger.warning(f"Device not online, adb reports state: {monitor.state(serial) or 'absent'}")
+                return False
+
+        async def check():
+            result = await AsyncShell.execute_command(SystemCommands.ADB_DEVICES)
+            if not result['success']:
+                logger.error(f"Error checking device status: {result['error']}")
+                return result
+            if is_listed_online(parse_devices_output(result['output']), serial):
+                logger.info(f"Device found: {serial or 'default device'}")
+                return result
+            return dict(result, success=False)
+
+        try:
+            result = await policy.async_run(check, description="Checking device is online")
+            if result['success']:
+                return True
+        except Exception as e:
+            logger.error(f"Error checking device status: {e}")
+        logger.warning("Device could not be detected after retries.")
+        return False
+
+    @logger.log_decorator(level='info')
+    async def get_software_version(self):
+        """
+        :return: Software version string.
+        """
+        result = await AsyncShell.execute_command(SystemCommands.SHOW_OS_RELEASE)
+        if not result['success']:
+            raise Exception(f"Command execution failed: {result['error']}")
+        version = parse_software_version(result['output'])
+        if version is None:
+            raise Exception("Software version not found in the output.")
+        return version
+
+    @logger.log_decorator(level='info')
+    async def enable_alexa(self):
+        result = await AsyncShell.execute_command(SystemCommands.ENABLE_ALEXA)
+        if not result['success']:
+            raise Exception(f"Command execution failed: {result['error']}")
+        if not is_devconf_set(result['output'], OOBE_COMPLETE_KEY, 'true'):
+            raise Exception("Failed to enable Alexa.")
+        return True
+
+    @logger.log_decorator(level='info')
+    async def skip_oobe(self):
+        for command in (OOBECommands.USER_SETUP_COMPLETE, OOBECommands.DCS_CONFIG, OOBECommands.HOME_SCREEN):
+            result = await AsyncShell.execute_command(command)
+            if not result['success']:
+                raise Exception(f"Command '{command}' failed with error: {result['error']}")
+        return True
+
+    @logger.log_decorator(level='info')
+    async def get_device_name(self):
+        result = await AsyncShell.execute_command(SystemCommands.DEVICE_NAME)
+        if not result['success']:
+            raise Exception(f"Command execution failed: {result['error']}")
+        product_name = parse_product_name(result['output'])
+        if product_name is None:
+            raise Exception("Product name not found in command output.")
+        return product_name
+
+    @logger.log_decorator(level='info')
+    async def get_device_profile(self):
+        device_name = await self.get_device_name()
+        if device_name == Profiles.TV:
+            return Profiles.TV
+        if device_name in Profiles.MULTIMODAL:
+            return Profiles.MULTIMODAL
+        raise Exception("Unknown device profile.")
+
+    @logger.log_decorator(level='info')
+    async def check_and_complete_oobe_based_on_profile(self):
+        try:
+            profile = await self.get_device_profile()
+            if profile == Profiles.TV:
+                return True
+            await self.skip_oobe()
+            await self.reboot_device()
+            return (await waits.async_wait_for_reboot())['success']
+        except Exception as e:
+            logger.error(f"Error checking and completing OOBE based on profile: {e}")
+            return False
+
+    @logger.log_decorator(level='info')
+    async def verify_and_get_boot_utility_slots(self):
+        result = await AsyncShell.execute_command(DeviceCommands.BOOT_CONTROL)
+        slots = parse_boot_slots(result['output'])
+        status_a = slots['_a'].active if '_a' in slots else None
+        status_b = slots['_b'].active if '_b' in slots else None
+        assert status_a == "No", f"Expected 'No' for slot '_a', but got '{status_a}'"
+        assert status_b == "Yes", f"Expected 'Yes' for slot '_b', but got '{status_b}'"
+        return status_a, status_b
+
+    @logger.log_decorator(level='info')
+    async def push_and_install_app(self, app_name):
+        """
+        Push and install an app on the device unless the identical package is already installed.
+        :param app_name: The name of the app as specified in the config.ini file.
+        :return: The deploy result dictionary.
+        """
+        return await asyncio.to_thread(AppDeployer().deploy, app_name)
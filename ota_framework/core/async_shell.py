@@ -0,0 +1,70 @@
+import asyncio
+import os
+import shlex
+import signal
+from ota_framework.core.context import effective_timeout, is_cancelled, timed_out_result, cancelled_result
+from ota_framework.core.shell import Shell, current_serial, with_serial
+
+# Characters that need /bin/sh to interpret the command line
+SHELL_METACHARACTERS = set('|&;<>()$`*?[]{}~\'"\\')
+
+class AsyncShell:
+    @staticmethod
+    async def execute_command(command, timeout=None):
+        """
+        Execute a shell command without blocking the event loop.
+        Plain commands are started with create_subprocess_exec, commands using shell
+        syntax (pipes, quotes) go through /bin/sh. The pooled 'session' and 'native'
+        Shell backends run in a worker thread.
+        :param command: Command to be executed.
+        :param timeout: Seconds the command may run, defaults to Shell.command_timeout, 0 for no limit.
+        :return: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        if Shell.backend != 'subprocess':
+            return await asyncio.to_thread(Shell.execute_command, command, timeout=timeout)
+
+        command = with_serial(command, current_serial())
+        serial = Shell.command_serial(command)
+        if is_cancelled(serial):
+            return cancelled_result(serial)
+        timeout = effective_timeout((timeout if timeout is not None else Shell.command_timeout) or None)
+        process = None
+        try:
+            # Own process group so a timeout or cancellation stops the whole pipeline
+            if SHELL_METACHARACTERS.intersection(command):
+                process = await asyncio.create_subprocess_shell(
+                    command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True)
+            else:
+                argv = shlex.split(command)
+                process = await asyncio.create_subprocess_exec(
+                    *argv, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True)
+            try:
+                output, error = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                AsyncShell.kill_process_group(process)
+                await process.wait()
+                return timed_out_result(timeout)
+            return {
+                'success': process.returncode == 0,
+                'output': output.decode(),
+                'error': error.decode()
+            }
+        except asyncio.CancelledError:
+            if process is not None and process.returncode is None:
+                AsyncShell.kill_process_group(process)
+                # Reap it before the loop goes away, the killed group exits at once
+                await process.wait()
+            raise
+        except Exception as e:
+            return {
+                'success': False,
+                'output': '',
+                'error': str(e)
+            }
+
+    @staticmethod
+    def kill_process_group(process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
@@ -0,0 +1,255 @@
+import argparse
+import configparser
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ota_framework.core import tracing
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_monitor import DeviceMonitor
+from ota_framework.core.device_setup import DeviceSetup
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.flash_sequence import DeviceFlasher
+from ota_framework.core.ota import OTA
+from ota_framework.core.ota_precon import Precon
+from ota_framework.core.results_store import ResultsStore, default_path
+from ota_framework.core.screenshots import ScreenshotCapture
+from ota_framework.core.context import deadline, remaining_time, clear_cancellation, is_cancelled
+from ota_framework.core.shell import Shell, device_context
+from ota_framework.core import waits
+
+# Initialize the logger for this module
+logger = CustomLogger('CampaignLogger')
+
+class Campaign:
+    """
+    Run the flash -> setup -> OTA -> post-OTA flow on several devices concurrently.
+
+    Each device runs in its own worker inside a device_context, so every adb
+    command issued by the action classes is sent to that device. Logs,
+    screenshots (periodic OTA captures in screenshots/), the device.log of
+    everything logged for the device, the per-device result.json and trace.json
+    go to <results_dir>/<campaign_id>/<serial>/. The campaign folder gets summary.json
+    plus trace.jsonl and trace.json with the timing spans of every device, and
+    the run is added to the history database (see results_store).
+    """
+    CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/config.ini')
+
+    # Deadline in seconds of every phase, the wait phases are bounded by flash_wait and ota_wait instead
+    PHASE_TIMEOUTS = {
+        'flash': 45 * 60,
+        'perform_setup': 15 * 60,
+        'start_ota_process': 10 * 60,
+        'wait_for_reboot': 10 * 60,
+        'post_ota_actions': 30 * 60,
+    }
+
+    def __init__(self, serials, build_name, max_parallel=None, results_dir=None, flash=True,
+                 flash_wait=600, ota_wait=15 * 60, campaign_id=None, phase_timeouts=None, screenshot_interval=None,
+                 results_store=None):
+        """
+        :param serials: List of device serial numbers.
+        :param build_name: Build key from the [builds] section of config.ini.
+        :param max_parallel: Maximum number of devices worked on at once.
+        :param results_dir: Root directory for campaign results.
+        :param flash: Flag to indicate if devices are flashed before setup.
+        :param flash_wait: Deadline in seconds for the device to boot after flashing.
+        :param ota_wait: Deadline in seconds for the OTA to download, install and reboot.
+        :param campaign_id: Name of the campaign results folder, defaults to a timestamp.
+        :param phase_timeouts: Optional per-phase overrides of PHASE_TIMEOUTS.
+        :param screenshot_interval: Seconds between screenshots taken while the OTA installs, None for none.
+        :param results_store: ResultsStore receiving the run history, defaults to the configured
+                              database in the results folder. False to keep no history.
+        """
+        config = configparser.ConfigParser()
+        config.read(Campaign.CONFIG_PATH)
+        self.serials = list(serials)
+        self.build_name = build_name
+        self.max_parallel = max_parallel or config.getint('campaign', 'max_parallel', fallback=4)
+        self.flash = flash
+        self.flash_wait = flash_wait
+        self.ota_wait = ota_wait
+        self.phase_timeouts = dict(Campaign.PHASE_TIMEOUTS, **(phase_timeouts or {}))
+        self.screenshot_interval = screenshot_interval
+        self.campaign_id = campaign_id or time.strftime("%Y%m%d_%H%M%S")
+        results_root = results_dir or config.get('campaign', 'results_dir', fallback='results')
+        self.results_dir = os.path.join(results_root, self.campaign_id)
+        os.makedirs(self.results_dir, exist_ok=True)
+        if results_store is None:
+            path = default_path(results_root)
+            results_store = ResultsStore(path) if path else False
+        self.results_store = results_store or None
+
+    def device_dir(self, serial):
+        """
+        Return (and create) the results folder of one device.
+        """
+        path = os.path.join(self.results_dir, serial)
+        os.makedirs(os.path.join(path, 'logs'), exist_ok=True)
+        return path
+
+    @staticmethod
+    def require(result):
+        """
+        Raise if a wait or command result dictionary reports failure.
+        """
+        if not result['success']:
+            raise Exception(result['error'])
+        return result
+
+    def wait_for_ota(self, ota, device_dir):
+        """
+        Wait for the OTA to install, taking periodic screenshots meanwhile when screenshot_interval is set.
+        Unchanged frames are not saved.
+        """
+        if not self.screenshot_interval:
+            return self.require(ota.wait_for_installation(timeout=self.ota_wait))
+        capture = ScreenshotCapture(os.path.join(device_dir, 'screenshots'), skip_duplicates=True)
+        with capture.periodic(self.screenshot_interval, step='ota'):
+            return self.require(ota.wait_for_installation(timeout=self.ota_wait))
+
+    def run(self):
+        """
+        Run the campaign on every device.
+        :return: A list with one result dictionary per device, in the order of `serials`.
+        """
+        logger.info(f"Starting campaign {self.campaign_id} on {len(self.serials)} devices, "
+                    f"max {self.max_parallel} in parallel")
+        start = time.monotonic()
+        if self.results_store:
+            self.results_store.start_run('campaign', self.build_name, run_id=self.campaign_id, report=self.results_dir)
+        # Track devices from the start, so a reboot issued before the first wait is not missed
+        DeviceMonitor.shared()
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='campaign') as executor:
+            results = list(executor.map(self.run_device, self.serials))
+
+        summary = {
+            'campaign_id': self.campaign_id,
+            'build_name': self.build_name,
+            'duration': round(time.monotonic() - start, 3),
+            'passed': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if not result['success']),
+            'devices': results
+        }
+        with open(os.path.join(self.results_dir, 'summary.json'), 'w') as file:
+            json.dump(summary, file, indent=2)
+        # Only this run: earlier campaigns on the same devices (e.g. soak iterations) are in the tracer too
+        tracing.tracer.export_jsonl(os.path.join(self.results_dir, 'trace.jsonl'), self.serials, since=start)
+        tracing.tracer.export_chrome_trace(os.path.join(self.results_dir, 'trace.json'), self.serials, since=start)
+        if self.results_store:
+            self.results_store.finish_run(self.campaign_id, summary['duration'], summary['passed'], summary['failed'])
+        CustomLogger.flush()
+        logger.info(f"Campaign {self.campaign_id} finished: {summary['passed']} passed, "
+                    f"{summary['failed']} failed in {summary['duration']} seconds")
+        return results
+
+    def cancel(self, serial=None):
+        """
+        Cancel the campaign on one device, or on every device: running commands are killed
+        and the remaining phases are skipped.
+        """
+        for device_serial in [serial] if serial else self.serials:
+            logger.warning(f"Cancelling campaign {self.campaign_id} on {device_serial}")
+            Shell.cancel_device(device_serial)
+
+    def run_device(self, serial):
+        """
+        Run the full flow on one device. Failures are recorded, never raised,
+        so one device cannot stop the rest of the campaign.
+        :return: A dictionary with the device result and per-phase durations.
+        """
+        device_dir = self.device_dir(serial)
+        logs_dir = os.path.join(device_dir, 'logs')
+        CustomLogger.set_device_log_file(serial, os.path.join(logs_dir, 'device.log'))
+        result = {
+            'serial': serial,
+            'success': False,
+            'error': '',
+            'failed_phase': None,
+            'initial_version': None,
+            'final_version': None,
+            'product_name': None,
+            'phases': {},
+            'post_ota_steps': None,
+            'ota_progress': None,
+            'results_dir': device_dir
+        }
+
+        clear_cancellation(serial)
+        started = time.monotonic()
+        with device_context(serial), tracing.span(serial, category='device', serial=serial, build=self.build_name):
+            setup = DeviceSetup(Precon(logs_dir=logs_dir), logs_dir=logs_dir)
+            ota = OTA(test_case_name=self.build_name, log_folder=logs_dir)
+            phases = [
+                ('perform_setup', setup.perform_setup),
+                ('start_ota_process', ota.start_ota_process),
+                ('wait_for_ota', lambda: self.wait_for_ota(ota, device_dir)),
+                ('wait_for_reboot', lambda: self.require(waits.wait_for_reboot())),
+                ('post_ota_actions', setup.post_ota_actions),
+            ]
+            if self.flash:
+                phases[:0] = [
+                    ('flash', lambda: DeviceFlasher().flash_build(self.build_name, serial=serial)),
+                    ('wait_after_flash', lambda: self.require(waits.wait_for_boot_completed(timeout=self.flash_wait))),
+                ]
+
+            for name, action in phases:
+                logger.info("Starting phase: %s", name)
+                phase_start = time.monotonic()
+                try:
+                    if is_cancelled():
+                        raise Exception("Campaign cancelled")
+                    with tracing.span(name, category='phase'), deadline(self.phase_timeouts.get(name)):
+                        action()
+                        if remaining_time() is not None and remaining_time() < 0:
+                            raise Exception(f"Phase {name} exceeded its {self.phase_timeouts[name]} second deadline")
+                except Exception as e:
+                    result['phases'][name] = round(time.monotonic() - phase_start, 3)
+                    result['failed_phase'] = name
+                    result['error'] = str(e)
+                    logger.error("Phase %s failed: %s", name, e)
+                    break
+                result['phases'][name] = round(time.monotonic() - phase_start, 3)
+            else:
+                result['success'] = True
+            ota.stop_log_collection()
+            result['initial_version'] = setup.get_initial_software_version()
+            result['final_version'] = setup.final_version
+            result['post_ota_steps'] = setup.post_ota_report
+            result['ota_progress'] = ota.progress.summary() if ota.progress else None
+            # The last known product name, the device is not queried again after a failure
+            result['product_name'] = DeviceSnapshot.for_device(serial).product_name
+
+        with open(os.path.join(device_dir, 'result.json'), 'w') as file:
+            json.dump(result, file, indent=2)
+        tracing.tracer.export_chrome_trace(os.path.join(device_dir, 'trace.json'), [serial], since=started)
+        if self.results_store:
+            spans = [span.as_dict() for span in tracing.tracer.spans([serial], since=started)]
+            self.results_store.record_device(self.campaign_id, result, spans)
+        return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run an OTA campaign on several devices in parallel.")
+    parser.add_argument('--serials', required=True, help="Comma separated device serial numbers.")
+    parser.add_argument('--build', required=True, help="Build name from the [builds] section of config.ini.")
+    parser.add_argument('--max-parallel', type=int, default=None, help="Maximum number of devices run at once.")
+    parser.add_argument('--results-dir', default=None, help="Root directory for campaign results.")
+    parser.add_argument('--skip-flash', action='store_true', help="Do not flash the build before setup.")
+    parser.add_argument('--screenshot-interval', type=float, default=None,
+                        help="Take a screenshot every N seconds while the OTA installs.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    campaign = Campaign(
+        serials=[serial.strip() for serial in args.serials.split(',') if serial.strip()],
+        build_name=args.build,
+        max_parallel=args.max_parallel,
+        results_dir=args.results_dir,
+        flash=not args.skip_flash,
+        screenshot_interval=args.screenshot_interval
+    )
+    campaign_results = campaign.run()
+    for device_result in campaign_results:
+        print(f"{device_result['serial']}: {'PASS' if device_result['success'] else 'FAIL'} {device_result['error']}")
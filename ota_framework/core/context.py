@@ -0,0 +1,101 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Serial of the device the current thread/task is working on, injected into every adb command
+_current_serial = contextvars.ContextVar('device_serial', default=None)
+
+# Absolute time.monotonic() deadline of the enclosing deadline() block, if any
+_deadline = contextvars.ContextVar('deadline', default=None)
+
+# Serials whose work has been cancelled, see cancel_device
+_cancelled = set()
+_cancel_lock = threading.Lock()
+
+@contextmanager
+def device_context(serial):
+    """
+    Route every adb command issued inside the block to the given device.
+    :param serial: Device serial number.
+    """
+    token = _current_serial.set(serial)
+    try:
+        yield serial
+    finally:
+        _current_serial.reset(token)
+
+def current_serial():
+    """
+    :return: The serial set by the enclosing device_context, or None.
+    """
+    return _current_serial.get()
+
+@contextmanager
+def deadline(seconds):
+    """
+    Bound every shell command and wait inside the block to finish within `seconds`.
+    Nested deadlines can only make the time left shorter.
+    :param seconds: Time budget of the block, None for no limit.
+    """
+    if seconds is None:
+        yield None
+        return
+    end = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(end if outer is None else min(end, outer))
+    try:
+        yield seconds
+    finally:
+        _deadline.reset(token)
+
+def remaining_time():
+    """
+    :return: Seconds left before the enclosing deadline, or None without a deadline.
+    """
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+def effective_timeout(timeout):
+    """
+    Combine a per-call timeout (None for no limit) with the enclosing deadline.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return timeout
+    return remaining if timeout is None else min(timeout, remaining)
+
+def cancel_device(serial):
+    """
+    Mark all work for a device as cancelled until clear_cancellation is called.
+    """
+    with _cancel_lock:
+        _cancelled.add(serial)
+
+def clear_cancellation(serial):
+    with _cancel_lock:
+        _cancelled.discard(serial)
+
+def is_cancelled(serial=None):
+    """
+    :param serial: Device serial number, defaults to the device of the current device_context.
+    """
+    serial = serial or current_serial()
+    with _cancel_lock:
+        return serial in _cancelled
+
+def timed_out_result(timeout, output='', error=''):
+    """
+    Result dictionary of a command stopped at its deadline. 'timed_out' tells it apart from a failed command.
+    """
+    message = f"Timed out after {timeout:.1f} seconds"
+    return {'success': False, 'output': output, 'error': f"{error}\n{message}" if error else message,
+            'timed_out': True}
+
+def cancelled_result(serial, output='', error=''):
+    """
+    Result dictionary of a command skipped or stopped because its device was cancelled.
+    """
+    message = f"Cancelled: work for device {serial or 'default'} was cancelled"
+    return {'success': False, 'output': output, 'error': f"{error}\n{message}" if error else message,
+            'cancelled': True}
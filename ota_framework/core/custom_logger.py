@@ -1,67 +1,313 @@
+import asyncio
+import atexit
+import configparser
+import copy
+import hashlib
 import logging
+import logging.handlers
 import os
+import queue
+import sys
+import threading
+import time
 from functools import wraps
+from ota_framework.core import tracing
+from ota_framework.core.context import current_serial
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(device)s%(message)s'
+LOG_LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING}
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/config.ini')
+
+def bounded(text, limit):
+    """
+    Cap text at `limit` characters, noting how much was cut. A limit of 0 keeps everything.
+    """
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} more characters]"
+    return text
+
+def payload_fields(result, limit):
+    """
+    Fixed-size summary of a return value: success, output size, a hash of the full output
+    and the output capped at `limit` characters.
+    """
+    if isinstance(result, dict) and 'output' in result:
+        success = result.get('success')
+        text = f"{result['output']}{result.get('error', '')}"
+    elif isinstance(result, (list, tuple)) and result and all(isinstance(item, dict) and 'output' in item for item in result):
+        success = all(item.get('success') for item in result)
+        text = ''.join(f"{item['output']}{item.get('error', '')}" for item in result)
+    else:
+        success = result if isinstance(result, bool) else None
+        text = '' if result is None else str(result)
+    return {
+        'success': success,
+        'output_size': len(text),
+        'output_hash': hashlib.sha1(text.encode(errors='replace')).hexdigest()[:12],
+        'output': bounded(text, limit).replace('\n', '\\n')
+    }
+
+class BoundedPayload:
+    """
+    Log argument rendering a value capped at `limit` characters, only when the record is written.
+    """
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value, limit):
+        self.value = copy.copy(value) if isinstance(value, (dict, list, set)) else value
+        self.limit = limit
+
+    def __str__(self):
+        return bounded(str(self.value), self.limit)
+
+def _load_settings():
+    config = configparser.ConfigParser()
+    config.read(CONFIG_PATH)
+    structured = os.getenv('OTA_LOG_STRUCTURED')
+    if structured is None:
+        structured = config.getboolean('logging', 'structured', fallback=False)
+    else:
+        structured = structured.lower() in ('1', 'true', 'yes', 'on')
+    return structured, config.getint('logging', 'max_payload', fallback=2000)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the background writer. The message is not formatted here,
+    only the log file name and the device serial of the calling context are attached.
+    Container arguments are copied so later changes by the caller do not show up in the log.
+    """
+    def __init__(self, log_queue, log_file_name):
+        super().__init__(log_queue)
+        self.log_file_name = log_file_name
+
+    def prepare(self, record):
+        record.log_file = self.log_file_name
+        record.serial = current_serial()
+        record.device = f"[{record.serial}] " if record.serial else ''
+        if isinstance(record.args, tuple):
+            record.args = tuple(copy.copy(arg) if isinstance(arg, (dict, list, set)) else arg for arg in record.args)
+        elif isinstance(record.args, dict):
+            # A single dictionary argument is stored as the args mapping itself
+            record.args = copy.copy(record.args)
+        return record
+
+
+class _DispatchHandler(logging.Handler):
+    """
+    Runs on the writer thread: sends every record to the console, to its log file
+    under logs/ and, for records logged inside a device_context, to that device's log file.
+    """
+    def __init__(self, log_dir):
+        super().__init__(logging.DEBUG)
+        self.log_dir = log_dir
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        self.console = logging.StreamHandler(sys.stderr)
+        self.console.setLevel(logging.INFO)
+        self.console.setFormatter(self.formatter)
+        self.files = {}
+        self.device_files = {}
+
+    def file_handler(self, path):
+        handler = self.files.get(path)
+        if handler is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = logging.FileHandler(path)
+            handler.setFormatter(self.formatter)
+            self.files[path] = handler
+        return handler
+
+    def emit(self, record):
+        flushed = getattr(record, 'flushed', None)
+        if flushed is not None:
+            for handler in self.files.values():
+                handler.flush()
+            flushed.set()
+            return
+        if record.levelno >= self.console.level:
+            self.console.handle(record)
+        self.file_handler(os.path.join(self.log_dir, record.log_file)).handle(record)
+        if record.serial:
+            path = self.device_files.get(record.serial) or os.path.join(self.log_dir, 'devices', f"{record.serial}.log")
+            self.file_handler(path).handle(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        self.files.clear()
+        super().close()
+
 
 class CustomLogger:
+    # log_decorator defaults, from the [logging] section of config.ini
+    structured, max_payload = _load_settings()
+
+    # One queue and one writer thread per process, shared by every CustomLogger
+    _queue = None
+    _listener = None
+    _dispatcher = None
+    _setup_lock = threading.Lock()
+
     def __init__(self, name, log_file_name='project.log'):
+        """
+        :param name: Logger name, creating several CustomLoggers with the same name is cheap and adds no handlers.
+        :param log_file_name: File under logs/ the records of this logger are written to.
+        """
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
+        CustomLogger._start_writer()
+
+        # Only one queue handler per named logger, however often it is created
+        for handler in self.logger.handlers:
+            if isinstance(handler, _QueueHandler):
+                handler.log_file_name = log_file_name
+                break
+        else:
+            self.logger.addHandler(_QueueHandler(CustomLogger._queue, log_file_name))
+
+    @staticmethod
+    def _start_writer():
+        with CustomLogger._setup_lock:
+            if CustomLogger._listener is not None:
+                return
+            # Ensure the logs directory exists
+            log_dir = os.path.join(os.getcwd(), 'logs')
+            if not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+            CustomLogger._queue = queue.SimpleQueue()
+            CustomLogger._dispatcher = _DispatchHandler(log_dir)
+            CustomLogger._listener = logging.handlers.QueueListener(CustomLogger._queue, CustomLogger._dispatcher)
+            CustomLogger._listener.start()
+            atexit.register(CustomLogger.shutdown)
+
+    @staticmethod
+    def set_device_log_file(serial, path):
+        """
+        Write the records logged inside device_context(serial) to `path` instead of logs/devices/<serial>.log.
+        """
+        CustomLogger._start_writer()
+        CustomLogger._dispatcher.device_files[serial] = path
 
-        # Ensure the logs directory exists
-        log_dir = os.path.join(os.getcwd(), 'logs')
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+    @staticmethod
+    def flush(timeout=10):
+        """
+        Wait until every record queued so far has been written.
+        """
+        if CustomLogger._listener is None:
+            return True
+        record = logging.makeLogRecord({'flushed': threading.Event()})
+        CustomLogger._queue.put(record)
+        return record.flushed.wait(timeout)
 
-        log_file_path = os.path.join(log_dir, log_file_name)
+    @staticmethod
+    def shutdown():
+        """
+        Write the remaining records and stop the writer thread.
+        """
+        with CustomLogger._setup_lock:
+            if CustomLogger._listener is None:
+                return
+            CustomLogger._listener.stop()
+            CustomLogger._dispatcher.close()
+            CustomLogger._listener = None
 
-        # File handler
-        file_handler = logging.FileHandler(log_file_path)
-        file_handler.setLevel(logging.DEBUG)
+    # Messages may use %-style arguments, which are only rendered on the writer thread
+    def info(self, message, *args):
+        self.logger.info(message, *args)
 
-        # Console handler
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
+    def debug(self, message, *args):
+        self.logger.debug(message, *args)
 
-        # Formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
+    def error(self, message, *args):
+        self.logger.error(message, *args)
 
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+    def warning(self, message, *args):
+        self.logger.warning(message, *args)
 
-    def info(self, message):
-        self.logger.info(message)
+    def log_decorator(self, level='info', structured=None, max_payload=None):
+        """
+        Log calls of the decorated function and time them as a trace span.
+        :param level: 'info', 'debug' or 'warning'.
+        :param structured: Emit one record per call with fixed fields (function, duration,
+                           success, output size and hash, capped output) instead of the
+                           "Calling X" / "X returned ..." pair. Defaults to [logging] structured.
+        :param max_payload: Maximum characters of a result or argument in a record, 0 for no limit.
+                            Defaults to [logging] max_payload.
+        """
+        level_number = LOG_LEVELS.get(level, logging.INFO)
 
-    def debug(self, message):
-        self.logger.debug(message)
+        def is_structured():
+            return CustomLogger.structured if structured is None else structured
 
-    def error(self, message):
-        self.logger.error(message)
+        def payload_limit():
+            return CustomLogger.max_payload if max_payload is None else max_payload
 
-    def warning(self, message):
-        self.logger.warning(message)
+        def log_call(func, args, kwargs):
+            if is_structured():
+                return
+            if level == 'info':
+                self.info("Calling %s", func.__name__)
+            elif level == 'debug':
+                self.debug("Calling %s with args: %s and kwargs: %s", func.__name__,
+                           BoundedPayload(args, payload_limit()), BoundedPayload(kwargs, payload_limit()))
+            elif level == 'warning':
+                self.warning("Warning in %s: %s", func.__name__, BoundedPayload(args, payload_limit()))
+
+        def log_result(func, result, started, args, kwargs):
+            if is_structured():
+                if not self.logger.isEnabledFor(level_number):
+                    return
+                fields = {'function': func.__qualname__, 'duration': round(time.monotonic() - started, 3)}
+                fields.update(payload_fields(result, payload_limit()))
+                if level == 'debug':
+                    fields['args'] = bounded(str((args, kwargs)), payload_limit())
+                self.log_fields(level_number, fields)
+            elif level == 'info':
+                self.info("%s returned %s", func.__name__, BoundedPayload(result, payload_limit()))
+            elif level == 'debug':
+                self.debug("%s returned %s", func.__name__, BoundedPayload(result, payload_limit()))
+
+        def log_exception(func, e, started):
+            if is_structured():
+                self.log_fields(logging.ERROR, {'function': func.__qualname__,
+                                                'duration': round(time.monotonic() - started, 3),
+                                                'success': False, 'error': bounded(str(e), payload_limit())})
+            else:
+                self.error("Exception in %s: %s", func.__name__, e)
 
-    def log_decorator(self, level='info'):
         def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    log_call(func, args, kwargs)
+                    started = time.monotonic()
+                    try:
+                        with tracing.span(func.__qualname__):
+                            result = await func(*args, **kwargs)
+                    except Exception as e:
+                        log_exception(func, e, started)
+                        raise
+                    log_result(func, result, started, args, kwargs)
+                    return result
+                return async_wrapper
+
             @wraps(func)
             def wrapper(*args, **kwargs):
-                if level == 'info':
-                    self.info(f"Calling {func.__name__}")
-                elif level == 'debug':
-                    self.debug(f"Calling {func.__name__} with args: {args} and kwargs: {kwargs}")
-                elif level == 'warning':
-                    self.warning(f"Warning in {func.__name__}: {args}")
+                log_call(func, args, kwargs)
+                started = time.monotonic()
                 try:
-                    result = func(*args, **kwargs)
-                    if level == 'info':
-                        self.info(f"{func.__name__} returned {result}")
-                    elif level == 'debug':
-                        self.debug(f"{func.__name__} returned {result}")
-                    return result
+                    with tracing.span(func.__qualname__):
+                        result = func(*args, **kwargs)
                 except Exception as e:
-                    self.error(f"Exception in {func.__name__}: {e}")
+                    log_exception(func, e, started)
                     raise
+                log_result(func, result, started, args, kwargs)
+                return result
             return wrapper
         return decorator
+
+    def log_fields(self, level_number, fields):
+        """
+        Log a record rendered as `key=value` pairs. The fields are also attached to the record as `fields`.
+        """
+        self.logger.log(level_number, ' '.join(f"{key}=%s" for key in fields), *fields.values(),
+                        extra={'fields': fields})
@@ -1,13 +1,25 @@
-import time
 import os
-import re
 import configparser
 from ota_framework.core.custom_logger import CustomLogger
 from ota_framework.config.constants import SystemCommands, DeviceCommands, OOBECommands, Profiles
-from ota_framework.core.shell import Shell
+from ota_framework.core.app_deploy import AppDeployer
+from ota_framework.core.device_monitor import DeviceMonitor, parse_devices_output, is_listed_online
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.parsers import is_devconf_set, OOBE_COMPLETE_KEY
+from ota_framework.core.reboot_scheduler import RebootScheduler
+from ota_framework.core.retry import RetryPolicy
+from ota_framework.core.screenshots import ScreenshotCapture
+from ota_framework.core.shell import Shell, current_serial
 
 logger = CustomLogger('DeviceLog')
 
+# Settings written to complete OOBE, they take effect after a reboot
+OOBE_COMMANDS = [
+    OOBECommands.USER_SETUP_COMPLETE,
+    OOBECommands.DCS_CONFIG,
+    OOBECommands.HOME_SCREEN
+]
+
 class DeviceActions:
     def __init__(self,logs_dir):
         self.shell = Shell()
@@ -18,6 +30,7 @@ class DeviceActions:
         self.logs_dir = logs_dir
         if not os.path.exists(self.logs_dir):
             os.makedirs(self.logs_dir)
+        self.screenshots = ScreenshotCapture(self.logs_dir)
 
     @logger.log_decorator(level='info')
     def reboot_device(self):
@@ -26,33 +39,29 @@ class DeviceActions:
         """
         command = DeviceCommands.REBOOT
         self.shell.execute_command(command)
+        DeviceSnapshot.invalidate_device()
 
     @logger.log_decorator(level='info')
-    def take_screenshot(self, filename='filename.png'):
+    def take_screenshot(self, filename=None, step='screenshot'):
         """
-        Take a screenshot on the device and save it to the logs folder.
+        Take a screenshot on the device and stream it to the logs folder with adb exec-out.
 
         Args:
-        - filename (str): Name of the screenshot file.
+        - filename (str): Optional name of the screenshot file. By default the file is
+          named after the device and the step, so captures never overwrite each other.
+        - step (str): Name of the test step, used in the generated file name.
 
         Returns:
         - str: Path to the saved screenshot file.
+
+        Raises:
+        - Exception: If the screenshot could not be taken.
         """
         try:
-            # Execute the screenshot command
-            command = DeviceCommands.SCREENSHOT_COMMAND
-            self.shell.execute_command(command)
-            logger.info("Screenshot taken on the device.")
-
-            # Pull the screenshot to the local folder
-            pull_command = DeviceCommands.PULL_SCREENSHOT
-            screenshot_file = os.path.join(self.logs_dir, filename)
-            pull_command_with_path = f"{pull_command} /tmp/{filename} {screenshot_file}"
-            self.shell.execute_command(pull_command_with_path)
-            logger.info(f"Screenshot saved successfully to: {screenshot_file}")
-
-            # Return the path to the saved screenshot
-            return screenshot_file
+            result = self.screenshots.capture(step, filename=filename)
+            if not result['success']:
+                raise Exception(result['error'])
+            return result['output']
         except Exception as e:
             logger.error(f"Error taking or saving screenshot: {e}")
             raise
@@ -60,57 +69,59 @@ class DeviceActions:
     @logger.log_decorator(level='info')
     def check_device_online(self):
         """
-        Check if the device is online by running the adb devices command.
+        Check if the device is online. The shared DeviceMonitor answers from the adb
+        track-devices feed; without it `adb devices` is polled. Only the current
+        device's own serial counts, other attached devices are ignored.
         
         Returns:
         - bool: True if the device is online, False otherwise.
         """
-        retries = 5
-        for attempt in range(retries):
-            try:
-                result = self.shell.execute_command("adb devices")
-                if result['success']:
-                    output_lines = result['output'].splitlines()
-                    for line in output_lines:
-                        if "device" in line and not line.startswith("List of devices attached"):
-                            logger.info(f"Device found: {line}")
-                            return True
-                else:
-                    logger.error(f"Error checking device status: {result['error']}")
-            except Exception as e:
-                logger.error(f"Error checking device status: {e}")
+        serial = current_serial()
+        policy = RetryPolicy.for_device('device_online')
+        monitor = DeviceMonitor.shared()
+        if monitor.connected:
+            if monitor.wait_for_online(serial, timeout=policy.deadline):
+                logger.info(f"Device found: {serial or 'default device'}")
+                return True
+            if monitor.connected:
+                logger.warning(f"Device not online, adb reports state: {monitor.state(serial) or 'absent'}")
+                return False
 
-            logger.warning("Device not found, retrying...")
-            time.sleep(1)
-        
+        def check():
+            result = self.shell.execute_command(SystemCommands.ADB_DEVICES)
+            if not result['success']:
+                logger.error(f"Error checking device status: {result['error']}")
+                return result
+            if is_listed_online(parse_devices_output(result['output']), serial):
+                logger.info(f"Device found: {serial or 'default device'}")
+                return result
+            return dict(result, success=False)
+
+        try:
+            result = policy.run(check, description="Checking device is online")
+            if result['success']:
+                return True
+        except Exception as e:
+            logger.error(f"Error checking device status: {e}")
         logger.warning("Device could not be detected after retries.")
         return False
     
     @logger.log_decorator(level='info')
     def check_software_version(self):
         """
-        Check the software version of the device.
+        Check the software version of the device, using the cached device snapshot when it is fresh.
 
         Returns:
         - str: Software version.
 
         Raises:
-        - Exception: If there is an error executing the command or parsing the output.
+        - Exception: If the version could not be read from the device.
         """
         try:
-            command = SystemCommands.SHOW_OS_RELEASE
-            result = self.shell.execute_command(command)
-            if result['success']:
-                logger.info(f"Software version check output: {result['output']}")
-                # Extract the software version from the output
-                version_match = re.search(r"'com.amazon.devconf/system/device-info/software-version'\s*=\s*'(\d+)'", result['output'])
-                if version_match:
-                    version = version_match.group(1)
-                    return version
-                else:
-                    raise Exception("Software version not found in the output.")
-            else:
-                raise Exception(f"Command execution failed: {result['error']}")
+            version = DeviceSnapshot.for_device().get('software_version')
+            if version is None:
+                raise Exception("Software version not found in the output.")
+            return version
         except Exception as e:
             logger.error(f"Error checking software version: {e}")
             raise
@@ -118,36 +129,20 @@ class DeviceActions:
     @logger.log_decorator(level='info')
     def get_software_version(self):
         """
-        Retrieve the software version of the device.
+        Retrieve the software version of the device, always querying the device.
 
         Returns:
         - str: Software version.
 
         Raises:
-        - Exception: If there is an error executing the command or parsing the output.
+        - Exception: If the version could not be read from the device.
         """
         try:
-            # Define the command to check the software version
-            command = SystemCommands.SHOW_OS_RELEASE
-            
-            # Execute the command
-            result = self.shell.execute_command(command)
-            
-            # Check if the command was successful
-            if result['success']:
-                logger.info(f"Software version check output: {result['output']}")
-                
-                # Extract the software version from the output
-                version_match = re.search(r"'com.amazon.devconf/system/device-info/software-version'\s*=\s*'(\d+)'", result['output'])
-                
-                if version_match:
-                    # Return the software version
-                    version = version_match.group(1)
-                    return version
-                else:
-                    raise Exception("Software version not found in the output.")
-            else:
-                raise Exception(f"Command execution failed: {result['error']}")
+            version = DeviceSnapshot.for_device().refresh(['software_version']).software_version
+            if version is None:
+                raise Exception("Software version not found in the output.")
+            logger.info(f"Software version: {version}")
+            return version
         except Exception as e:
             logger.error(f"Error getting software version: {e}")
             raise
@@ -169,8 +164,9 @@ class DeviceActions:
             result = self.shell.execute_command(command)
             if result['success']:
                 logger.info(f"Enable Alexa command output: {result['output']}")
+                DeviceSnapshot.invalidate_device(fields=['oobe_complete'])
                 # Check if the output indicates success
-                if "successfully set to 'true'" in result['output']:
+                if is_devconf_set(result['output'], OOBE_COMPLETE_KEY, 'true'):
                     return True
                 else:
                     raise Exception("Failed to enable Alexa.")
@@ -184,7 +180,6 @@ class DeviceActions:
     def skip_oobe(self):
         """
         Complete the Out-of-Box Experience (OOBE) by executing commands from OOBECommands class.
-        Adds a delay of 2 seconds between each command execution.
 
         Returns:
         - bool: True if OOBE was successfully completed, False otherwise.
@@ -193,17 +188,11 @@ class DeviceActions:
         - Exception: If there is an error executing any of the OOBE commands.
         """
         try:
-            # List of OOBE commands to execute
-            oobe_commands = [
-                OOBECommands.USER_SETUP_COMPLETE,
-                OOBECommands.DCS_CONFIG,
-                OOBECommands.HOME_SCREEN
-            ]
-
-            for command in oobe_commands:
-                result = self.shell.execute_command(command)
+            oobe_commands = OOBE_COMMANDS
+            results = self.shell.execute_batch(oobe_commands)
+            DeviceSnapshot.invalidate_device(fields=['oobe_complete', 'user_setup_complete'])
+            for command, result in zip(oobe_commands, results):
                 logger.info(f"Executed command '{command}'. Output: {result['output']}")
-                time.sleep(2)
 
                 if not result['success']:
                     raise Exception(f"Command '{command}' failed with error: {result['error']}")
@@ -225,18 +214,10 @@ class DeviceActions:
         Raises:
         - AssertionError: If the status of any slot does not match the expected values.
         """
-        def verify_boot_utility_slots(slot_name):
-            command = DeviceCommands.BOOT_CONTROL
-            result = self.shell.execute_command(command)
-            lines = result['output'].strip().split('\n')
-            headers = lines[0].split()
-            data = [line.split() for line in lines[1:]]
-            for row in data:
-                if row[0] == slot_name:
-                    return row[3]
-
-        STATUS_OF_SLOT_a = verify_boot_utility_slots('_a')
-        STATUS_OF_SLOT_b = verify_boot_utility_slots('_b')
+        # One boot_control_utility query serves both slots
+        boot_slots = DeviceSnapshot.for_device().refresh(['boot_slots']).boot_slots or {}
+        STATUS_OF_SLOT_a = boot_slots['_a'].active if '_a' in boot_slots else None
+        STATUS_OF_SLOT_b = boot_slots['_b'].active if '_b' in boot_slots else None
 
         assert STATUS_OF_SLOT_a == "No", f"Expected 'No' for slot '_a', but got '{STATUS_OF_SLOT_a}'"
         assert STATUS_OF_SLOT_b == "Yes", f"Expected 'Yes' for slot '_b', but got '{STATUS_OF_SLOT_b}'"
@@ -246,34 +227,33 @@ class DeviceActions:
     @logger.log_decorator(level='info')
     def push_and_install_app(self, app_name):
         """
-        Push and install an app on the device.
+        Push and install an app on the device, skipping the push and install
+        when the identical package is already installed.
 
         Args:
         - app_name (str): The name of the app as specified in the config.ini file.
+
+        Returns:
+        - dict: Deploy result with 'success', 'output', 'error', 'pushed' and 'installed' keys.
         """
         try:
-            app_path = self.config.get('apps', app_name)
-            if not app_path or not os.path.exists(app_path):
-                logger.error(f"App path for {app_name} is invalid or does not exist.")
-                return
-
-            # Push the app to the device
-            push_command = f"adb push {app_path} /data/{os.path.basename(app_path)}"
-            result = self.shell.execute_command(push_command)
-            if not result['success']:
-                logger.error(f"Failed to push {app_name} to device: {result['error']}")
-                return
-
-            # Install the app on the device
-            install_command = f"adb shell vpm install /data/{os.path.basename(app_path)}"
-            result = self.shell.execute_command(install_command)
-            if result['success']:
-                logger.info(f"App {app_name} installed successfully.")
-            else:
-                logger.error(f"Failed to install {app_name} on device: {result['error']}")
+            return AppDeployer().deploy(app_name)
         except Exception as e:
             logger.error(f"Error pushing or installing app {app_name}: {e}")
             raise
+
+    @logger.log_decorator(level='info')
+    def deploy_apps(self, app_names=None):
+        """
+        Push and install every app of the [apps] section of config.ini concurrently.
+
+        Args:
+        - app_names (list): Optional subset of the configured app names.
+
+        Returns:
+        - dict: App name to its deploy result.
+        """
+        return AppDeployer().deploy_all(app_names)
         
     @logger.log_decorator(level='info')
     def get_device_name(self):
@@ -284,48 +264,58 @@ class DeviceActions:
         - str: Product name of the device.
         """
         try:
-            command = SystemCommands.DEVICE_NAME
-            result = self.shell.execute_command(command)
-            if result['success']:
-                # Parse the output to find PRODUCT_NAME
-                output_lines = result['output'].splitlines()
-                for line in output_lines:
-                    if line.startswith("PRODUCT_NAME"):
-                        product_name = line.split('=')[1].strip()
-                        logger.info(f"Device product name: {product_name}")
-                        return product_name
+            product_name = DeviceSnapshot.for_device().get('product_name')
+            if product_name is None:
                 raise Exception("Product name not found in command output.")
-            else:
-                raise Exception(f"Command execution failed: {result['error']}")
+            logger.info(f"Device product name: {product_name}")
+            return product_name
         except Exception as e:
             logger.error(f"Error getting device name: {e}")
             raise
         
     @logger.log_decorator(level='info')
-    def check_and_complete_oobe_based_on_profile(self):
+    def validate_oobe(self):
+        """
+        Validate that OOBE is complete after the reboot.
+
+        Returns:
+        - dict: A dictionary with 'success', 'output', and 'error' keys.
+        """
+        snapshot = DeviceSnapshot.for_device().refresh(['oobe_complete', 'user_setup_complete'])
+        output = f"user_setup_complete: {snapshot.user_setup_complete}, oobe-complete: {snapshot.oobe_complete}"
+        if snapshot.user_setup_complete == '1' and snapshot.oobe_complete == 'true':
+            return {'success': True, 'output': output, 'error': ''}
+        return {'success': False, 'output': output, 'error': f"OOBE not complete, got {output}"}
+
+    @logger.log_decorator(level='info')
+    def check_and_complete_oobe_based_on_profile(self, scheduler=None):
         """
         Check the device profile and complete OOBE if the profile is MULTIMODAL.
 
+        Args:
+        - scheduler (RebootScheduler): Optional scheduler; the OOBE settings are only staged and
+          take effect with its next commit, sharing one reboot with the other staged steps.
+
         Returns:
-        - bool: True if OOBE was completed or no action needed, False if an error occurred.
+        - bool: True if OOBE was completed (or staged) or no action needed, False if an error occurred.
         """
         try:
             profile = self.get_device_profile()
             if profile == Profiles.TV:
                 logger.info("TV profile detected. No action needed.")
                 return True
-            elif profile in Profiles.MULTIMODAL:
+            elif profile == Profiles.MULTIMODAL:
                 logger.info(f"MULTIMODAL profile detected. Initiating OOBE completion.")
-                if not self.skip_oobe():
-                    return False
-                self.reboot_device()
-                logger.info("Rebooting device. Waiting for 30 seconds for device to come online...")
-                time.sleep(30)  
-                if self.check_device_online():
+                if scheduler is not None:
+                    scheduler.require('oobe', OOBE_COMMANDS, self.validate_oobe)
+                    return True
+                logger.info("Rebooting device. Waiting for device to boot...")
+                result = RebootScheduler().require('oobe', OOBE_COMMANDS, self.validate_oobe).commit()
+                if result['success'] and self.check_device_online():
                     logger.info("Device rebooted and online.")
                     return True
                 else:
-                    logger.error("Device did not come online after reboot.")
+                    logger.error(f"OOBE completion failed: {result['error'] or 'device not online after reboot'}")
                     return False
             else:
                 logger.warning(f"Unknown profile '{profile}'. No action taken.")
@@ -343,13 +333,10 @@ class DeviceActions:
         - str: Device profile (TV or MULTIMODAL).
         """
         try:
-            device_name = self.get_device_name()
-            if device_name == "callie":
-                return Profiles.TV
-            elif device_name in Profiles.MULTIMODAL:
-                return Profiles.MULTIMODAL
-            else:
+            profile = DeviceSnapshot.for_device().get('profile')
+            if profile is None:
                 raise Exception("Unknown device profile.")
+            return profile
         except Exception as e:
             logger.error(f"Error getting device profile: {e}")
             raise
@@ -0,0 +1,262 @@
+import asyncio
+import threading
+import time
+from ota_framework.core.context import effective_timeout, is_cancelled
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.shell import Shell, current_serial
+
+# Initialize the logger for this module
+logger = CustomLogger('DeviceMonitorLogger')
+
+# adb device states
+ONLINE = 'device'
+OFFLINE = 'offline'
+UNAUTHORIZED = 'unauthorized'
+RECOVERY = 'recovery'
+# State of a serial missing from the device list
+ABSENT = None
+
+# How often waiting threads wake up to check for device cancellation
+CANCEL_CHECK_INTERVAL = 0.5
+
+def parse_devices_output(output):
+    """
+    Parse the output of `adb devices`, matching serials exactly instead of searching for "device".
+    :return: A list of (serial, state) tuples, without the header line.
+    """
+    devices = []
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and not line.startswith("List of devices attached") and not line.startswith('*'):
+            devices.append((fields[0], fields[1]))
+    return devices
+
+def is_listed_online(devices, serial=None):
+    """
+    :param devices: List of (serial, state) tuples.
+    :param serial: Device serial number, or None for the only listed device (as adb without -s).
+    :return: True if the device is listed in the 'device' state.
+    """
+    if serial is None:
+        return len(devices) == 1 and devices[0][1] == ONLINE
+    return (serial, ONLINE) in devices
+
+
+class DeviceMonitor:
+    """
+    Keeps a live table of device states fed by the adb server's `host:track-devices`
+    stream, so presence checks are lookups instead of `adb devices` polling loops.
+
+    One background thread serves every device on the host. Waiters block on a
+    condition that is notified on every change. When the feed breaks (e.g. the adb
+    server restarts) the monitor reconnects and `connected` is False meanwhile, so
+    callers can fall back to polling.
+    """
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, source=None, reconnect_delay=1, heartbeat=0.5):
+        """
+        :param source: Object with a `track_devices(heartbeat)` generator, e.g. an AdbClient or a
+                       FakeDeviceFarm. Defaults to the source matching the Shell backend.
+        :param reconnect_delay: Seconds to wait before reconnecting a broken feed.
+        :param heartbeat: Seconds between checks whether the monitor was stopped.
+        """
+        self.source = source or DeviceMonitor.default_source()
+        self.reconnect_delay = reconnect_delay
+        self.heartbeat = heartbeat
+        self.connected = False
+        self._states = {}
+        # Number of updates so far, and the last update in which each serial was not online
+        self._sequence = 0
+        self._last_offline = {}
+        self._changed = threading.Condition()
+        self._first_update = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def default_source():
+        """
+        :return: The simulated farm with the 'simulator' backend, the native adb client otherwise.
+        """
+        if Shell.backend == 'simulator':
+            return Shell.simulator
+        return Shell.native_client()
+
+    @staticmethod
+    def shared(timeout=2):
+        """
+        Return the process-wide monitor for the current Shell backend, starting it on first use.
+        :param timeout: Seconds to wait for the first device list of a newly started monitor.
+        """
+        with DeviceMonitor._shared_lock:
+            monitor = DeviceMonitor._shared
+            if monitor is None or monitor.source is not DeviceMonitor.default_source():
+                if monitor is not None:
+                    monitor.stop()
+                monitor = DeviceMonitor().start()
+                DeviceMonitor._shared = monitor
+        monitor.wait_connected(timeout)
+        return monitor
+
+    @staticmethod
+    def stop_shared():
+        with DeviceMonitor._shared_lock:
+            if DeviceMonitor._shared is not None:
+                DeviceMonitor._shared.stop()
+                DeviceMonitor._shared = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='DeviceMonitor')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def wait_connected(self, timeout=None):
+        """
+        Wait for the first device list.
+        :return: True if the feed is connected.
+        """
+        self._first_update.wait(timeout)
+        return self.connected
+
+    def _run(self):
+        while not self._stopped.is_set():
+            updates = None
+            try:
+                updates = self.source.track_devices(heartbeat=self.heartbeat)
+                for devices in updates:
+                    if self._stopped.is_set():
+                        break
+                    if devices is not None:
+                        self._update(devices)
+            except Exception as e:
+                if self.connected or not self._first_update.is_set():
+                    logger.warning(f"Device tracking feed lost: {e}")
+            finally:
+                if updates is not None:
+                    updates.close()
+                with self._changed:
+                    self.connected = False
+                    self._changed.notify_all()
+                self._first_update.set()
+            self._stopped.wait(self.reconnect_delay)
+
+    def _update(self, devices):
+        with self._changed:
+            states = dict(devices)
+            self._sequence += 1
+            for serial in set(self._states) | set(states):
+                previous, state = self._states.get(serial), states.get(serial)
+                if state != ONLINE:
+                    self._last_offline[serial] = self._sequence
+                if previous != state:
+                    logger.info(f"Device {serial}: {previous or 'absent'} -> {state or 'absent'}")
+            self._states = states
+            self.connected = True
+            self._changed.notify_all()
+        self._first_update.set()
+
+    def states(self):
+        """
+        :return: A copy of the serial -> state table.
+        """
+        with self._changed:
+            return dict(self._states)
+
+    def _state(self, serial):
+        if serial is None:
+            # Like adb without -s: only meaningful when exactly one device is listed
+            return next(iter(self._states.values())) if len(self._states) == 1 else ABSENT
+        return self._states.get(serial, ABSENT)
+
+    def state(self, serial=None):
+        """
+        :param serial: Device serial number, defaults to the device of the current device_context.
+        :return: The adb state of the device, or None when it is not listed.
+        """
+        with self._changed:
+            return self._state(serial or current_serial())
+
+    def is_online(self, serial=None):
+        """
+        :param serial: Device serial number, defaults to the device of the current device_context.
+        :return: True if the device is in the 'device' state.
+        """
+        return self.state(serial) == ONLINE
+
+    def mark(self):
+        """
+        :return: A marker to pass to wait_for_reconnect, taken before e.g. a reboot is issued.
+        """
+        with self._changed:
+            return self._sequence
+
+    def _wait(self, reached, timeout):
+        """
+        Wait until `reached()` is true under the state lock.
+        :return: True if reached before the timeout, cancellation or loss of the feed.
+        """
+        timeout = effective_timeout(timeout)
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while not reached():
+                if not self.connected or is_cancelled():
+                    return False
+                remaining = CANCEL_CHECK_INTERVAL if end is None else min(end - time.monotonic(), CANCEL_CHECK_INTERVAL)
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return True
+
+    def wait_for_state(self, serial=None, states=(ONLINE,), timeout=60):
+        """
+        Wait until the device is in one of the given states (None meaning not listed).
+        :return: True if the state was reached within the timeout.
+        """
+        serial = serial or current_serial()
+        return self._wait(lambda: self._state(serial) in states, timeout)
+
+    def wait_for_online(self, serial=None, timeout=60):
+        return self.wait_for_state(serial, (ONLINE,), timeout)
+
+    def wait_for_offline(self, serial=None, timeout=60):
+        """
+        Wait until the device is in any state but 'device', including not being listed.
+        """
+        serial = serial or current_serial()
+        return self._wait(lambda: self._state(serial) != ONLINE, timeout)
+
+    def wait_for_reconnect(self, since, serial=None, timeout=300):
+        """
+        Wait until the device came back: it was seen not online after the `since` marker and is online now.
+        A reboot that finished before this call is still noticed.
+        :param since: Marker from mark(), taken before the reboot.
+        :return: True if the device came back within the timeout.
+        """
+        serial = serial or current_serial()
+
+        def reconnected():
+            listed = serial or (next(iter(self._states)) if len(self._states) == 1 else None)
+            return self._last_offline.get(listed, 0) > since and self._state(listed) == ONLINE
+        return self._wait(reconnected, timeout)
+
+    async def async_wait_for_state(self, serial=None, states=(ONLINE,), timeout=60):
+        serial = serial or current_serial()
+        return await asyncio.to_thread(self.wait_for_state, serial, states, timeout)
+
+    async def async_wait_for_reconnect(self, since, serial=None, timeout=300):
+        serial = serial or current_serial()
+        return await asyncio.to_thread(self.wait_for_reconnect, since, serial, timeout)
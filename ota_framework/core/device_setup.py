@@ -1,52 +1,59 @@
-import time
 from ota_framework.core.ota_precon import Precon
 from ota_framework.core.custom_logger import CustomLogger
 from ota_framework.core.device_actions import DeviceActions
+from ota_framework.core.retry import RetryPolicy
+from ota_framework.core.setup_planner import SetupPlanner
+from ota_framework.core.step_graph import StepGraph, USB, REBOOT
 
 # Initialize the logger for this module
 logger = CustomLogger('DeviceSetupLogger')
 
 class DeviceSetup:
+    # Desired device state before and after the OTA, see SetupPlanner
+    PRE_OTA_STATE = {'wifi': True, 'registration': True, 'dev_flags': '0'}
+    POST_OTA_STATE = {'alexa': True, 'dev_flags': '0x440', 'oobe': True}
+
     def __init__(self, precon,logs_dir):
-        self.precon = Precon()
+        self.precon = precon or Precon(logs_dir=logs_dir)
         self.logs_dir = logs_dir
         self.device = DeviceActions(logs_dir=self.logs_dir)
         self.initial_version = None
+        self.final_version = None
+        self.setup_plan = None
+        self.post_ota_plan = None
+        self.post_ota_report = None
 
     def perform_setup(self):
-        # Connect device to Wi-Fi
-        self.precon.wifi_setup()
-        
-        # Register device
-        self.precon.reg_device()
-        
+        # Connect Wi-Fi, register and set device flag 0 before OTA, skipping whatever the device already has
+        self.setup_plan = SetupPlanner(self.precon, DeviceSetup.PRE_OTA_STATE).execute()
+
         # Check device software version and store it
-        self.initial_version = self.precon.soft_version() 
-        
-        # Set device flag before OTA
-        self.precon.flag()
+        self.initial_version = self.precon.soft_version()
 
     def post_ota_actions(self):
+        """
+        Run the post-OTA steps as a dependency graph: independent steps run concurrently,
+        reboots run alone. The report with the critical path is kept in post_ota_report.
+        """
+        graph = StepGraph('post_ota_actions')
         # Verify the OTA update using the initial software version
-        self.verify_ota_update(self.device.get_software_version, self.initial_version)
-        
-        # Enabling Alexa
-        self.precon.alexa()
-        
-        # Set device flag to 440
-        self.precon.flag_440()
-        
-        # Take OOBE screen-shot
-        self.precon.screen_shooter()
-        
-        # To skip OOBE in MM devices
-        self.precon.skip_oobe()
-        
-        # Push and install apps
-        self.precon.push_app()
-        
+        graph.add('verify_version', lambda: self.verify_ota_update(self.device.get_software_version,
+                                                                   self.initial_version))
         # Boot utility check
-        self.precon.boot_utility()
+        graph.add('boot_utility', self.precon.boot_utility, requires=['verify_version'])
+        # Take OOBE screen-shot, before OOBE is skipped
+        graph.add('screenshot', self.precon.screen_shooter, requires=['verify_version'], resources=[USB])
+        # Enable Alexa, set device flag to 440 and skip OOBE in MM devices with one reboot
+        graph.add('device_setup', self.run_post_ota_plan, requires=['screenshot'], resources=[REBOOT])
+        # Push and install apps
+        graph.add('push_app', self.precon.push_app, requires=['verify_version'], resources=[USB])
+        try:
+            graph.run()
+        finally:
+            self.post_ota_report = graph.last_report
+
+    def run_post_ota_plan(self):
+        self.post_ota_plan = SetupPlanner(self.precon, DeviceSetup.POST_OTA_STATE).execute()
 
     def get_initial_software_version(self):
         """
@@ -54,24 +61,25 @@ class DeviceSetup:
         """
         return self.initial_version
     
-    def verify_ota_update(self, get_software_version, initial_version, retries=3):
+    def verify_ota_update(self, get_software_version, initial_version, retries=None):
         """
         Verify if the OTA update was successful by checking the software version.
-        Retries up to a specified number of attempts if the version has not changed.
+        Keeps checking until the version changes, following the 'ota_version_change' policy from config.ini.
         :param get_software_version: Function to get the current software version.
         :param initial_version: Software version before the OTA update.
-        :param retries: Number of retry attempts.
+        :param retries: Optional override of the maximum number of attempts.
         """
-        for attempt in range(retries):
+        def check_version():
             current_version = get_software_version()
-            logger.debug(f"Attempt {attempt + 1}: Software version after OTA: {current_version}")
-            if current_version != initial_version:
-                logger.info("OTA update successful. Software version changed.")
-                return True
-            else:
-                logger.warning(f"Attempt {attempt + 1}: Software version did not change.")
-                if attempt < retries - 1:
-                    time.sleep(60)  
-        else:
-            logger.error(f"OTA update failed. Software version did not change after {retries} attempts: {current_version}")
-            assert False, f"OTA update failed. Software version did not change: {current_version}"
+            logger.debug(f"Software version after OTA: {current_version}")
+            return current_version
+
+        policy = RetryPolicy.for_device('ota_version_change', max_attempts=retries)
+        current_version = policy.run(check_version, retry_on=lambda version: version == initial_version,
+                                     description='Waiting for software version change')
+        if current_version != initial_version:
+            self.final_version = current_version
+            logger.info("OTA update successful. Software version changed.")
+            return True
+        logger.error(f"OTA update failed. Software version did not change: {current_version}")
+        assert False, f"OTA update failed. Software version did not change: {current_version}"
@@ -0,0 +1,169 @@
+import threading
+import time
+from ota_framework.config.constants import (SystemCommands, DeviceCommands, WiFiCommands, RegistrationCommands,
+                                            OOBECommands, Profiles)
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.parsers import (parse_software_version, parse_product_name, parse_dev_flags, parse_boot_slots,
+                                         parse_net_status, parse_registration, parse_devconf_value, parse_kvs_value)
+from ota_framework.core.shell import Shell, current_serial, with_serial
+
+# Initialize the logger for this module
+logger = CustomLogger('DeviceSnapshotLogger')
+
+def parse_profile(product_name):
+    if product_name == Profiles.TV:
+        return Profiles.TV
+    if product_name in Profiles.MULTIMODAL:
+        return Profiles.MULTIMODAL
+    return None
+
+def parse_network(output):
+    """
+    :return: The NetState (network state and SSID) of `ace mw wifi get_net_state`, or None without a network state.
+    """
+    status = parse_net_status(output)
+    return status if status.state else None
+
+
+class DeviceSnapshot:
+    """
+    Cached view of device state, filled by one batched device query.
+
+    Every field has its own time-to-live in seconds (None means it never expires
+    on its own). Stale fields requested together are refreshed together in a
+    single Shell.execute_batch call. Reboots and flag changes invalidate the
+    snapshot through DeviceSnapshot.invalidate_device.
+    """
+    __slots__ = ('serial', 'ttls', 'software_version', 'product_name', 'profile', 'dev_flags',
+                 'boot_slots', 'net_state', 'registration', 'oobe_complete', 'user_setup_complete',
+                 '_fetched_at', '_lock')
+
+    FIELDS = ('software_version', 'product_name', 'profile', 'dev_flags', 'boot_slots', 'net_state', 'registration',
+              'oobe_complete', 'user_setup_complete')
+
+    # The hardware identity, the only state reboots and reflashes (factory resets) leave as it was
+    HARDWARE_FIELDS = ('product_name', 'profile')
+
+    # Field -> (command, parser). The profile is derived from the product name.
+    QUERIES = {
+        'software_version': (SystemCommands.SHOW_OS_RELEASE, parse_software_version),
+        'product_name': (SystemCommands.DEVICE_NAME, parse_product_name),
+        'dev_flags': (DeviceCommands.FLAG_CHECK, parse_dev_flags),
+        'boot_slots': (DeviceCommands.BOOT_CONTROL, parse_boot_slots),
+        'net_state': (WiFiCommands.VALIDATE, parse_network),
+        'registration': (RegistrationCommands.VALIDATE_REGISTRATION, parse_registration),
+        'oobe_complete': (SystemCommands.ALEXA_STATUS, parse_devconf_value),
+        'user_setup_complete': (OOBECommands.USER_SETUP_STATUS, parse_kvs_value),
+    }
+
+    DEFAULT_TTLS = {
+        'software_version': 300,
+        'product_name': None,
+        'profile': None,
+        'dev_flags': 300,
+        'boot_slots': 300,
+        'net_state': 10,
+        'registration': 60,
+        'oobe_complete': 300,
+        'user_setup_complete': 300,
+    }
+
+    _snapshots = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, serial=None, ttls=None):
+        """
+        :param serial: Device serial number, or None for the default device.
+        :param ttls: Optional per-field overrides of DEFAULT_TTLS.
+        """
+        self.serial = serial
+        self.ttls = dict(DeviceSnapshot.DEFAULT_TTLS, **(ttls or {}))
+        for field in DeviceSnapshot.FIELDS:
+            setattr(self, field, None)
+        self._fetched_at = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def for_device(serial=None):
+        """
+        Return the shared snapshot of a device, defaulting to the device of the current device_context.
+        """
+        serial = serial or current_serial()
+        with DeviceSnapshot._registry_lock:
+            snapshot = DeviceSnapshot._snapshots.get(serial)
+            if snapshot is None:
+                snapshot = DeviceSnapshot(serial)
+                DeviceSnapshot._snapshots[serial] = snapshot
+            return snapshot
+
+    @staticmethod
+    def invalidate_device(serial=None, fields=None):
+        """
+        Drop cached state of a device, e.g. after a reboot, a flash or a flag change.
+        :param fields: Fields to drop, defaults to every field but the HARDWARE_FIELDS.
+        """
+        serial = serial or current_serial()
+        with DeviceSnapshot._registry_lock:
+            snapshot = DeviceSnapshot._snapshots.get(serial)
+        if snapshot:
+            snapshot.invalidate(fields)
+
+    def is_fresh(self, field):
+        fetched_at = self._fetched_at.get(field)
+        if fetched_at is None:
+            return False
+        ttl = self.ttls.get(field)
+        return ttl is None or time.monotonic() - fetched_at < ttl
+
+    def invalidate(self, fields=None):
+        fields = fields or [field for field in DeviceSnapshot.FIELDS if field not in DeviceSnapshot.HARDWARE_FIELDS]
+        with self._lock:
+            for field in fields:
+                self._fetched_at.pop(field, None)
+
+    def refresh(self, fields=None):
+        """
+        Query the given fields (all by default) from the device in one round trip.
+        :return: The snapshot itself.
+        """
+        fields = list(fields or DeviceSnapshot.FIELDS)
+        if 'profile' in fields and 'product_name' not in fields:
+            fields.append('product_name')
+        queried = [field for field in DeviceSnapshot.QUERIES if field in fields]
+
+        with self._lock:
+            commands = [DeviceSnapshot.QUERIES[field][0] for field in queried]
+            if self.serial:
+                commands = [with_serial(command, self.serial) for command in commands]
+            results = Shell.execute_batch(commands, stop_on_error=False)
+            now = time.monotonic()
+            for field, result in zip(queried, results):
+                value = DeviceSnapshot.QUERIES[field][1](result['output'])
+                if value is None:
+                    if not result['success']:
+                        logger.warning(f"Snapshot query for {field} failed: {result['error']}")
+                    # Unknown now: a value from before e.g. a reflash must not be mistaken for the current one
+                    setattr(self, field, None)
+                    self._fetched_at.pop(field, None)
+                    if field == 'product_name':
+                        self.profile = None
+                        self._fetched_at.pop('profile', None)
+                    continue
+                setattr(self, field, value)
+                self._fetched_at[field] = now
+                if field == 'product_name':
+                    self.profile = parse_profile(value)
+                    self._fetched_at['profile'] = now
+        return self
+
+    def get(self, field):
+        """
+        Return a field, querying only that field from the device if it is stale.
+        Use refresh() to read several fields in one round trip.
+        """
+        if not self.is_fresh(field):
+            self.refresh([field])
+        return getattr(self, field)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in DeviceSnapshot.FIELDS}
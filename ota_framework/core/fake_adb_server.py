@@ -0,0 +1,209 @@
+import socketserver
+import struct
+import threading
+from ota_framework.core.adb_client import SHELL_STDOUT, SHELL_STDERR, SHELL_EXIT
+
+class FakeAdbServer:
+    """
+    In-process stand-in for the adb server, speaking enough of the host protocol
+    for AdbClient: host:version, host:devices, host:track-devices,
+    host:transport[-any], shell,v2 / shell:, exec: and sync: SEND/RECV/STAT.
+
+    Device commands are answered by `handler(serial, command)`, which returns
+    (exit_code, stdout_bytes, stderr_bytes). Pushed files are kept in `files`,
+    keyed by (serial, path).
+    """
+    VERSION = 41
+
+    def __init__(self, devices=None, handler=None, host='127.0.0.1', port=0):
+        """
+        :param devices: Mapping of serial to state, e.g. {'G070VM1234': 'device'}.
+        :param handler: Callable answering device shell commands.
+        """
+        self.devices = dict(devices or {})
+        self.handler = handler or (lambda serial, command: (0, b'', b''))
+        self.files = {}
+        self._changed = threading.Condition()
+        self._generation = 0
+        self._server = socketserver.ThreadingTCPServer((host, port), self._make_request_handler(), bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self._generation = -1
+            self._changed.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def set_device_state(self, serial, state):
+        """
+        Change (or remove, with state None) a device and notify track-devices listeners.
+        """
+        with self._changed:
+            if state is None:
+                self.devices.pop(serial, None)
+            else:
+                self.devices[serial] = state
+            self._generation += 1
+            self._changed.notify_all()
+
+    def device_list(self):
+        return ''.join(f"{serial}\t{state}\n" for serial, state in self.devices.items())
+
+    def _make_request_handler(self):
+        server = self
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                self.serial = None
+                try:
+                    while True:
+                        request = self.read_request()
+                        if request is None or not server._serve(self, request):
+                            return
+                except (ConnectionError, OSError):
+                    return
+
+            def recv_exact(self, size):
+                data = bytearray()
+                while len(data) < size:
+                    chunk = self.request.recv(size - len(data))
+                    if not chunk:
+                        raise ConnectionError("client closed connection")
+                    data.extend(chunk)
+                return bytes(data)
+
+            def read_request(self):
+                try:
+                    length = int(self.recv_exact(4), 16)
+                except ConnectionError:
+                    return None
+                return self.recv_exact(length).decode()
+
+            def okay(self, payload=None):
+                self.request.sendall(b'OKAY' + (b'' if payload is None else b'%04x' % len(payload) + payload))
+
+            def fail(self, message):
+                message = message.encode()
+                self.request.sendall(b'FAIL' + b'%04x' % len(message) + message)
+
+        return RequestHandler
+
+    def _serve(self, conn, request):
+        """
+        Answer one request. Returns True if the connection stays open for another request.
+        """
+        if request == 'host:version':
+            conn.okay(b'%04x' % self.VERSION)
+            return False
+        if request in ('host:devices', 'host:devices-l'):
+            conn.okay(self.device_list().encode())
+            return False
+        if request == 'host:track-devices':
+            conn.okay()
+            self._track(conn)
+            return False
+        if request.startswith('host:transport'):
+            serial = None if request == 'host:transport-any' else request.split(':', 2)[2]
+            online = [s for s, state in self.devices.items() if state == 'device']
+            if serial is None and len(online) == 1:
+                serial = online[0]
+            if serial is None:
+                conn.fail('more than one device/emulator' if online else 'no devices/emulators found')
+                return False
+            if self.devices.get(serial) != 'device':
+                conn.fail(f"device '{serial}' not found")
+                return False
+            conn.serial = serial
+            conn.okay()
+            return True
+        if conn.serial is None:
+            conn.fail(f"unknown host service {request}")
+            return False
+        if request.startswith('shell,v2'):
+            command = request.split(':', 1)[1]
+            # The server accepts the service before the command runs, as adbd does
+            conn.okay()
+            exit_code, stdout, stderr = self.handler(conn.serial, command)
+            for packet_id, data in ((SHELL_STDOUT, stdout), (SHELL_STDERR, stderr)):
+                if data:
+                    conn.request.sendall(struct.pack('<BI', packet_id, len(data)) + data)
+            conn.request.sendall(struct.pack('<BIB', SHELL_EXIT, 1, exit_code & 0xff))
+            return False
+        if request.startswith('shell:') or request.startswith('exec:'):
+            command = request.split(':', 1)[1]
+            conn.okay()
+            _, stdout, stderr = self.handler(conn.serial, command)
+            conn.request.sendall(stdout + (stderr if request.startswith('shell:') else b''))
+            return False
+        if request == 'sync:':
+            conn.okay()
+            self._sync(conn)
+            return False
+        conn.fail(f"unknown service {request}")
+        return False
+
+    def _track(self, conn):
+        generation = None
+        while True:
+            with self._changed:
+                while generation == self._generation:
+                    self._changed.wait()
+                if self._generation < 0:
+                    return
+                generation = self._generation
+                payload = self.device_list().encode()
+            conn.request.sendall(b'%04x' % len(payload) + payload)
+
+    def _sync(self, conn):
+        while True:
+            header = conn.recv_exact(8)
+            command, length = header[:4], struct.unpack('<I', header[4:])[0]
+            if command == b'QUIT':
+                return
+            if command == b'SEND':
+                path = conn.recv_exact(length).decode().rsplit(',', 1)[0]
+                chunks = []
+                while True:
+                    header = conn.recv_exact(8)
+                    kind, size = header[:4], struct.unpack('<I', header[4:])[0]
+                    if kind == b'DONE':
+                        break
+                    chunks.append(conn.recv_exact(size))
+                self.files[(conn.serial, path)] = b''.join(chunks)
+                conn.request.sendall(b'OKAY' + struct.pack('<I', 0))
+            elif command == b'RECV':
+                path = conn.recv_exact(length).decode()
+                content = self.files.get((conn.serial, path))
+                if content is None:
+                    message = b'No such file or directory'
+                    conn.request.sendall(b'FAIL' + struct.pack('<I', len(message)) + message)
+                    continue
+                for offset in range(0, len(content), 64 * 1024):
+                    chunk = content[offset:offset + 64 * 1024]
+                    conn.request.sendall(b'DATA' + struct.pack('<I', len(chunk)) + chunk)
+                conn.request.sendall(b'DONE' + struct.pack('<I', 0))
+            elif command == b'STAT':
+                path = conn.recv_exact(length).decode()
+                content = self.files.get((conn.serial, path))
+                mode, size = (0o100644, len(content)) if content is not None else (0, 0)
+                conn.request.sendall(b'STAT' + struct.pack('<III', mode, size, 0))
+            else:
+                return
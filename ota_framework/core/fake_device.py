@@ -0,0 +1,696 @@
+import contextvars
+import hashlib
+import os
+import queue
+import re
+import shlex
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from ota_framework.config.constants import AppCommands
+from ota_framework.core.context import cancelled_result, is_cancelled, remaining_time, timed_out_result
+from ota_framework.core.shell import ADB_SHELL_PATTERN, ADB_EXEC_OUT_PATTERN, ADB_TRANSFER_PATTERN, BATCH_NOT_EXECUTED
+
+# `adb -s <serial> devices` still lists every device
+ADB_DEVICES_PATTERN = re.compile(r'^adb(?:\s+-s\s+\S+)?\s+devices$')
+ADB_GET_STATE_PATTERN = re.compile(r'^adb(?:\s+-s\s+(?P<serial>\S+))?\s+get-state$')
+FLASH_PATTERN = re.compile(r'^python3\s+flashimage\.py\s+--aserial=(?P<serial>\S+)')
+
+# Seconds between deadline and cancellation checks while a simulated command waits
+INTERRUPT_CHECK_INTERVAL = 0.02
+
+# (serial, start time) of the simulated command being answered in this context, see FakeDevice.answering
+_answering = contextvars.ContextVar('answering', default=None)
+
+class CommandInterrupted(Exception):
+    """
+    Raised out of a simulated command stopped by its deadline or a device cancellation.
+    `result` holds the timed out or cancelled result dictionary.
+    """
+    def __init__(self, result):
+        super().__init__(result['error'])
+        self.result = result
+
+
+class LatencyProfile:
+    """
+    Simulated durations in seconds. Every value is multiplied by `scale`, so a
+    benchmark can keep realistic proportions while running much faster than real time.
+    """
+    DEFAULTS = {
+        'command': 0.05,
+        'wifi_scan': 2.0,
+        'wifi_connect': 3.0,
+        'register': 4.0,
+        'reboot': 35.0,
+        'screenshot': 0.5,
+        'push_per_mb': 0.1,
+        'install': 5.0,
+        'flash': 300.0,
+        'ota_sync': 5.0,
+        'ota_download': 240.0,
+        'ota_verify': 20.0,
+        'ota_install': 180.0,
+    }
+
+    def __init__(self, scale=1.0, **overrides):
+        self.scale = scale
+        self.values = dict(LatencyProfile.DEFAULTS, **overrides)
+
+    def __getattr__(self, name):
+        try:
+            return self.values[name] * self.scale
+        except KeyError:
+            raise AttributeError(name)
+
+
+def fake_png(seed):
+    """
+    Return a tiny valid PNG whose pixel depends on `seed`.
+    """
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+    pixel = bytes([0, seed % 256, (seed * 7) % 256, (seed * 13) % 256])
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(pixel)) + chunk(b'IEND', b''))
+
+
+class FakeDevice:
+    """
+    Simulated Vega OS device answering the device-side command strings from
+    config.constants (ace mw wifi/map/ota, vdcm, idme, boot_control_utility,
+    systemctl, screenshooter, vpm) with realistic outputs and latencies.
+    """
+    SOFTWARE_VERSION_KEY = 'com.amazon.devconf/system/device-info/software-version'
+    OOBE_KEY = 'com.amazon.devconf/system/oobe/oobe-complete'
+
+    def __init__(self, serial, product_name='galileo', software_version='5076', latency=None, ota_version=None):
+        """
+        :param serial: Device serial number.
+        :param product_name: PRODUCT_NAME reported by device_info.
+        :param software_version: Build number the device starts on.
+        :param latency: LatencyProfile for command and state transition durations.
+        :param ota_version: Build number an OTA updates to, defaults to software_version + 1.
+        """
+        self.serial = serial
+        self.product_name = product_name
+        self.software_version = software_version
+        self.ota_version = ota_version or str(int(software_version) + 1)
+        self.latency = latency or LatencyProfile()
+        self.lock = threading.RLock()
+        self.online = True
+        self.booted_at = 0.0
+        self.boot_count = 0
+        self.dev_flags = '0x0'
+        self.saved_networks = {}
+        self.connected_ssid = None
+        self.registered_user = None
+        self.kvs = {}
+        self.devconf = {FakeDevice.OOBE_KEY: 'false'}
+        self.active_slot = '_a'
+        self.files = {}
+        self.installed_apps = set()
+        self.ota_state = 'IDLE'
+        self.ota_synced = False
+        self.ota_bytes = 0
+        self.ota_total = 734003200
+        self.ota_error = 0
+        self.ota_fail_phase = None
+        self.screenshots = 0
+        self.commands = []
+        self._journal_listeners = []
+
+    # ------------------------------------------------------------------ state helpers
+
+    def is_booted(self):
+        return self.online and time.monotonic() >= self.booted_at
+
+    def adb_state(self):
+        return 'device' if self.online else None
+
+    def screen(self):
+        """
+        :return: A number standing for what the screen shows, it only changes with the device state.
+        """
+        return zlib.crc32(f"{self.boot_count}:{self.ota_state}:{self.active_slot}".encode())
+
+    @contextmanager
+    def answering(self):
+        """
+        Mark the block as answering a command for this device: its simulated waits end early
+        when the enclosing deadline passes or the device is cancelled, as a real command would
+        be stopped. Background transitions (reboot, OTA) are never interrupted.
+        """
+        token = _answering.set((self.serial, time.monotonic()))
+        try:
+            yield
+        finally:
+            _answering.reset(token)
+
+    def _sleep(self, seconds):
+        answering = _answering.get()
+        if answering is None or answering[0] != self.serial:
+            if seconds > 0:
+                time.sleep(seconds)
+            return
+        end = time.monotonic() + seconds
+        while True:
+            if is_cancelled(self.serial):
+                raise CommandInterrupted(cancelled_result(self.serial))
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise CommandInterrupted(timed_out_result(time.monotonic() - answering[1]))
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            time.sleep(min(left, INTERRUPT_CHECK_INTERVAL, left if remaining is None else remaining))
+
+    def journal(self, message):
+        """
+        Emit an ace_otad journal line to every follower.
+        """
+        line = f"{time.strftime('%b %d %H:%M:%S')} {self.product_name} ace_otad[812]: {message}\n"
+        for listener in list(self._journal_listeners):
+            listener.put(line)
+
+    def follow_journal(self):
+        listener = queue.Queue()
+        self._journal_listeners.append(listener)
+        return listener
+
+    def unfollow_journal(self, listener):
+        if listener in self._journal_listeners:
+            self._journal_listeners.remove(listener)
+
+    def reboot(self, delay=0.0):
+        """
+        Drop off adb, then come back and finish booting after the reboot latency.
+        """
+        def run():
+            self._sleep(delay)
+            with self.lock:
+                self.online = False
+                for listener in list(self._journal_listeners):
+                    # Followers lose the connection with the device
+                    listener.put(None)
+                self._journal_listeners.clear()
+                self.connected_ssid = None
+            self._sleep(self.latency.reboot * 0.6)
+            with self.lock:
+                self.online = True
+                self.boot_count += 1
+                self.booted_at = time.monotonic() + self.latency.reboot * 0.4
+                if self.connected_ssid is None and self.saved_networks:
+                    self.connected_ssid = next(iter(self.saved_networks))
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def flash(self, software_version):
+        """
+        Reflash the device: factory state on the given build.
+        """
+        self._sleep(self.latency.flash)
+        with self.lock:
+            self.software_version = software_version
+            self.ota_version = str(int(software_version) + 1)
+            self.dev_flags = '0x0'
+            self.saved_networks.clear()
+            self.connected_ssid = None
+            self.registered_user = None
+            self.kvs.clear()
+            self.devconf[FakeDevice.OOBE_KEY] = 'false'
+            self.active_slot = '_a'
+            self.installed_apps.clear()
+            self.ota_state = 'IDLE'
+            self.ota_synced = False
+        self.reboot()
+
+    def _run_ota(self):
+        phases = (
+            ('DOWNLOADING', "Download started for package {version}", self.latency.ota_download),
+            ('VERIFYING', "Verifying package signature", self.latency.ota_verify),
+            ('INSTALLING', "Installing update to slot {slot}", self.latency.ota_install),
+        )
+        other_slot = '_b' if self.active_slot == '_a' else '_a'
+        for state, message, duration in phases:
+            with self.lock:
+                self.ota_state = state
+            self.journal(message.format(version=self.ota_version, slot=other_slot))
+            if self.ota_fail_phase == state:
+                with self.lock:
+                    self.ota_state = 'FAILED'
+                    self.ota_error = 7
+                self.journal(f"{state.capitalize()} failed, error code: 7")
+                return
+            steps = 10 if state == 'DOWNLOADING' else 1
+            for step in range(steps):
+                self._sleep(duration / steps)
+                if state == 'DOWNLOADING':
+                    with self.lock:
+                        self.ota_bytes = self.ota_total * (step + 1) // steps
+                    self.journal(f"Download progress {(step + 1) * 100 // steps}%")
+        with self.lock:
+            self.ota_state = 'REBOOT_REQUIRED'
+            self.software_version = self.ota_version
+            self.ota_version = str(int(self.ota_version) + 1)
+            self.active_slot = other_slot
+        self.journal("Install complete, reboot required")
+        self.reboot(delay=self.latency.command)
+
+    # ------------------------------------------------------------------ command handling
+
+    def handle(self, command):
+        """
+        Answer one device-side command, as if run by the device shell.
+        :return: A tuple of (exit_code, stdout, stderr) strings.
+        """
+        if not self.online:
+            return 1, '', f"error: device '{self.serial}' not found\n"
+        self.commands.append(command)
+        with self.answering():
+            return self._handle(command)
+
+    def _handle(self, command):
+        self._sleep(self.latency.command)
+
+        # Host pipes like `idme print | grep flags` are applied to the simulated output, standing in
+        # for Shell.pipe_on_host on the session and native backends
+        command, _, grep = command.partition(' | grep ')
+        exit_code, output, error = self._dispatch(command.strip())
+        if grep:
+            pattern = shlex.split(grep)[-1]
+            output = ''.join(line for line in output.splitlines(True) if pattern in line)
+            exit_code = 0 if output else 1
+        return exit_code, output, error
+
+    def _dispatch(self, command):
+        try:
+            argv = shlex.split(command)
+        except ValueError as e:
+            return 2, '', f"sh: syntax error: {e}\n"
+        if not argv:
+            return 0, '', ''
+        name, args = argv[0], argv[1:]
+
+        if name == 'ace' and args[:2] == ['mw', 'wifi']:
+            return self._wifi(args[2:])
+        if name == 'ace' and args[:2] == ['mw', 'map']:
+            return self._map(args[2:])
+        if name == 'ace' and args[:2] == ['mw', 'ota']:
+            return self._ota(args[2:])
+        if name == 'ace' and args[:3] == ['hal', 'device_info', 'cli']:
+            return 0, (f"PRODUCT_NAME={self.product_name}\nDEVICE_TYPE=A1EXAMPLE\n"
+                       f"DEVICE_SERIAL_NUMBER={self.serial}\n"), ''
+        if name == 'ace' and args[:3] == ['hal', 'kvs', 'cli']:
+            if '-k' in args and '-v' in args:
+                self.kvs[args[args.index('-k') + 1]] = args[args.index('-v') + 1]
+                return 0, "OK\n", ''
+            if '-g' in args and '-k' in args:
+                key = args[args.index('-k') + 1]
+                if key not in self.kvs:
+                    return 1, '', f"kvs: key {key} not found\n"
+                return 0, f"{self.kvs[key]}\n", ''
+            return 1, '', "kvs: missing key or value\n"
+        if name == 'vdcm':
+            return self._vdcm(args)
+        if name == 'idme':
+            if args[:1] == ['dev_flags'] and len(args) == 2:
+                self.dev_flags = args[1] if args[1] != '0' else '0x0'
+                return 0, f"dev_flags set to {args[1]}\n", ''
+            if args[:1] == ['print']:
+                return 0, (f"serial: {self.serial}\nproductid: {self.product_name}\n"
+                           f"dev_flags: {self.dev_flags if self.dev_flags != '0x0' else '0'}\nmac_addr: 00:11:22:33:44:55\n"), ''
+        if name == 'reboot':
+            self.reboot(delay=self.latency.command)
+            return 0, '', ''
+        if name == 'boot_control_utility':
+            rows = [('_a', 'Yes', 'Yes', 'Yes' if self.active_slot == '_a' else 'No'),
+                    ('_b', 'Yes', 'Yes', 'Yes' if self.active_slot == '_b' else 'No')]
+            table = "Slot Bootable Successful Active\n" + ''.join(' '.join(row) + '\n' for row in rows)
+            return 0, table, ''
+        if name == 'systemctl' and args == ['is-system-running']:
+            if self.is_booted():
+                return 0, "running\n", ''
+            return 1, "starting\n", ''
+        if name == 'screenshooter' and len(args) == 2 and args[0] == '-r':
+            self._sleep(self.latency.screenshot)
+            self.screenshots += 1
+            if args[1] == '/dev/stdout':
+                return 0, fake_png(self.screen()).decode('latin-1'), ''
+            self.files[args[1]] = fake_png(self.screen())
+            return 0, f"Screenshot saved to {args[1]}\n", ''
+        if name == 'sha256sum' and args:
+            content = self.files.get(args[0])
+            if content is None:
+                return 1, '', f"sha256sum: {args[0]}: No such file or directory\n"
+            return 0, f"{hashlib.sha256(content).hexdigest()}  {args[0]}\n", ''
+        if name == 'vpm':
+            return self._vpm(args)
+        if name == 'vlcm' and args[:1] == ['launch-app']:
+            return 0, f"Launched {args[1]}\n", ''
+        if name == 'cat' and args:
+            content = self.files.get(args[0])
+            if content is None:
+                return 1, '', f"cat: {args[0]}: No such file or directory\n"
+            return 0, content.decode('latin-1'), ''
+        if name == 'rm':
+            for path in args:
+                self.files.pop(path, None)
+            return 0, '', ''
+        if name in ('true', 'echo'):
+            return 0, ' '.join(args) + '\n' if name == 'echo' else '', ''
+        return 127, '', f"sh: {name}: not found\n"
+
+    def _wifi(self, args):
+        action = args[0] if args else ''
+        if action == 'scan':
+            self._sleep(self.latency.wifi_scan)
+            return 0, "Scan started\n", ''
+        if action == 'get_scan_results':
+            return 0, ("bssid / frequency / signal level / flags / ssid\n"
+                       "a0:b1:c2:d3:e4:f5  5180  -45  [WPA2-PSK-CCMP][ESS]  Guest\n"
+                       "a0:b1:c2:d3:e4:f6  2437  -60  [WPA2-PSK-CCMP][ESS]  Lab-2G\n"), ''
+        if action == 'add_network':
+            fields = dict(arg.split('=', 1) for arg in args[1:] if '=' in arg)
+            self.saved_networks[fields.get('ssid')] = fields.get('psk')
+            return 0, f"Network added: id={len(self.saved_networks) - 1}\n", ''
+        if action == 'get_config':
+            return 0, ''.join(f"ssid={ssid} security=WPA2\n" for ssid in self.saved_networks), ''
+        if action == 'connect' and len(args) > 1:
+            if args[1] not in self.saved_networks:
+                return 1, '', f"Network {args[1]} is not configured\n"
+            self._sleep(self.latency.wifi_connect)
+            self.connected_ssid = args[1]
+            return 0, f"Connecting to {args[1]}\n", ''
+        if action == 'save_config':
+            return 0, "Configuration saved\n", ''
+        if action == 'get_net_state':
+            if self.connected_ssid:
+                return 0, f"networkState: CONNECTED\nssid: {self.connected_ssid}\n", ''
+            return 0, "networkState: DISCONNECTED\n", ''
+        return 1, '', f"Unknown wifi command {action}\n"
+
+    def _map(self, args):
+        if args == ['-y']:
+            if self.registered_user:
+                return 0, f"DEVICE_REGISTERED user={self.registered_user}\n", ''
+            return 0, "DEVICE_NOT_REGISTERED\n", ''
+        if '-u' in args and '-p' in args:
+            if not self.connected_ssid:
+                return 1, '', "Registration failed: no network\n"
+            self._sleep(self.latency.register)
+            self.registered_user = args[args.index('-u') + 1]
+            return 0, "Registration successful\n", ''
+        return 1, '', "Usage: map -u <user> -p <password> | -y\n"
+
+    def _ota(self, args):
+        action = args[0] if args else ''
+        if action == 'forceSync':
+            self._sleep(self.latency.ota_sync)
+            self.ota_synced = True
+            self.journal(f"forceSync requested, update {self.ota_version} available")
+            return 0, "Sync requested\n", ''
+        if action == 'forceUpdate':
+            return 0, "Update forced\n", ''
+        if action == 'start':
+            if not self.ota_synced:
+                return 1, '', "No update available\n"
+            if self.ota_state in ('DOWNLOADING', 'VERIFYING', 'INSTALLING'):
+                return 0, "Update already in progress\n", ''
+            self.ota_synced = False
+            self.ota_bytes = 0
+            self.ota_error = 0
+            thread = threading.Thread(target=self._run_ota)
+            thread.daemon = True
+            thread.start()
+            return 0, "Update started\n", ''
+        if action == 'show_status':
+            return 0, (f"state: {self.ota_state}\ntargetVersion: {self.ota_version}\n"
+                       f"bytesDownloaded: {self.ota_bytes}\ntotalBytes: {self.ota_total}\n"
+                       f"errorCode: {self.ota_error}\n"), ''
+        return 1, '', f"Unknown ota command {action}\n"
+
+    def _vdcm(self, args):
+        if args[:1] == ['get'] and len(args) == 2:
+            key = args[1]
+            value = self.software_version if key == FakeDevice.SOFTWARE_VERSION_KEY else self.devconf.get(key)
+            if value is None:
+                return 1, '', f"'{key}' not found\n"
+            return 0, f"'{key}' = '{value}'\n", ''
+        if args[:1] == ['set'] and len(args) == 3:
+            self.devconf[args[1]] = args[2]
+            return 0, f"'{args[1]}' successfully set to '{args[2]}'\n", ''
+        return 1, '', "Usage: vdcm get <key> | set <key> <value>\n"
+
+    def _vpm(self, args):
+        if args[:1] == ['install'] and len(args) == 2:
+            if args[1] not in self.files:
+                return 1, '', f"Package {args[1]} not found\n"
+            self._sleep(self.latency.install)
+            # Real packages carry their id in the manifest, simulated ones are named after the artifact
+            stem = os.path.basename(args[1]).rsplit('.', 1)[0]
+            self.installed_apps.add(AppCommands.PACKAGE_ID_PATTERN.format(app_name=stem))
+            return 0, f"Installed {args[1]}\n", ''
+        if args[:2] == ['list', 'apps']:
+            return 0, ''.join(f"{app}\n" for app in sorted(self.installed_apps)), ''
+        if args[:1] == ['set'] and args[1:2] == ['default']:
+            return 0, "Default set\n", ''
+        return 1, '', "Usage: vpm install|list|set\n"
+
+
+class FakeProcess:
+    """
+    Popen-like stand-in streaming a device's journal lines, used for follow-mode commands.
+    """
+    def __init__(self, device, listener, pattern=None):
+        read_fd, self._write_fd = os.pipe()
+        self.stdout = os.fdopen(read_fd, 'rb')
+        self.returncode = None
+        self._device = device
+        self._listener = listener
+        self._pattern = pattern
+        self._thread = threading.Thread(target=self._pump)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _pump(self):
+        with os.fdopen(self._write_fd, 'wb') as pipe:
+            while True:
+                line = self._listener.get()
+                if line is None:
+                    break
+                if self._pattern and self._pattern not in line:
+                    continue
+                try:
+                    pipe.write(line.encode())
+                    pipe.flush()
+                except OSError:
+                    break
+        self.returncode = 0
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.returncode
+
+    def terminate(self):
+        self._device.unfollow_journal(self._listener)
+        self._listener.put(None)
+
+    kill = terminate
+
+
+class FakeDeviceFarm:
+    """
+    A set of FakeDevices answering host-side command strings: adb devices,
+    adb [-s serial] get-state/shell/push/pull, and python3 flashimage.py.
+    Install with Shell.use_simulator(farm), or serve it over the adb protocol
+    with FakeAdbServer(handler=farm.adb_handler).
+    """
+    def __init__(self, devices=None):
+        self.devices = {device.serial: device for device in (devices or [])}
+
+    @staticmethod
+    def create(count, latency=None, product_name='galileo', software_version='5076', prefix='SIM'):
+        """
+        Build a farm of `count` identical devices named <prefix>0000, <prefix>0001, ...
+        """
+        return FakeDeviceFarm([FakeDevice(f"{prefix}{index:04d}", product_name=product_name,
+                                          software_version=software_version, latency=latency)
+                               for index in range(count)])
+
+    def device(self, serial):
+        if serial is None:
+            if len(self.devices) != 1:
+                return None
+            return next(iter(self.devices.values()))
+        return self.devices.get(serial)
+
+    @staticmethod
+    def _result(exit_code, output, error):
+        return {'success': exit_code == 0, 'output': output, 'error': error}
+
+    def execute_command(self, command, cwd=None):
+        """
+        Answer a host-side command string the way Shell.execute_command would.
+        :return: A dictionary with 'success', 'output', and 'error' keys, plus 'timed_out' or
+                 'cancelled' when the command was interrupted.
+        """
+        try:
+            return self._execute_command(command.strip(), cwd)
+        except CommandInterrupted as e:
+            return e.result
+
+    def _execute_command(self, command, cwd):
+        if ADB_DEVICES_PATTERN.match(command):
+            lines = ''.join(f"{serial}\tdevice\n" for serial, device in self.devices.items() if device.online)
+            return self._result(0, f"List of devices attached\n{lines}\n", '')
+
+        match = ADB_GET_STATE_PATTERN.match(command)
+        if match:
+            device = self.device(match.group('serial'))
+            if device and device.online:
+                return self._result(0, "device\n", '')
+            return self._result(1, '', f"error: device '{match.group('serial')}' not found\n")
+
+        match = ADB_SHELL_PATTERN.match(command) or ADB_EXEC_OUT_PATTERN.match(command)
+        if match:
+            device = self.device(match.group('serial'))
+            if device is None:
+                return self._result(1, '', "error: no devices/emulators found\n")
+            return self._result(*device.handle(match.group('command')))
+
+        match = ADB_TRANSFER_PATTERN.match(command)
+        if match:
+            return self._transfer(match.group('serial'), match.group('direction'), shlex.split(match.group('paths')))
+
+        match = FLASH_PATTERN.match(command)
+        if match:
+            device = self.devices.get(match.group('serial'))
+            if device is None:
+                return self._result(1, '', f"Device {match.group('serial')} not found\n")
+            version = re.search(r'(\d+)/?$', cwd or '')
+            with device.answering():
+                device.flash(version.group(1) if version else device.software_version)
+            return self._result(0, "Flashing complete\n", '')
+
+        return self._result(127, '', f"sh: 1: {command.split()[0]}: not found\n")
+
+    def _transfer(self, serial, direction, paths):
+        device = self.device(serial)
+        if device is None or not device.online:
+            return self._result(1, '', "error: no devices/emulators found\n")
+        if len(paths) < 2:
+            return self._result(1, '', f"adb: {direction} requires an argument\n")
+        sources, destination = paths[:-1], paths[-1]
+        for source in sources:
+            if direction == 'push':
+                with open(source, 'rb') as file:
+                    content = file.read()
+                with device.answering():
+                    device._sleep(device.latency.push_per_mb * len(content) / (1024 * 1024))
+                device.files[destination] = content
+            else:
+                target = destination
+                if len(sources) > 1:
+                    if not os.path.isdir(destination):
+                        return self._result(1, '', f"adb: error: target '{destination}' is not a directory\n")
+                    target = os.path.join(destination, os.path.basename(source))
+                content = device.files.get(source)
+                if content is None:
+                    return self._result(1, '', f"adb: error: remote object '{source}' does not exist\n")
+                with open(target, 'wb') as file:
+                    file.write(content)
+        return self._result(0, f"{len(sources)} file(s) {direction}ed.\n", '')
+
+    def execute_batch(self, serial, device_commands, delays, stop_on_error):
+        """
+        Answer a batch of device-side commands in one simulated round trip.
+        :return: A list of result dictionaries, one per command.
+        """
+        device = self.device(serial)
+        results = []
+        interrupted = None
+        for index, command in enumerate(device_commands):
+            if interrupted:
+                # Like a batch script stopped before reaching the command
+                results.append(dict(interrupted, output=''))
+                continue
+            if device is None or (results and stop_on_error and not results[-1]['success']):
+                results.append(self._result(1, '', BATCH_NOT_EXECUTED if device else "error: no devices/emulators found\n"))
+                continue
+            try:
+                results.append(self._result(*device.handle(command)))
+                if delays[index]:
+                    with device.answering():
+                        device._sleep(delays[index] * device.latency.scale)
+            except CommandInterrupted as e:
+                interrupted = e.result
+                if len(results) == index:
+                    results.append(interrupted)
+        return results
+
+    def start_process(self, command):
+        """
+        Start a follow-mode command. Only `journalctl -f` (optionally piped to grep) is supported.
+        """
+        match = ADB_SHELL_PATTERN.match(command.strip())
+        device = self.device(match.group('serial')) if match else None
+        if device is None or 'journalctl' not in command:
+            raise Exception(f"Simulator cannot stream command: {command}")
+        pattern = command.rsplit('grep', 1)[1].split()[-1] if 'grep' in command else None
+        return FakeProcess(device, device.follow_journal(), pattern)
+
+    def device_list(self):
+        """
+        :return: A list of (serial, state) tuples of the devices adb would list.
+        """
+        return [(serial, device.adb_state()) for serial, device in self.devices.items() if device.adb_state()]
+
+    def track_devices(self, heartbeat=None, interval=0.02):
+        """
+        Same contract as AdbClient.track_devices: yield the device list whenever it changes.
+        The simulated devices are polled every `interval` seconds. A reboot shorter than
+        the interval is still reported as the device dropping off, as a real adb server would.
+        """
+        last = None
+        quiet_since = time.monotonic()
+        boots = {serial: device.boot_count for serial, device in self.devices.items()}
+        seen_offline = set()
+        while True:
+            devices = self.device_list()
+            listed = dict(devices)
+            seen_offline.update(serial for serial in self.devices if listed.get(serial) != 'device')
+            missed = [serial for serial, device in self.devices.items()
+                      if device.boot_count != boots.get(serial) and serial not in seen_offline]
+            for serial, device in self.devices.items():
+                if device.boot_count != boots.get(serial):
+                    boots[serial] = device.boot_count
+                    seen_offline.discard(serial)
+            if missed and last is not None:
+                last = [(serial, state) for serial, state in devices if serial not in missed]
+                yield last
+            if devices != last:
+                last = devices
+                quiet_since = time.monotonic()
+                yield devices
+            elif heartbeat is not None and time.monotonic() - quiet_since >= heartbeat:
+                quiet_since = time.monotonic()
+                yield None
+            time.sleep(interval)
+
+    def adb_handler(self, serial, command):
+        """
+        Handler for FakeAdbServer, answering shell commands with bytes.
+        """
+        device = self.device(serial)
+        try:
+            exit_code, output, error = device.handle(command)
+        except CommandInterrupted as e:
+            return 1, b'', e.result['error'].encode()
+        return exit_code, output.encode('latin-1'), error.encode()
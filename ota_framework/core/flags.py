@@ -1,50 +1,41 @@
 from ota_framework.core.shell import Shell
 from ota_framework.config.constants import DeviceCommands
 from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.parsers import parse_dev_flags_value
+from ota_framework.core.reboot_scheduler import RebootScheduler
 
 # Initialize the logger for this module
 logger = CustomLogger('FlagsLogger')
 
 class Flags:
+    @staticmethod
+    def _set_flag(value, command, validate, scheduler):
+        own = scheduler is None
+        scheduler = RebootScheduler() if own else scheduler
+        scheduler.require(f"dev_flags {value}", [command], validate)
+        if not own:
+            return {'success': True, 'output': f"dev_flags {value} staged for the next reboot", 'error': ''}
+        return scheduler.commit()
+
     @staticmethod
     @logger.log_decorator(level='info')
-    def set_flag_0():
+    def set_flag_0(scheduler=None):
         """
         Set the device flag to 0, reboot, and validate.
+        :param scheduler: Optional RebootScheduler: the flag is only staged and takes effect with its next commit().
         :return: A dictionary with 'success', 'output', and 'error' keys.
         """
-        # Set the flag to 0
-        result = Shell.execute_command(DeviceCommands.FLAG_0)
-        if not result['success']:
-            return result
-        
-        # Reboot the device
-        reboot_result = Shell.execute_command(DeviceCommands.REBOOT)
-        if not reboot_result['success']:
-            return reboot_result
-        
-        # Validate the flag setting
-        return Flags.validate_flag_0()
+        return Flags._set_flag('0', DeviceCommands.FLAG_0, Flags.validate_flag_0, scheduler)
 
     @staticmethod
     @logger.log_decorator(level='info')
-    def set_flag_440():
+    def set_flag_440(scheduler=None):
         """
         Set the device flag to 0x440, reboot, and validate.
+        :param scheduler: Optional RebootScheduler: the flag is only staged and takes effect with its next commit().
         :return: A dictionary with 'success', 'output', and 'error' keys.
         """
-        # Set the flag to 0x440
-        result = Shell.execute_command(DeviceCommands.FLAG_440)
-        if not result['success']:
-            return result
-        
-        # Reboot the device
-        reboot_result = Shell.execute_command(DeviceCommands.REBOOT)
-        if not reboot_result['success']:
-            return reboot_result
-        
-        # Validate the flag setting
-        return Flags.validate_flag_440()
+        return Flags._set_flag('0x440', DeviceCommands.FLAG_440, Flags.validate_flag_440, scheduler)
 
     @staticmethod
     @logger.log_decorator(level='info')
@@ -55,7 +46,8 @@ class Flags:
         """
         validate_command = DeviceCommands.FLAG_CHECK
         validation_result = Shell.execute_command(validate_command)
-        if 'dev_flags: 0' in validation_result['output']:
+        # Compared as a number: a substring test would also accept e.g. 'dev_flags: 0x440'
+        if parse_dev_flags_value(validation_result['output']) == 0:
             validation_result['success'] = True
         else:
             validation_result['success'] = False
@@ -71,7 +63,7 @@ class Flags:
         """
         validate_command = DeviceCommands.FLAG_CHECK
         validation_result = Shell.execute_command(validate_command)
-        if 'dev_flags: 0x440' in validation_result['output']:
+        if parse_dev_flags_value(validation_result['output']) == 0x440:
             validation_result['success'] = True
         else:
             validation_result['success'] = False
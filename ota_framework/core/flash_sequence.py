@@ -1,10 +1,14 @@
 import os
 import configparser
-import subprocess
+from ota_framework.config.constants import SystemCommands
 from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.shell import Shell
 
 class DeviceFlasher:
     CONFIG_PATH = "ota_framework/config/config.ini"
+    # Seconds flashimage.py may run before it is killed
+    FLASH_TIMEOUT = 30 * 60
 
     def __init__(self):
         self.logger = CustomLogger('FlashLog')
@@ -19,32 +23,31 @@ class DeviceFlasher:
             self.logger.error(f"Failed to load configuration from {DeviceFlasher.CONFIG_PATH}: {e}")
             raise
 
-    def flash_device(self, build_path):
-        # Retrieve the device serial number from the environment variable
-        aserial = os.getenv('DEVICE_SERIAL_NUMBER')
+    def flash_device(self, build_path, serial=None):
+        # Use the given serial, falling back to the DEVICE_SERIAL_NUMBER environment variable
+        aserial = serial or os.getenv('DEVICE_SERIAL_NUMBER')
         fserial = aserial
         
         if not aserial:
             self.logger.error("DEVICE_SERIAL_NUMBER environment variable is not set.")
             raise ValueError("DEVICE_SERIAL_NUMBER environment variable is not set.")
         
-        try:
-            self.logger.info(f"Executing flash command in directory: {build_path}")
-            subprocess.run(
-                ["python3", "flashimage.py", f"--aserial={aserial}", f"--fserial={fserial}"],
-                cwd=build_path,
-                check=True
-            )
-            self.logger.info("Build flashed successfully")
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to flash build in directory {build_path}. Error: {e}")
-            raise
+        self.logger.info(f"Executing flash command in directory: {build_path}")
+        result = Shell.execute_command(f"{SystemCommands.FLASH} --aserial={aserial} --fserial={fserial}", cwd=build_path,
+                                       timeout=DeviceFlasher.FLASH_TIMEOUT)
+        self.logger.debug(f"Flash output: {result['output']}")
+        if not result['success']:
+            self.logger.error(f"Failed to flash build in directory {build_path}. Error: {result['error']}")
+            raise Exception(f"Failed to flash build in directory {build_path}: {result['error']}")
+        # The flashed device starts over from factory state, only its hardware identity is still valid
+        DeviceSnapshot.invalidate_device(aserial)
+        self.logger.info("Build flashed successfully")
 
-    def flash_build(self, build_name):
+    def flash_build(self, build_name, serial=None):
         build_path = self.config.get("builds", build_name, fallback=None)
         if build_path and os.path.exists(build_path):
             self.logger.info(f"Flashing device with build: {build_path}")
-            self.flash_device(build_path)
+            self.flash_device(build_path, serial=serial)
         else:
             self.logger.warning(f"Build path for {build_name} is empty or does not exist: {build_path}")
 
@@ -1,20 +1,26 @@
 import time
-import threading
 import os
 from ota_framework.config.constants import OTACommands
+from ota_framework.core import tracing
 from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.ota_journal import OTAJournalMonitor, OTAJournalParser, OTAPhase
+from ota_framework.core.ota_progress import OTAProgressMonitor
 from ota_framework.core.shell import Shell
 
 # Initialize the logger for this module
 logger = CustomLogger('OTALogger')
 
 class OTA:
-    def __init__(self, delay=5, test_case_name='default'):
+    def __init__(self, delay=5, test_case_name='default', log_folder='logs'):
         self.delay = delay
         self.test_case_name = test_case_name
-        self.log_folder = 'logs'
+        self.log_folder = log_folder
         self.log_file = os.path.join(self.log_folder, f'{test_case_name}_ota_logs.txt')  # File to store OTA logs
         self.log_command = OTACommands.OTA_LOG_COMMAND  # Assuming this is the command for log collection
+        self.journal = OTAJournalParser()
+        self.journal_monitor = None
+        self.progress = None
+        self.progress_file = os.path.join(self.log_folder, f'{test_case_name}_ota_progress.jsonl')
         
         # Ensure the logs directory exists
         if not os.path.exists(self.log_folder):
@@ -22,20 +28,61 @@ class OTA:
 
     def start_log_collection(self):
         """
-        Start collecting logs in a separate thread and write to a log file.
+        Start collecting logs in a separate thread, write them to a log file and
+        feed every line to the OTA journal parser (self.journal).
         """
         logger.info("Starting log collection.")
-        
-        def log_collection():
-            # Execute the log collection command and redirect output to the log file
-            process = Shell.execute_command(self.log_command, redirect_output=True, output_file=self.log_file)
-            process.wait()  # Wait for the process to complete
+        self.journal_monitor = OTAJournalMonitor(self.log_command, self.log_file, self.journal)
+        return self.journal_monitor.start()
 
-        # Start the log collection thread
-        log_thread = threading.Thread(target=log_collection)
-        log_thread.daemon = True
-        log_thread.start()
-        return log_thread
+    def stop_log_collection(self):
+        """
+        Stop the journal log collection process and the progress monitor.
+        """
+        if self.journal_monitor:
+            self.journal_monitor.stop()
+        if self.progress:
+            self.progress.stop()
+
+    def start_progress_monitor(self):
+        """
+        Follow the download and install through `show_status`, writing the time series to self.progress_file.
+        """
+        self.progress = OTAProgressMonitor(output_file=self.progress_file, journal=self.journal)
+        return self.progress.start()
+
+    def wait_for_installation(self, timeout=15 * 60):
+        """
+        Wait until the journal shows the OTA installed, returning early if it fails.
+        :param timeout: Maximum number of seconds to wait.
+        :return: A dictionary with 'success', 'output', and 'error' keys. 'output' holds the last phase.
+        """
+        start = time.monotonic()
+        self.journal.wait_for_phase(OTAPhase.REBOOT_PENDING, timeout=timeout)
+        elapsed = time.monotonic() - start
+        phase = self.journal.phase
+        self.record_phase_spans()
+        if self.progress:
+            self.progress.stop()
+            logger.info(f"OTA progress: {self.progress.summary()}")
+        if self.journal.reached(OTAPhase.REBOOT_PENDING):
+            logger.info(f"OTA installed after waiting {elapsed:.1f} seconds, phase: {phase}")
+            return {'success': True, 'output': phase, 'error': ''}
+        if phase == OTAPhase.FAILED:
+            error = f"OTA failed: {self.journal.error}"
+        else:
+            error = f"OTA did not finish installing within {timeout} seconds, last phase: {phase}"
+        logger.error(error)
+        return {'success': False, 'output': phase, 'error': error}
+
+    def record_phase_spans(self):
+        """
+        Add one trace span per OTA phase seen in the journal, timed from its transitions.
+        """
+        history = self.journal.history + [(None, time.monotonic(), '')]
+        for (phase, started, line), (_, ended, _) in zip(history, history[1:]):
+            if phase != OTAPhase.IDLE:
+                tracing.tracer.record(f"ota {phase}", started, ended, category='ota_phase', line=line.strip())
 
     def start_ota_process(self):
         """
@@ -43,7 +90,7 @@ class OTA:
         :return: A dictionary with 'success', 'output', and 'error' keys.
         """
         # Start log collection in parallel
-        log_thread = self.start_log_collection()
+        self.start_log_collection()
         
         commands = [
             OTACommands.FORCE_SYNC_OTA,
@@ -54,20 +101,19 @@ class OTA:
         
         results = []
 
-        for command in commands:
-            logger.info(f"Executing OTA command: {command}")
-            result = Shell.execute_command(command)
+        # One device round trip, the delay between commands runs on the device
+        for command, result in zip(commands, Shell.execute_batch(commands, delays=self.delay)):
+            logger.info(f"Executed OTA command: {command}")
             results.append(result)
             
             if not result['success']:
                 logger.error(f"Failed to execute OTA command: {command}")
                 break
-            
-            time.sleep(self.delay)
 
-        # Wait for the log collection thread to finish
-        log_thread.join(timeout=5)  # Adjust the timeout as needed
+        if len(results) == len(commands) and all(result['success'] for result in results):
+            self.start_progress_monitor()
 
+        # Log collection keeps running so callers can wait on self.journal
         return results
 
 # Example usage
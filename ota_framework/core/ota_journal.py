@@ -0,0 +1,186 @@
+import re
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.shell import Shell
+
+# Initialize the logger for this module
+logger = CustomLogger('OTAJournalLogger')
+
+class OTAPhase:
+    IDLE = "idle"
+    SYNCED = "synced"
+    DOWNLOADING = "downloading"
+    VERIFYING = "verifying"
+    INSTALLING = "installing"
+    REBOOT_PENDING = "reboot_pending"
+    DONE = "done"
+    FAILED = "failed"
+
+    # Normal progression of an update, FAILED can be reached from any phase
+    ORDER = (IDLE, SYNCED, DOWNLOADING, VERIFYING, INSTALLING, REBOOT_PENDING, DONE)
+    # Phases after which the installation itself is over
+    INSTALLED = (REBOOT_PENDING, DONE)
+
+# Rules are checked in order and the first match wins, so specific patterns come first
+DEFAULT_RULES = (
+    (re.compile(r'(?i)\b(?:download|verif\w*|install\w*|update|ota)\s+(?:has\s+)?(?:failed|aborted)|error\s*(?:code)?\s*[:=]\s*-?[1-9]'), OTAPhase.FAILED),
+    (re.compile(r'(?i)\b(?:update|ota)\s+(?:applied|completed?|successful)\b'), OTAPhase.DONE),
+    (re.compile(r'(?i)\breboot(?:ing)?\s+(?:required|pending|to\s+apply)|install\w*\s+(?:complete|finished|success)'), OTAPhase.REBOOT_PENDING),
+    (re.compile(r'(?i)\binstall(?:ing|ation)?\b'), OTAPhase.INSTALLING),
+    (re.compile(r'(?i)\bverif(?:y|ying|ication)\b'), OTAPhase.VERIFYING),
+    (re.compile(r'(?i)\bdownload(?:ing|ed)?\b'), OTAPhase.DOWNLOADING),
+    (re.compile(r'(?i)\b(?:force)?sync(?:ed|ing)?\b'), OTAPhase.SYNCED),
+)
+
+class OTAJournalParser:
+    """
+    Incremental parser for ace_otad journal lines driving an OTA phase state machine.
+
+    Phases only move forward along OTAPhase.ORDER; FAILED and DONE are final.
+    Callbacks registered with on_phase are called with (phase, line) on every transition.
+    """
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = rules
+        self.phase = OTAPhase.IDLE
+        self.error = None
+        self.lines = 0
+        self.history = [(OTAPhase.IDLE, time.monotonic(), '')]
+        self._callbacks = []
+        self._futures = []
+        self._changed = threading.Condition()
+
+    def on_phase(self, callback):
+        """
+        Register a callable(phase, line) run on every phase transition.
+        """
+        self._callbacks.append(callback)
+        return callback
+
+    def reached(self, phase):
+        """
+        :return: True if the state machine is at or past the given phase.
+        """
+        if phase == OTAPhase.FAILED or self.phase == OTAPhase.FAILED:
+            return self.phase == phase
+        return OTAPhase.ORDER.index(self.phase) >= OTAPhase.ORDER.index(phase)
+
+    def is_final(self):
+        return self.phase in (OTAPhase.DONE, OTAPhase.FAILED)
+
+    def classify(self, line):
+        """
+        :return: The phase a journal line points to, or None.
+        """
+        for pattern, phase in self.rules:
+            if pattern.search(line):
+                return phase
+        return None
+
+    def feed(self, line):
+        """
+        Consume one journal line.
+        :return: The new phase if the line caused a transition, otherwise None.
+        """
+        self.lines += 1
+        phase = self.classify(line)
+        if phase is None or self.is_final():
+            return None
+        if phase != OTAPhase.FAILED and OTAPhase.ORDER.index(phase) <= OTAPhase.ORDER.index(self.phase):
+            return None
+
+        with self._changed:
+            self.phase = phase
+            if phase == OTAPhase.FAILED:
+                self.error = line.strip()
+            self.history.append((phase, time.monotonic(), line.strip()))
+            self._changed.notify_all()
+
+        logger.info(f"OTA phase changed to {phase}: {line.strip()}")
+        for callback in self._callbacks:
+            try:
+                callback(phase, line)
+            except Exception as e:
+                logger.error(f"Error in OTA phase callback {callback}: {e}")
+        with self._changed:
+            self._futures = [(target, future) for target, future in self._futures if not self._resolve(target, future)]
+        return phase
+
+    def _resolve(self, target, future):
+        """
+        Settle a phase future if its phase was reached or the OTA failed. Called with self._changed
+        held, so the reader thread and phase_future() never settle the same future twice.
+        :return: True once the future is done and can be forgotten.
+        """
+        try:
+            if self.phase == OTAPhase.FAILED and target != OTAPhase.FAILED:
+                future.set_exception(Exception(f"OTA failed before reaching {target}: {self.error}"))
+            elif self.reached(target):
+                future.set_result(self.phase)
+        except InvalidStateError:
+            # Already settled or cancelled by its owner
+            pass
+        return future.done()
+
+    def phase_future(self, phase):
+        """
+        Return a concurrent.futures.Future resolved once the phase is reached. It fails
+        if the OTA fails first. Use asyncio.wrap_future to await it from a coroutine.
+        """
+        future = Future()
+        with self._changed:
+            if not self._resolve(phase, future):
+                self._futures.append((phase, future))
+        return future
+
+    def wait_for_phase(self, phase, timeout=None):
+        """
+        Block until the phase is reached, the OTA fails or the timeout expires.
+        :return: True if the phase was reached.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.reached(phase) or self.phase == OTAPhase.FAILED, timeout=timeout)
+            return self.reached(phase)
+
+    def phase_durations(self):
+        """
+        :return: A dictionary of seconds spent in each phase seen so far.
+        """
+        durations = {}
+        for (phase, start, _), (_, end, _) in zip(self.history, self.history[1:] + [(None, time.monotonic(), '')]):
+            durations[phase] = round(durations.get(phase, 0) + end - start, 3)
+        return durations
+
+
+class OTAJournalMonitor:
+    """
+    Runs the OTA journal command, tees its output to a log file and feeds the parser line by line.
+    """
+    def __init__(self, command, log_file, parser=None):
+        self.command = command
+        self.log_file = log_file
+        self.parser = parser or OTAJournalParser()
+        self.process = None
+        self.thread = None
+
+    def start(self):
+        self.process = Shell.start_process(self.command)
+        self.thread = threading.Thread(target=self._consume)
+        self.thread.daemon = True
+        self.thread.start()
+        return self.thread
+
+    def _consume(self):
+        with open(self.log_file, 'a') as file:
+            for raw_line in iter(self.process.stdout.readline, b''):
+                line = raw_line.decode(errors='replace')
+                file.write(line)
+                file.flush()
+                self.parser.feed(line)
+        self.process.wait()
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            # Stops adb and grep together, terminating only the shell would leave them running
+            Shell.kill_process(self.process, grace=5)
@@ -7,30 +7,55 @@ from ota_framework.core.flags import Flags
 from ota_framework.core.ota import OTA
 from ota_framework.core.custom_logger import CustomLogger
 from ota_framework.core.device_actions import DeviceActions
+from ota_framework.core.setup_planner import read_state, is_met, describe
 from ota_framework.config.constants import *
 
 logger = CustomLogger('OTA_precondition')
 
 class Precon:
 
-    def __init__(self):
+    def __init__(self, logs_dir=None, skip_met=True):
+        """
+        :param logs_dir: Folder for logs and screenshots.
+        :param skip_met: Skip preconditions the device already meets (Wi-Fi connected, registered, flags,
+                         Alexa enabled, OOBE completed), e.g. on the second and later iterations of a soak run.
+        """
+        self.skip_met = skip_met
         self.wifi = WiFi()
         self.register = Registration()
         self.flags = Flags()
         # Initialize DeviceActions with logs_dir
-        logs_dir = '/home/ANT.AMAZON.COM/avinaks/Downloads/Playground/ota_framework/logs'
+        logs_dir = logs_dir or '/home/ANT.AMAZON.COM/avinaks/Downloads/Playground/ota_framework/logs'
         if not os.path.exists(logs_dir):
             os.makedirs(logs_dir)
         
         self.device = DeviceActions(logs_dir=logs_dir)
 
+    def already_met(self, step, desired=True):
+        """
+        Check a precondition against the cached device snapshot; stale fields are refreshed in one round trip.
+        :param step: Setup step of setup_planner.STEP_ORDER.
+        :param desired: Target value of the step.
+        """
+        if not self.skip_met:
+            return False
+        snapshot = read_state([step])
+        if is_met(step, desired, snapshot):
+            logger.info(f"Setup step {step} already done ({describe(step, snapshot)}), skipping")
+            return True
+        return False
+
     def wifi_setup(self):
+        if self.already_met('wifi'):
+            return
         self.wifi.connect(ssid=WiFiConstants.SSID,password=WiFiConstants.PASSWORD)
         logger.info("Starting Wi-Fi connection")
         assert self.wifi.validate_connection(ssid=WiFiConstants.SSID), "Wi-Fi connection failed."
         logger.info("Wi-Fi validation passed, Wi-Fi connected")
 
     def reg_device(self):
+        if self.already_met('registration'):
+            return
         self.register.register_device(username=RegistrationConstants.USERNAME,password=RegistrationConstants.PASSWORD)
         logger.info("Starting device registration")
         assert self.register.validate_registration(username=RegistrationConstants.USERNAME), "Device registration failed."
@@ -39,29 +64,47 @@ class Precon:
     def soft_version(self):
         version = self.device.check_software_version()
         logger.info(f"Initial Software Version: {version}")
+        return version
 
-    def flag(self):
-        self.flags.set_flag_0()
-        time.sleep(30)
-        logger.info("Flag set to 0")
+    def flag(self, scheduler=None):
+        """
+        :param scheduler: Optional RebootScheduler to stage the flag on instead of rebooting right away.
+        """
+        if self.already_met('dev_flags', '0'):
+            return
+        self.flags.set_flag_0(scheduler=scheduler)
+        logger.info("Flag staged to 0" if scheduler else "Flag set to 0")
 
-    def flag_440(self):
-        self.flags.set_flag_440()
-        time.sleep(30)
-        logger.info("Flag set to 440")
+    def flag_440(self, scheduler=None):
+        """
+        :param scheduler: Optional RebootScheduler to stage the flag on instead of rebooting right away.
+        """
+        if self.already_met('dev_flags', '0x440'):
+            return
+        self.flags.set_flag_440(scheduler=scheduler)
+        logger.info("Flag staged to 440" if scheduler else "Flag set to 440")
 
     def push_app(self):
-        self.device.push_and_install_app(app_name='settings_app')
-        time.sleep(3)
+        results = self.device.deploy_apps()
+        if any(result['installed'] for result in results.values()):
+            # Give freshly installed apps time to register
+            time.sleep(3)
         
     def boot_utility(self):
         self.device.verify_and_get_boot_utility_slots()
         
     def screen_shooter(self):
-        self.device.take_screenshot(filename="filename.png")
+        self.device.take_screenshot(step='setup')
         
-    def skip_oobe(self):
-        self.device.check_and_complete_oobe_based_on_profile()
+    def skip_oobe(self, scheduler=None):
+        """
+        :param scheduler: Optional RebootScheduler to stage the OOBE settings on instead of rebooting right away.
+        """
+        if self.already_met('oobe'):
+            return
+        self.device.check_and_complete_oobe_based_on_profile(scheduler=scheduler)
     
     def alexa(self):
+        if self.already_met('alexa'):
+            return
         self.device.enable_alexa()
\ No newline at end of file
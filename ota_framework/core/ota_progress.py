@@ -0,0 +1,213 @@
+import configparser
+import json
+import os
+import threading
+import time
+from ota_framework.config.constants import OTACommands
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.parsers import parse_ota_status
+from ota_framework.core.shell import Shell, device_context, current_serial
+
+# Initialize the logger for this module
+logger = CustomLogger('OTAProgressLogger')
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/config.ini')
+
+# show_status states after which there is nothing left to follow
+FINAL_STATES = ('REBOOT_REQUIRED', 'FAILED')
+# States without a byte count, each bounded by its own time budget instead: state -> (config key, default seconds)
+TIMED_STATES = {'VERIFYING': ('verifying_timeout', 300), 'INSTALLING': ('installing_timeout', 900)}
+# Weight of the newest sample in the smoothed throughput
+THROUGHPUT_SMOOTHING = 0.3
+
+class OTAProgressMonitor:
+    """
+    Follows a running OTA by polling `ace mw ota show_status` on a background thread.
+
+    Every poll becomes one sample of a per-device time series: state, bytes
+    downloaded, total size, error code, smoothed download throughput (bytes per
+    second) and ETA. Samples are appended to `output_file` as JSON lines when
+    they are taken, so slow downloads show up while the OTA is still running.
+
+    The poll interval adapts: it drops to `min_interval` whenever the state or
+    the byte count changed and grows by `backoff` up to `max_interval` while
+    nothing changes. A phase change seen in the OTA journal triggers a poll
+    right away. A download whose byte count does not grow for `stall_timeout`
+    seconds, or a verify or install running longer than its time budget, is
+    reported as stalled.
+    """
+    def __init__(self, serial=None, output_file=None, journal=None, min_interval=None, max_interval=None,
+                 backoff=None, stall_timeout=None, state_timeouts=None):
+        """
+        :param serial: Device serial number, defaults to the device of the current device_context.
+        :param output_file: Optional JSON lines file receiving every sample.
+        :param journal: Optional OTAJournalParser whose phase changes trigger an immediate poll.
+        :param min_interval: Seconds between polls while the OTA makes progress.
+        :param max_interval: Longest interval between polls.
+        :param backoff: Factor the interval grows by after a poll without change.
+        :param stall_timeout: Seconds without downloaded bytes before the download counts as stalled.
+        :param state_timeouts: Optional overrides of the seconds VERIFYING and INSTALLING may take.
+        Unset values come from the [ota_progress] section of config.ini.
+        """
+        config = configparser.ConfigParser()
+        config.read(CONFIG_PATH)
+        self.serial = serial or current_serial()
+        self.output_file = output_file
+        self.min_interval = min_interval or config.getfloat('ota_progress', 'min_interval', fallback=1)
+        self.max_interval = max_interval or config.getfloat('ota_progress', 'max_interval', fallback=15)
+        self.backoff = backoff or config.getfloat('ota_progress', 'backoff', fallback=1.5)
+        self.stall_timeout = stall_timeout or config.getfloat('ota_progress', 'stall_timeout', fallback=120)
+        self.state_timeouts = {state: config.getfloat('ota_progress', key, fallback=default)
+                               for state, (key, default) in TIMED_STATES.items()}
+        self.state_timeouts.update(state_timeouts or {})
+        self.samples = []
+        self.polls = 0
+        self.stalled = False
+        self._phase_started = {}
+        self._last_change = None
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        if journal is not None:
+            journal.on_phase(lambda phase, line: self._wake.set())
+
+    def start(self):
+        if self._thread is not None:
+            raise Exception("OTA progress monitor is already running")
+        self._start = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"ota-progress-{self.serial}")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=30):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def wait(self, timeout=None):
+        """
+        Wait until the OTA reached a final state or the monitor was stopped.
+        :return: True if the monitor finished.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self._thread is None or not self._thread.is_alive()
+
+    def _run(self):
+        interval = self.min_interval
+        with device_context(self.serial):
+            while not self._stop.is_set():
+                sample, changed = self.poll()
+                if sample and sample['state'] in FINAL_STATES:
+                    break
+                interval = self.min_interval if changed else min(interval * self.backoff, self.max_interval)
+                self._wake.wait(interval)
+                self._wake.clear()
+
+    def poll(self):
+        """
+        Take one sample.
+        :return: The sample (None if the status could not be read) and whether it differs from the previous one.
+        """
+        result = Shell.execute_command(OTACommands.SHOW_OTA_STATUS)
+        now = time.monotonic()
+        with self._lock:
+            self.polls += 1
+            status = parse_ota_status(result['output']) if result['success'] else None
+            if status is None or status.state is None:
+                # e.g. the device is rebooting; polling slows down like any unchanged poll
+                return None, False
+            previous = self.samples[-1] if self.samples else None
+            changed = previous is None or (status.state, status.bytes_downloaded) != (previous['state'],
+                                                                                     previous['bytes_downloaded'])
+            sample = {
+                'time': round(time.time(), 3),
+                'elapsed': round(now - self._start, 3),
+                'state': status.state,
+                'bytes_downloaded': status.bytes_downloaded,
+                'total_bytes': status.total_bytes,
+                'error_code': status.error_code,
+                'progress': (round(status.bytes_downloaded / status.total_bytes, 4)
+                             if status.bytes_downloaded is not None and status.total_bytes else None),
+                'throughput': self._throughput(previous, status, now),
+                'eta': None
+            }
+            if sample['throughput'] and status.total_bytes is not None and status.bytes_downloaded is not None:
+                sample['eta'] = round((status.total_bytes - status.bytes_downloaded) / sample['throughput'], 1)
+            self.samples.append(sample)
+            if previous is None or status.state != previous['state']:
+                self._phase_started.setdefault(status.state, sample['elapsed'])
+                logger.info(f"OTA {status.state}: {sample['bytes_downloaded']} of {sample['total_bytes']} bytes, "
+                            f"error code {sample['error_code']}")
+            self._check_stall(sample, changed, now)
+        self._write(sample)
+        return sample, changed
+
+    def _throughput(self, previous, status, now):
+        if previous is None or status.bytes_downloaded is None or previous['bytes_downloaded'] is None:
+            return None
+        elapsed = now - self._start - previous['elapsed']
+        downloaded = status.bytes_downloaded - previous['bytes_downloaded']
+        if elapsed <= 0 or downloaded < 0:
+            return previous['throughput']
+        rate = downloaded / elapsed
+        if previous['throughput'] is None:
+            return round(rate, 1)
+        return round(THROUGHPUT_SMOOTHING * rate + (1 - THROUGHPUT_SMOOTHING) * previous['throughput'], 1)
+
+    def _check_stall(self, sample, changed, now):
+        if changed or self._last_change is None:
+            self._last_change = now
+        if self.stalled:
+            return
+        state = sample['state']
+        if state == 'DOWNLOADING' and now - self._last_change >= self.stall_timeout:
+            self.stalled = True
+            logger.warning(f"OTA stalled: no bytes downloaded for {now - self._last_change:.0f} seconds "
+                           f"at {sample['bytes_downloaded']} of {sample['total_bytes']} bytes")
+        elif state in self.state_timeouts and sample['elapsed'] - self._phase_started[state] >= self.state_timeouts[state]:
+            self.stalled = True
+            logger.warning(f"OTA stalled: {state} for {sample['elapsed'] - self._phase_started[state]:.0f} seconds, "
+                           f"longer than its {self.state_timeouts[state]:.0f} second budget")
+
+    def _write(self, sample):
+        if self.output_file:
+            with open(self.output_file, 'a') as file:
+                file.write(json.dumps(dict(sample, serial=self.serial)) + '\n')
+
+    def phase_durations(self):
+        """
+        :return: A dictionary of seconds spent in each show_status state, from its first sample to the next state's.
+        """
+        with self._lock:
+            started = sorted(self._phase_started.items(), key=lambda item: item[1])
+            last = self.samples[-1]['elapsed'] if self.samples else None
+        return {state: round(end - start, 3)
+                for (state, start), end in zip(started, [start for _, start in started[1:]] + [last])}
+
+    def summary(self):
+        """
+        :return: A dictionary with 'final_state', 'error_code', 'polls', 'samples', 'phase_durations',
+                 'average_throughput', 'peak_throughput' (bytes per second) and 'stalled' keys.
+        """
+        durations = self.phase_durations()
+        with self._lock:
+            last = self.samples[-1] if self.samples else {}
+            downloading = [sample for sample in self.samples if sample['state'] == 'DOWNLOADING']
+            throughputs = [sample['throughput'] for sample in self.samples if sample['throughput']]
+            downloaded = max((sample['bytes_downloaded'] or 0 for sample in self.samples), default=0)
+        download_time = durations.get('DOWNLOADING')
+        return {
+            'final_state': last.get('state'),
+            'error_code': last.get('error_code'),
+            'polls': self.polls,
+            'samples': len(self.samples),
+            'phase_durations': durations,
+            'average_throughput': round(downloaded / download_time, 1) if downloading and download_time else None,
+            'peak_throughput': max(throughputs, default=None),
+            'stalled': self.stalled
+        }
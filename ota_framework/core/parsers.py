@@ -0,0 +1,164 @@
+"""
+Parsers for the output of the device commands in config.constants.
+
+Every grammar is compiled once at import. Parsers never raise on unexpected
+output: a value that is missing or malformed comes back as None (or an empty
+collection), so callers decide what an unknown state means.
+"""
+import re
+from collections import namedtuple
+
+# Whitespace inside a line only, so a short or empty field never pulls in the next line
+# `vdcm get <key>` -> 'key' = 'value'
+DEVCONF_GET_PATTERN = re.compile(r"^'(?P<key>[^'\n]+)'[ \t]*=[ \t]*'(?P<value>[^'\n]*)'", re.MULTILINE)
+# `vdcm set <key> <value>` -> 'key' successfully set to 'value'
+DEVCONF_SET_PATTERN = re.compile(r"^'(?P<key>[^'\n]+)'[ \t]+successfully set to[ \t]+'(?P<value>[^'\n]*)'",
+                                 re.MULTILINE)
+# `idme print` and `ace mw ota show_status` -> key: value per line
+COLON_FIELD_PATTERN = re.compile(r'^[ \t]*(?P<key>[A-Za-z_][\w-]*)[ \t]*:[ \t]*(?P<value>\S[^\n]*?)[ \t\r]*$',
+                                 re.MULTILINE)
+# `ace hal device_info cli -l -n` -> KEY=VALUE per line
+EQUALS_FIELD_PATTERN = re.compile(r'^[ \t]*(?P<key>[A-Z][A-Z0-9_]*)[ \t]*=[ \t]*(?P<value>[^\n]*?)[ \t\r]*$',
+                                  re.MULTILINE)
+REGISTRATION_PATTERN = re.compile(r'\b(DEVICE_[A-Z_]+)\b')
+HEX_PATTERN = re.compile(r'^(?:0[xX])?[0-9a-fA-F]+$')
+# `boot_control_utility` -> Slot Bootable Successful Active
+SLOT_ROW_PATTERN = re.compile(r'^[ \t]*(?P<slot>_\w+)[ \t]+(?P<bootable>\S+)[ \t]+(?P<successful>\S+)[ \t]+'
+                              r'(?P<active>\S+)', re.MULTILINE)
+# `ace mw wifi get_scan_results` -> bssid / frequency / signal level / flags / ssid
+SCAN_ROW_PATTERN = re.compile(r'^[ \t]*(?P<bssid>(?:[0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2})[ \t]+(?P<frequency>\d+)[ \t]+'
+                              r'(?P<signal>-?\d+)[ \t]+(?P<flags>\S+)[ \t]*(?P<ssid>[^\n]*?)[ \t\r]*$', re.MULTILINE)
+
+SOFTWARE_VERSION_KEY = 'com.amazon.devconf/system/device-info/software-version'
+OOBE_COMPLETE_KEY = 'com.amazon.devconf/system/oobe/oobe-complete'
+
+DevConfValue = namedtuple('DevConfValue', ['key', 'value'])
+NetState = namedtuple('NetState', ['state', 'ssid'])
+BootSlot = namedtuple('BootSlot', ['slot', 'bootable', 'successful', 'active'])
+ScanResult = namedtuple('ScanResult', ['bssid', 'frequency', 'signal', 'flags', 'ssid'])
+OTAStatus = namedtuple('OTAStatus', ['state', 'target_version', 'bytes_downloaded', 'total_bytes', 'error_code'])
+
+def _to_int(value, base=10):
+    try:
+        return int(value, base) if value is not None else None
+    except ValueError:
+        return None
+
+def colon_fields(output):
+    """
+    :return: A dictionary of the `key: value` lines of an output, the first occurrence of a key winning.
+    """
+    fields = {}
+    for match in COLON_FIELD_PATTERN.finditer(output):
+        fields.setdefault(match.group('key'), match.group('value'))
+    return fields
+
+def parse_devconf(output):
+    """
+    Parse `vdcm get` or `vdcm set` output.
+    :return: A DevConfValue, or None.
+    """
+    match = DEVCONF_GET_PATTERN.search(output) or DEVCONF_SET_PATTERN.search(output)
+    return DevConfValue(match.group('key'), match.group('value')) if match else None
+
+def parse_devconf_value(output):
+    record = parse_devconf(output)
+    return record.value if record else None
+
+def is_devconf_set(output, key, value):
+    """
+    :return: True if `vdcm set` output confirms the key was set to the value.
+    """
+    match = DEVCONF_SET_PATTERN.search(output)
+    return bool(match) and match.group('key') == key and match.group('value') == value
+
+def parse_software_version(output):
+    """
+    :return: The software version from `vdcm get` of the software-version key, or None.
+    """
+    record = parse_devconf(output)
+    if record is None or record.key != SOFTWARE_VERSION_KEY or not record.value.isdigit():
+        return None
+    return record.value
+
+def parse_device_info(output):
+    """
+    :return: A dictionary of the KEY=VALUE lines of `ace hal device_info`.
+    """
+    fields = {}
+    for match in EQUALS_FIELD_PATTERN.finditer(output):
+        fields.setdefault(match.group('key'), match.group('value'))
+    return fields
+
+def parse_product_name(output):
+    return parse_device_info(output).get('PRODUCT_NAME') or None
+
+def parse_idme(output):
+    """
+    :return: A dictionary of the fields printed by `idme print`.
+    """
+    return colon_fields(output)
+
+def parse_dev_flags(output):
+    """
+    :return: The dev_flags text as printed by idme (e.g. '0' or '0x440'), or None.
+    """
+    value = parse_idme(output).get('dev_flags')
+    return value if value and HEX_PATTERN.match(value) else None
+
+def parse_dev_flags_value(output):
+    """
+    :return: The dev_flags as an integer, or None. '0', '0x0' and '0x00' are all 0.
+    """
+    return _to_int(parse_dev_flags(output), 16)
+
+def parse_boot_slots(output):
+    """
+    Parse the `boot_control_utility` table, skipping the header and short rows.
+    :return: A dictionary of slot name (e.g. '_a') to its BootSlot.
+    """
+    return {match.group('slot'): BootSlot(*match.group('slot', 'bootable', 'successful', 'active'))
+            for match in SLOT_ROW_PATTERN.finditer(output)}
+
+def parse_net_state(output):
+    """
+    :return: The networkState of `ace mw wifi get_net_state` (e.g. 'CONNECTED'), or None.
+    """
+    return parse_net_status(output).state
+
+def parse_net_status(output):
+    """
+    :return: A NetState with the network state and SSID, each None when missing.
+    """
+    fields = colon_fields(output)
+    state = fields.get('networkState')
+    return NetState(state.split()[0] if state else None, fields.get('ssid'))
+
+def parse_registration(output):
+    """
+    :return: The registration state of `ace mw map -y` (e.g. 'DEVICE_REGISTERED'), or None.
+    """
+    match = REGISTRATION_PATTERN.search(output)
+    return match.group(1) if match else None
+
+def parse_scan_results(output):
+    """
+    Parse `ace mw wifi get_scan_results`.
+    :return: A list of ScanResult, strongest signal first.
+    """
+    results = [ScanResult(match.group('bssid'), int(match.group('frequency')), int(match.group('signal')),
+                          match.group('flags'), match.group('ssid'))
+               for match in SCAN_ROW_PATTERN.finditer(output)]
+    return sorted(results, key=lambda result: result.signal, reverse=True)
+
+def parse_ota_status(output):
+    """
+    Parse `ace mw ota show_status`.
+    :return: An OTAStatus; fields missing from the output are None.
+    """
+    fields = colon_fields(output)
+    return OTAStatus(fields.get('state'), fields.get('targetVersion'), _to_int(fields.get('bytesDownloaded')),
+                     _to_int(fields.get('totalBytes')), _to_int(fields.get('errorCode')))
+
+def parse_kvs_value(output):
+    return output.strip() or None
@@ -0,0 +1,68 @@
+from ota_framework.config.constants import DeviceCommands
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.shell import Shell
+from ota_framework.core import waits
+
+# Initialize the logger for this module
+logger = CustomLogger('RebootSchedulerLogger')
+
+class RebootScheduler:
+    """
+    Coalesces settings that need a reboot to take effect (idme flags, kvs and
+    devconf writes) into a single reboot.
+
+    Steps call require() with their write commands and a validation instead of
+    rebooting themselves. commit() sends every pending write in one round trip,
+    reboots once, waits once for the device to be ready and then runs all the
+    validations, so N staged steps cost one reboot instead of N.
+    """
+    def __init__(self):
+        self.pending = []
+
+    def require(self, name, commands, validate):
+        """
+        Stage a step that takes effect after the next reboot.
+        :param name: Step name, used in logs and the commit result.
+        :param commands: Device commands writing the setting.
+        :param validate: Callable returning a dictionary with 'success', 'output' and 'error' keys, run after the reboot.
+        :return: The scheduler itself.
+        """
+        self.pending.append((name, list(commands), validate))
+        logger.info(f"Staged {name}, {len(self.pending)} steps waiting for a reboot")
+        return self
+
+    @logger.log_decorator(level='info')
+    def commit(self):
+        """
+        Write every staged setting, reboot once and validate every staged step.
+        :return: A dictionary with 'success', 'output', 'error' and 'steps' (step name -> validation result) keys.
+        """
+        pending, self.pending = self.pending, []
+        if not pending:
+            return {'success': True, 'output': 'Nothing to commit', 'error': '', 'steps': {}}
+
+        commands = [command for _, step_commands, _ in pending for command in step_commands]
+        for command, result in zip(commands, Shell.execute_batch(commands)):
+            if not result['success']:
+                return {'success': False, 'output': result['output'],
+                        'error': f"Command '{command}' failed: {result['error']}", 'steps': {}}
+
+        since = waits.reboot_marker()
+        reboot_result = Shell.execute_command(DeviceCommands.REBOOT)
+        DeviceSnapshot.invalidate_device()
+        if not reboot_result['success']:
+            return dict(reboot_result, steps={})
+        logger.info(f"Rebooting once for {', '.join(name for name, _, _ in pending)}")
+        boot_result = waits.wait_for_reboot(since=since)
+        if not boot_result['success']:
+            return dict(boot_result, steps={})
+
+        steps = {name: validate() for name, _, validate in pending}
+        failed = [name for name, result in steps.items() if not result['success']]
+        return {
+            'success': not failed,
+            'output': '\n'.join(result['output'] for result in steps.values() if result['output']),
+            'error': '\n'.join(f"{name}: {steps[name]['error']}" for name in failed),
+            'steps': steps
+        }
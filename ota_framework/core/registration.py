@@ -1,6 +1,7 @@
-import time
 from ota_framework.config.constants import RegistrationCommands, RegistrationConstants
 from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.parsers import parse_registration
+from ota_framework.core.retry import RetryPolicy
 from ota_framework.core.shell import Shell
 
 # Initialize the logger for this module
@@ -30,27 +31,26 @@ class Registration:
 
     @staticmethod
     @logger.log_decorator(level='info')
-    def validate_registration(username, retries=5, delay=5):
+    def validate_registration(username, retries=None, delay=None):
         """
         Validate if the device registration was successful.
-        Retry the validation up to `retries` times if it fails.
+        Retries follow the 'registration_validation' policy from config.ini.
         :param username: Username for registration validation
-        :param retries: Number of retry attempts
-        :param delay: Delay between retry attempts
+        :param retries: Optional override of the maximum number of attempts
+        :param delay: Optional override of the initial delay between attempts
         :return: A dictionary with 'success', 'output', and 'error' keys.
         """
-        for attempt in range(1, retries + 1):
-            logger.info(f"Validating device registration for user: {username}, Attempt: {attempt}")
+        def validate():
             result = Shell.execute_command(RegistrationCommands.VALIDATE_REGISTRATION)
-            if 'DEVICE_REGISTERED' in result['output']:
-                result['success'] = True
-                logger.info(f"Device registration validated successfully for user: {username} on attempt {attempt}")
-                return result
-            else:
-                logger.warning(f"Validation failed on attempt {attempt}. Retrying after {delay} seconds...")
-                time.sleep(delay)
-        
-        result['success'] = False
-        result['error'] = f"Failed to validate device registration for user: {username} after {retries} attempts. Output: {result['output']}"
+            result['success'] = parse_registration(result['output']) == 'DEVICE_REGISTERED'
+            return result
+
+        policy = RetryPolicy.for_device('registration_validation', max_attempts=retries, initial_delay=delay)
+        result = policy.run(validate, description=f"Validating device registration for user: {username}")
+        if result['success']:
+            logger.info(f"Device registration validated successfully for user: {username} on attempt {result['attempts']}")
+            return result
+
+        result['error'] = f"Failed to validate device registration for user: {username} after {result['attempts']} attempts. Output: {result['output']}"
         logger.error(result['error'])
         return result
@@ -0,0 +1,342 @@
+import argparse
+import configparser
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from ota_framework.core.custom_logger import CustomLogger
+
+# Initialize the logger for this module
+logger = CustomLogger('ResultsStoreLogger')
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/config.ini')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL,
+    passed INTEGER,
+    failed INTEGER,
+    status TEXT,
+    report TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_name ON runs (name, started);
+
+CREATE TABLE IF NOT EXISTS devices (
+    run_id TEXT NOT NULL,
+    serial TEXT NOT NULL,
+    product_name TEXT,
+    initial_version TEXT,
+    final_version TEXT,
+    success INTEGER NOT NULL,
+    failed_phase TEXT,
+    error TEXT,
+    duration REAL,
+    PRIMARY KEY (run_id, serial)
+);
+CREATE INDEX IF NOT EXISTS devices_product ON devices (product_name);
+CREATE INDEX IF NOT EXISTS devices_serial ON devices (serial);
+
+CREATE TABLE IF NOT EXISTS phases (
+    run_id TEXT NOT NULL,
+    serial TEXT,
+    name TEXT NOT NULL,
+    started REAL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phases_run ON phases (run_id, serial);
+CREATE INDEX IF NOT EXISTS phases_name ON phases (name);
+
+CREATE TABLE IF NOT EXISTS commands (
+    run_id TEXT NOT NULL,
+    serial TEXT,
+    command TEXT NOT NULL,
+    started REAL,
+    duration REAL NOT NULL,
+    success INTEGER,
+    timed_out INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS commands_run ON commands (run_id, serial);
+
+CREATE TABLE IF NOT EXISTS ota_outcomes (
+    run_id TEXT NOT NULL,
+    serial TEXT NOT NULL,
+    from_version TEXT,
+    to_version TEXT,
+    success INTEGER NOT NULL,
+    download_seconds REAL,
+    verify_seconds REAL,
+    install_seconds REAL,
+    error TEXT,
+    PRIMARY KEY (run_id, serial)
+);
+CREATE INDEX IF NOT EXISTS ota_outcomes_versions ON ota_outcomes (from_version, to_version);
+"""
+
+# Column order of the rows queued per table
+COLUMNS = {
+    'devices': ('run_id', 'serial', 'product_name', 'initial_version', 'final_version', 'success',
+                'failed_phase', 'error', 'duration'),
+    'phases': ('run_id', 'serial', 'name', 'started', 'duration', 'success'),
+    'commands': ('run_id', 'serial', 'command', 'started', 'duration', 'success', 'timed_out'),
+    'ota_outcomes': ('run_id', 'serial', 'from_version', 'to_version', 'success', 'download_seconds',
+                     'verify_seconds', 'install_seconds', 'error'),
+}
+
+def default_path(results_root=None):
+    """
+    :return: The database path from [results] database in config.ini, relative to the results folder,
+             or None when the history is turned off with an empty value.
+    """
+    config = configparser.ConfigParser()
+    config.read(CONFIG_PATH)
+    database = config.get('results', 'database', fallback='history.db')
+    if not database:
+        return None
+    results_root = results_root or config.get('campaign', 'results_dir', fallback='results')
+    return os.path.join(results_root, database)
+
+
+class ResultsStore:
+    """
+    SQLite history of runs: one row per run, device, phase, command and OTA outcome,
+    indexed for trend queries across thousands of runs.
+
+    Rows are queued in memory while a run is going and written in one transaction
+    per flush, when `batch_size` rows are pending or the run finishes. One store
+    can be shared by the worker threads of a campaign.
+    """
+    def __init__(self, path=None, batch_size=1000):
+        """
+        :param path: Database file, defaults to default_path().
+        :param batch_size: Number of queued rows that triggers a flush.
+        """
+        self.path = path or default_path()
+        self.batch_size = batch_size
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(SCHEMA)
+        self._pending = {table: [] for table in COLUMNS}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ------------------------------------------------------------------ writing
+
+    def start_run(self, kind, name, run_id=None, started=None, report=None):
+        """
+        Add a run, written immediately so an interrupted run still shows up.
+        :param kind: What ran, e.g. 'campaign' or 'pytest'.
+        :param name: Build or test case name, used to group runs for trends.
+        :return: The run id.
+        """
+        run_id = run_id or f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO runs (run_id, kind, name, started, status, report) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, kind, name, time.time() if started is None else started, 'running', report))
+        return run_id
+
+    def finish_run(self, run_id, duration, passed=None, failed=None, status=None):
+        """
+        Write the queued rows and the final state of the run in one transaction.
+        """
+        status = status or ('passed' if not failed else 'failed')
+        self.flush(("UPDATE runs SET duration = ?, passed = ?, failed = ?, status = ? WHERE run_id = ?",
+                    (duration, passed, failed, status, run_id)))
+
+    def _queue(self, table, rows):
+        with self._lock:
+            self._pending[table].extend(rows)
+            full = sum(len(pending) for pending in self._pending.values()) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self, *statements):
+        """
+        Write every queued row, plus the given (sql, parameters) statements, in one transaction.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {table: [] for table in COLUMNS}
+            with self._connection:
+                for table, rows in pending.items():
+                    if rows:
+                        columns = COLUMNS[table]
+                        self._connection.executemany(
+                            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' * len(columns))})", rows)
+                for sql, parameters in statements:
+                    self._connection.execute(sql, parameters)
+
+    def record_phase(self, run_id, serial, name, duration, success, started=None):
+        self._queue('phases', [(run_id, serial, name, started, duration, int(bool(success)))])
+
+    def record_device(self, run_id, result, spans=()):
+        """
+        Queue a device result of Campaign.run_device together with its trace spans:
+        phase spans become phases, shell spans commands and OTA phase spans the OTA outcome.
+        :param result: Device result dictionary.
+        :param spans: Span dictionaries (Span.as_dict) of the device.
+        """
+        serial = result['serial']
+        phases = result.get('phases', {})
+        self._queue('devices', [(run_id, serial, result.get('product_name'), result.get('initial_version'),
+                                 result.get('final_version'), int(bool(result['success'])), result.get('failed_phase'),
+                                 result.get('error'), round(sum(phases.values()), 3))])
+
+        starts = {span['name']: span['start'] for span in spans if span['category'] == 'phase'}
+        self._queue('phases', [(run_id, serial, name, starts.get(name), duration,
+                                int(name != result.get('failed_phase')))
+                               for name, duration in phases.items()])
+        # The span name is the command before `-s <serial>` was added, so devices group together
+        self._queue('commands', [(run_id, serial, span['name'], span['start'],
+                                  span['duration'], _flag(span['attrs'].get('success')),
+                                  int(bool(span['attrs'].get('timed_out'))))
+                                 for span in spans if span['category'] == 'shell'])
+
+        ota_seconds = {}
+        for span in spans:
+            if span['category'] == 'ota_phase':
+                phase = span['name'].split(' ', 1)[-1]
+                ota_seconds[phase] = ota_seconds.get(phase, 0) + span['duration']
+        if 'wait_for_ota' in phases:
+            ota_failed = result.get('failed_phase') in ('start_ota_process', 'wait_for_ota')
+            self._queue('ota_outcomes', [(run_id, serial, result.get('initial_version'), result.get('final_version'),
+                                          int(not ota_failed), ota_seconds.get('downloading'),
+                                          ota_seconds.get('verifying'), ota_seconds.get('installing'),
+                                          result.get('error') if ota_failed else None)])
+
+    # ------------------------------------------------------------------ reading
+
+    def query(self, sql, parameters=()):
+        """
+        :return: The rows of a read query as dictionaries.
+        """
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, parameters)]
+
+    def recent_runs(self, limit=20, name=None):
+        return self.query("SELECT * FROM runs WHERE (? IS NULL OR name = ?) ORDER BY started DESC LIMIT ?",
+                          (name, name, limit))
+
+    def phase_trend(self, phase, name=None, product_name=None, limit=500):
+        """
+        Duration of one phase over the latest `limit` runs, oldest first.
+        :param phase: Phase name, e.g. 'wait_for_ota'.
+        :param name: Optional build or test case name.
+        :param product_name: Optional product, e.g. 'galileo'.
+        :return: Rows with run_id, started, devices, average, minimum and maximum seconds.
+        """
+        rows = self.query(
+            "SELECT runs.run_id, runs.started, COUNT(*) AS devices, AVG(phases.duration) AS average, "
+            "MIN(phases.duration) AS minimum, MAX(phases.duration) AS maximum "
+            "FROM phases JOIN runs ON runs.run_id = phases.run_id "
+            "LEFT JOIN devices ON devices.run_id = phases.run_id AND devices.serial = phases.serial "
+            "WHERE phases.name = ? AND (? IS NULL OR runs.name = ?) AND (? IS NULL OR devices.product_name = ?) "
+            "GROUP BY runs.run_id ORDER BY runs.started DESC LIMIT ?",
+            (phase, name, name, product_name, product_name, limit))
+        return rows[::-1]
+
+    def ota_summary(self, product_name=None, limit=500):
+        """
+        OTA outcomes per version pair over the latest `limit` runs.
+        :return: Rows with from_version, to_version, attempts, successes and average phase seconds.
+        """
+        return self.query(
+            "SELECT from_version, to_version, COUNT(*) AS attempts, SUM(ota_outcomes.success) AS successes, "
+            "AVG(download_seconds) AS download, AVG(verify_seconds) AS verify, AVG(install_seconds) AS install "
+            "FROM ota_outcomes JOIN devices USING (run_id, serial) "
+            "WHERE run_id IN (SELECT run_id FROM runs ORDER BY started DESC LIMIT ?) "
+            "AND (? IS NULL OR devices.product_name = ?) "
+            "GROUP BY from_version, to_version ORDER BY attempts DESC",
+            (limit, product_name, product_name))
+
+    def slowest_commands(self, run_id=None, limit=20):
+        return self.query(
+            "SELECT command, COUNT(*) AS count, SUM(duration) AS total, MAX(duration) AS longest, "
+            "SUM(timed_out) AS timed_out FROM commands WHERE (? IS NULL OR run_id = ?) "
+            "GROUP BY command ORDER BY total DESC LIMIT ?", (run_id, run_id, limit))
+
+
+def _flag(value):
+    return None if value is None else int(bool(value))
+
+def print_rows(rows):
+    """
+    Print rows as an aligned text table.
+    """
+    if not rows:
+        print("No rows.")
+        return
+    columns = list(rows[0])
+    cells = [[_format(row[column]) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[index]) for line in cells)) for index, column in enumerate(columns)]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print('  '.join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+def _format(value):
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return '' if value is None else str(value)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query the run history database.")
+    parser.add_argument('--db', default=None, help="Database file, defaults to the configured one.")
+    commands = parser.add_subparsers(dest='query', required=True)
+
+    runs = commands.add_parser('runs', help="Latest runs.")
+    runs.add_argument('--name', default=None, help="Only runs of this build or test case.")
+    runs.add_argument('--limit', type=int, default=20)
+
+    trend = commands.add_parser('trend', help="Duration of one phase across runs.")
+    trend.add_argument('phase', help="Phase name, e.g. wait_for_ota.")
+    trend.add_argument('--name', default=None, help="Only runs of this build or test case.")
+    trend.add_argument('--product', default=None, help="Only devices of this product, e.g. galileo.")
+    trend.add_argument('--limit', type=int, default=500)
+
+    ota = commands.add_parser('ota', help="OTA outcomes per version pair.")
+    ota.add_argument('--product', default=None)
+    ota.add_argument('--limit', type=int, default=500)
+
+    slowest = commands.add_parser('commands', help="Commands that took the most time.")
+    slowest.add_argument('--run', default=None, help="Only this run id.")
+    slowest.add_argument('--limit', type=int, default=20)
+
+    sql = commands.add_parser('sql', help="Run an SQL query.")
+    sql.add_argument('statement')
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = ResultsStore(args.db)
+    if args.query == 'runs':
+        print_rows(store.recent_runs(args.limit, args.name))
+    elif args.query == 'trend':
+        print_rows(store.phase_trend(args.phase, args.name, args.product, args.limit))
+    elif args.query == 'ota':
+        print_rows(store.ota_summary(args.product, args.limit))
+    elif args.query == 'commands':
+        print_rows(store.slowest_commands(args.run, args.limit))
+    else:
+        print_rows(store.query(args.statement))
+    store.close()
@@ -0,0 +1,214 @@
+import asyncio
+import configparser
+import os
+import random
+import threading
+import time
+from ota_framework.config.constants import Profiles
+from ota_framework.core.context import current_serial, effective_timeout, is_cancelled
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_snapshot import DeviceSnapshot
+
+# Initialize the logger for this module
+logger = CustomLogger('RetryLogger')
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '../config/config.ini')
+
+# Per-policy counters: calls, successes, failures, attempts, waited and elapsed seconds
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def failed(result):
+    """
+    Default retry predicate: retry while the result dictionary reports failure.
+    """
+    return not result['success']
+
+class RetryPolicy:
+    """
+    Retries an action with exponential backoff and jitter until it succeeds, the attempts
+    run out or the overall deadline passes.
+
+    Settings come from the [retry:<name>] section of config.ini and can be overridden per
+    device in [retry:<name>:<product name>] or [retry:<name>:tv] / [retry:<name>:multimodal].
+    """
+    SETTINGS = ('max_attempts', 'initial_delay', 'max_delay', 'backoff', 'jitter', 'deadline')
+    # Settings where 'none' in config.ini means no limit, for the others it means the default
+    LIMITS = ('max_attempts', 'max_delay', 'deadline')
+
+    def __init__(self, name, max_attempts=5, initial_delay=1, max_delay=30, backoff=2, jitter=0.1, deadline=None):
+        """
+        :param name: Policy name, used for configuration, logs and metrics.
+        :param max_attempts: Maximum number of calls of the action, None for no limit besides the deadline.
+        :param initial_delay: Seconds to wait after the first failed attempt.
+        :param max_delay: Upper bound of the wait between attempts, None for no bound.
+        :param backoff: Factor the wait grows by after every failed attempt.
+        :param jitter: Random fraction (e.g. 0.1 for +-10%) applied to every wait.
+        :param deadline: Overall seconds for all attempts and waits, None for no limit.
+        :raises ValueError: If neither max_attempts nor deadline bounds the retries.
+        """
+        if max_attempts is None and deadline is None:
+            raise ValueError(f"Retry policy '{name}' needs max_attempts or a deadline, it would retry forever")
+        self.name = name
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.deadline = deadline
+
+    @staticmethod
+    def for_device(name, product_name=None, **overrides):
+        """
+        Build a policy from config.ini for the given (or current) device.
+        :param name: Policy name, the [retry:<name>] section.
+        :param product_name: Product name selecting the profile section. Defaults to the cached
+                             product name of the current device, the device is not queried for it.
+        :param overrides: Settings taking precedence over the configuration, None values are ignored.
+        """
+        config = configparser.ConfigParser()
+        config.read(CONFIG_PATH)
+        if product_name is None:
+            snapshot = DeviceSnapshot.for_device(current_serial())
+            product_name = snapshot.product_name if snapshot.is_fresh('product_name') else None
+
+        sections = [f"retry:{name}"]
+        if product_name:
+            profile = 'tv' if product_name == Profiles.TV else 'multimodal' if product_name in Profiles.MULTIMODAL else None
+            sections += [f"retry:{name}:{profile}"] if profile else []
+            sections.append(f"retry:{name}:{product_name}")
+
+        settings = {}
+        for section in sections:
+            if config.has_section(section):
+                for key in RetryPolicy.SETTINGS:
+                    if config.has_option(section, key):
+                        value = config.get(section, key)
+                        if value.lower() != 'none':
+                            settings[key] = float(value)
+                        elif key in RetryPolicy.LIMITS:
+                            settings[key] = None
+                        else:
+                            settings.pop(key, None)
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        if settings.get('max_attempts') is not None:
+            settings['max_attempts'] = int(settings['max_attempts'])
+        return RetryPolicy(name, **settings)
+
+    def delay(self, attempt):
+        """
+        :return: Seconds to wait after the given (1-based) failed attempt.
+        """
+        delay = self.initial_delay * self.backoff ** (attempt - 1)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return max(delay * (1 + random.uniform(-self.jitter, self.jitter)), 0)
+
+    def run(self, action, retry_on=failed, description=None):
+        """
+        Call `action` until `retry_on(result)` is false.
+        Exceptions count as failed attempts; the last one is re-raised when no attempt is left.
+        The enclosing context.deadline and device cancellation also end the retries.
+        :param action: Callable without arguments, usually returning a result dictionary.
+        :param retry_on: Predicate over the result telling whether to try again.
+        :param description: Text for the logs, defaults to the policy name.
+        :return: The last result. Result dictionaries also get the 'attempts' key.
+        """
+        description = description or self.name
+        start = time.monotonic()
+        end = self._end(start)
+        waited = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            result, error, retry = None, None, True
+            try:
+                result = action()
+                retry = retry_on(result)
+            except Exception as e:
+                error = e
+            delay = self._next_delay(attempt, error, retry, end, description)
+            if delay is None:
+                break
+            time.sleep(delay)
+            waited += delay
+        return self._finish(result, error, retry, attempt, waited, start, description)
+
+    async def async_run(self, action, retry_on=failed, description=None):
+        """
+        Coroutine counterpart of run.
+        :param action: Coroutine function without arguments, usually returning a result dictionary.
+        """
+        description = description or self.name
+        start = time.monotonic()
+        end = self._end(start)
+        waited = 0.0
+        attempt = 0
+        while True:
+            attempt += 1
+            result, error, retry = None, None, True
+            try:
+                result = await action()
+                retry = retry_on(result)
+            except Exception as e:
+                error = e
+            delay = self._next_delay(attempt, error, retry, end, description)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        return self._finish(result, error, retry, attempt, waited, start, description)
+
+    def _end(self, start):
+        timeout = effective_timeout(self.deadline)
+        return None if timeout is None else start + timeout
+
+    def _next_delay(self, attempt, error, retry, end, description):
+        """
+        :return: Seconds to wait before the next attempt, None when the retries are over.
+        """
+        if error is None and not retry:
+            return None
+        if (self.max_attempts is not None and attempt >= self.max_attempts) or is_cancelled():
+            return None
+        delay = self.delay(attempt)
+        if end is not None and time.monotonic() + delay > end:
+            delay = end - time.monotonic()
+            if delay <= 0:
+                return None
+        logger.warning(f"{description}: attempt {attempt} of {self.max_attempts or 'unlimited'} "
+                       f"{'raised ' + str(error) if error else 'did not succeed'}, retrying in {delay:.1f} seconds")
+        return delay
+
+    def _finish(self, result, error, retry, attempt, waited, start, description):
+        succeeded = error is None and not retry
+        self._record(succeeded, attempt, waited, time.monotonic() - start)
+        if not succeeded:
+            logger.error(f"{description}: giving up after {attempt} attempts in {time.monotonic() - start:.1f} seconds")
+            if error is not None:
+                raise error
+        if isinstance(result, dict):
+            result['attempts'] = attempt
+        return result
+
+    def _record(self, succeeded, attempts, waited, elapsed):
+        with _metrics_lock:
+            metrics = _metrics.setdefault(self.name, {'calls': 0, 'successes': 0, 'failures': 0,
+                                                      'attempts': 0, 'waited': 0.0, 'elapsed': 0.0})
+            metrics['calls'] += 1
+            metrics['successes' if succeeded else 'failures'] += 1
+            metrics['attempts'] += attempts
+            metrics['waited'] += waited
+            metrics['elapsed'] += elapsed
+
+
+def get_retry_metrics():
+    """
+    :return: A copy of the per-policy metrics: calls, successes, failures, attempts, waited and elapsed seconds.
+    """
+    with _metrics_lock:
+        return {name: dict(metrics) for name, metrics in _metrics.items()}
+
+def clear_retry_metrics():
+    with _metrics_lock:
+        _metrics.clear()
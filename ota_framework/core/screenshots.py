@@ -0,0 +1,169 @@
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from ota_framework.config.constants import DeviceCommands
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.shell import Shell, device_context, current_serial
+
+# Initialize the logger for this module
+logger = CustomLogger('ScreenshotLogger')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Number of pixel bytes compared between two frames
+SIGNATURE_SAMPLES = 4096
+
+def frame_signature(png, samples=SIGNATURE_SAMPLES):
+    """
+    Sample the decompressed image data of a PNG at evenly spaced offsets.
+    :return: The sampled bytes, or None if the data is not a readable PNG.
+    """
+    if not png.startswith(PNG_SIGNATURE):
+        return None
+    offset, idat = len(PNG_SIGNATURE), []
+    try:
+        while offset + 8 <= len(png):
+            length, kind = struct.unpack('>I4s', png[offset:offset + 8])
+            if kind == b'IDAT':
+                idat.append(png[offset + 8:offset + 8 + length])
+            elif kind == b'IEND':
+                break
+            offset += length + 12
+        pixels = zlib.decompress(b''.join(idat))
+    except (struct.error, zlib.error):
+        return None
+    step = max(len(pixels) // samples, 1)
+    return pixels[::step]
+
+def frame_difference(first, second):
+    """
+    :return: The fraction (0 to 1) of sampled bytes differing between two frame signatures.
+    """
+    if first is None or second is None or len(first) != len(second) or not first:
+        return 1.0
+    return sum(a != b for a, b in zip(first, second)) / len(first)
+
+
+class ScreenshotCapture:
+    """
+    Captures device screenshots straight to the host with `adb exec-out`: the
+    image is streamed from the screenshooter's stdout, nothing is written on the
+    device and no separate pull is needed.
+
+    Files are named <serial>_<step>_<n>.png, so devices and steps never
+    overwrite each other. With `skip_duplicates` a frame that barely differs
+    from the previously saved one is not written.
+    """
+    def __init__(self, output_dir, serial=None, skip_duplicates=False, duplicate_threshold=0.01):
+        """
+        :param output_dir: Local folder receiving the screenshots.
+        :param serial: Device serial number, defaults to the device of the current device_context.
+        :param skip_duplicates: Do not save frames that are near-duplicates of the last saved one.
+        :param duplicate_threshold: Largest fraction of differing pixel bytes still counted as a duplicate.
+        """
+        self.output_dir = output_dir
+        self.serial = serial or current_serial()
+        self.skip_duplicates = skip_duplicates
+        self.duplicate_threshold = duplicate_threshold
+        self.saved = []
+        self._counters = {}
+        self._last_signature = None
+        self._lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def file_name(self, step, serial=None):
+        serial = serial or self.serial or 'device'
+        with self._lock:
+            index = self._counters.get((serial, step), 0) + 1
+            self._counters[(serial, step)] = index
+        step = re.sub(r'[^\w.-]+', '_', step)
+        return os.path.join(self.output_dir, f"{serial}_{step}_{index:03d}.png")
+
+    def capture(self, step='screenshot', filename=None):
+        """
+        Take one screenshot.
+        :param step: Name of the test step, part of the file name.
+        :param filename: Optional file name inside the output folder instead of the generated one.
+        :return: A dictionary with 'success', 'output' (the saved path), 'error' and 'duplicate' keys.
+        """
+        serial = self.serial or current_serial()
+        with device_context(serial):
+            result = Shell.execute_command(DeviceCommands.SCREENSHOT_STREAM, binary=True)
+        image = result['output']
+        if not result['success'] or not image.startswith(PNG_SIGNATURE):
+            error = result['error'] or "Screenshot output is not a PNG image"
+            logger.error(f"Screenshot for {step} failed: {error}")
+            return {'success': False, 'output': '', 'error': error, 'duplicate': False}
+
+        if self.skip_duplicates:
+            signature = frame_signature(image)
+            with self._lock:
+                duplicate = frame_difference(signature, self._last_signature) <= self.duplicate_threshold
+                if not duplicate:
+                    self._last_signature = signature
+            if duplicate:
+                logger.debug(f"Screenshot for {step} unchanged, not saved")
+                return {'success': True, 'output': '', 'error': '', 'duplicate': True}
+
+        path = os.path.join(self.output_dir, filename) if filename else self.file_name(step, serial)
+        with open(path, 'wb') as file:
+            file.write(image)
+        with self._lock:
+            self.saved.append(path)
+        logger.info(f"Screenshot saved to: {path}")
+        return {'success': True, 'output': path, 'error': '', 'duplicate': False}
+
+    def burst(self, step, count, interval=0.5):
+        """
+        Take `count` screenshots `interval` seconds apart.
+        :return: The list of capture results.
+        """
+        results = []
+        for index in range(count):
+            if index:
+                time.sleep(interval)
+            results.append(self.capture(step))
+        return results
+
+    def start_periodic(self, interval, step='periodic'):
+        """
+        Capture every `interval` seconds on a background thread until stop_periodic().
+        """
+        if self._thread is not None:
+            raise Exception("Periodic capture is already running")
+        self._stop = threading.Event()
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.capture(step)
+                except Exception as e:
+                    logger.error(f"Periodic screenshot failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=run, name=f"screenshots-{self.serial}")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop_periodic(self, timeout=30):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    @contextmanager
+    def periodic(self, interval, step='periodic'):
+        """
+        Capture periodically while the enclosed block runs, e.g. during the OTA download and install.
+        """
+        self.start_periodic(interval, step)
+        try:
+            yield self
+        finally:
+            self.stop_periodic()
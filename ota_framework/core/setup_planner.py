@@ -0,0 +1,160 @@
+from ota_framework.config.constants import Profiles, WiFiConstants
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.reboot_scheduler import RebootScheduler
+
+# Initialize the logger for this module
+logger = CustomLogger('SetupPlannerLogger')
+
+# Order in which missing steps are run
+STEP_ORDER = ('wifi', 'registration', 'dev_flags', 'alexa', 'oobe')
+
+# Steps that take effect after a reboot; they are staged and share one reboot
+REBOOT_STEPS = ('dev_flags', 'oobe')
+
+# Step -> snapshot fields its current state is read from
+STEP_FIELDS = {
+    'wifi': ('net_state',),
+    'registration': ('registration',),
+    'dev_flags': ('dev_flags',),
+    'alexa': ('oobe_complete',),
+    'oobe': ('profile', 'oobe_complete', 'user_setup_complete'),
+}
+
+def flags_equal(current, desired):
+    try:
+        return current is not None and int(str(current), 16) == int(str(desired), 16)
+    except ValueError:
+        return False
+
+def is_met(step, desired, snapshot):
+    """
+    Tell whether a device snapshot already meets the desired value of a setup step.
+    :param step: One of STEP_ORDER.
+    :param desired: Target value: True for 'wifi' (connected to WiFiConstants.SSID), 'registration', 'alexa' and
+                    'oobe', the flag value for 'dev_flags'.
+    :param snapshot: DeviceSnapshot holding fresh values of the step's STEP_FIELDS.
+    """
+    if step == 'wifi':
+        return (snapshot.net_state is not None and snapshot.net_state.state == 'CONNECTED'
+                and snapshot.net_state.ssid == WiFiConstants.SSID)
+    if step == 'registration':
+        return snapshot.registration == 'DEVICE_REGISTERED'
+    if step == 'dev_flags':
+        return flags_equal(snapshot.dev_flags, desired)
+    if step == 'alexa':
+        return snapshot.oobe_complete == 'true'
+    if step == 'oobe':
+        if snapshot.profile == Profiles.TV:
+            # TV devices have no OOBE to skip
+            return True
+        return (snapshot.profile == Profiles.MULTIMODAL and snapshot.user_setup_complete == '1'
+                and snapshot.oobe_complete == 'true')
+    raise ValueError(f"Unknown setup step '{step}'")
+
+def read_state(steps):
+    """
+    :return: The device snapshot with fresh values for every field the given steps read, stale ones
+             refreshed in one round trip.
+    """
+    snapshot = DeviceSnapshot.for_device()
+    stale = sorted({field for step in steps for field in STEP_FIELDS[step] if not snapshot.is_fresh(field)})
+    if stale:
+        snapshot.refresh(stale)
+    return snapshot
+
+def describe(step, snapshot):
+    """
+    :return: The current state of a step as reported in the plan.
+    """
+    values = [f"{field}={getattr(snapshot, field)}" for field in STEP_FIELDS[step]]
+    return ', '.join(values)
+
+
+class SetupPlanner:
+    """
+    Idempotent device setup: reads the current device state, diffs it against
+    the desired state and runs only the transitions that are missing.
+
+    The desired state maps setup steps to target values, e.g.
+    {'wifi': True, 'registration': True, 'dev_flags': '0'} before an OTA or
+    {'alexa': True, 'dev_flags': '0x440', 'oobe': True} after it. The current
+    state of every step is read from the DeviceSnapshot in one round trip, and
+    the plan is logged before anything runs. Steps run in STEP_ORDER through
+    the matching Precon methods; the REBOOT_STEPS among them are staged on a
+    RebootScheduler and committed together with a single reboot at the end.
+    """
+    def __init__(self, precon, desired):
+        """
+        :param precon: Precon instance running the steps.
+        :param desired: Dictionary of step name to target value.
+        """
+        unknown = set(desired) - set(STEP_ORDER)
+        if unknown:
+            raise ValueError(f"Unknown setup steps: {', '.join(sorted(unknown))}")
+        self.precon = precon
+        self.desired = desired
+
+    def action(self, step):
+        """
+        :return: The Precon method bringing a step to its desired value.
+        """
+        if step == 'dev_flags':
+            if flags_equal(self.desired[step], '0x440'):
+                return self.precon.flag_440
+            if flags_equal(self.desired[step], '0'):
+                return self.precon.flag
+            raise ValueError(f"No setup action sets dev_flags to {self.desired[step]}")
+        return {
+            'wifi': self.precon.wifi_setup,
+            'registration': self.precon.reg_device,
+            'alexa': self.precon.alexa,
+            'oobe': self.precon.skip_oobe,
+        }[step]
+
+    def plan(self):
+        """
+        Read the current state and diff it against the desired state.
+        :return: A list of dictionaries with 'step', 'current', 'desired' and 'run' keys, in STEP_ORDER.
+        """
+        steps = [step for step in STEP_ORDER if step in self.desired]
+        snapshot = read_state(steps)
+        return [{'step': step, 'current': describe(step, snapshot), 'desired': self.desired[step],
+                 'run': not is_met(step, self.desired[step], snapshot)}
+                for step in steps]
+
+    @staticmethod
+    def report(plan):
+        """
+        Log a plan.
+        :return: The plan as text, one line per step.
+        """
+        lines = [f"{'RUN ' if entry['run'] else 'SKIP'} {entry['step']}: {entry['current']} "
+                 f"(desired {entry['desired']})" for entry in plan]
+        text = '\n'.join(lines)
+        logger.info(f"Setup plan, {sum(entry['run'] for entry in plan)} of {len(plan)} steps to run:\n{text}")
+        return text
+
+    def execute(self, plan=None):
+        """
+        Run the missing steps of a plan, planning first if none is given.
+        :return: A dictionary with 'plan', 'ran', 'skipped' and 'reboot' (the RebootScheduler commit result) keys.
+        """
+        if plan is None:
+            plan = self.plan()
+            self.report(plan)
+        ran, skipped = [], []
+        scheduler = RebootScheduler()
+        for entry in plan:
+            if not entry['run']:
+                skipped.append(entry['step'])
+                continue
+            logger.info(f"Running setup step {entry['step']}")
+            if entry['step'] in REBOOT_STEPS:
+                self.action(entry['step'])(scheduler=scheduler)
+            else:
+                self.action(entry['step'])()
+            ran.append(entry['step'])
+        reboot = scheduler.commit()
+        assert reboot['success'], f"Setup steps failed after reboot: {reboot['error']}"
+        return {'plan': plan, 'ran': ran, 'skipped': skipped, 'reboot': reboot}
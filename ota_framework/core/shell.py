@@ -1,32 +1,694 @@
+import collections
+import os
+import queue
+import re
+import shlex
+import signal
+import socket
 import subprocess
+import threading
+import time
+import uuid
+from ota_framework.core.adb_client import AdbClient, AdbError
+from ota_framework.core.adb_session import AdbSessionPool
+from ota_framework.core.context import (device_context, current_serial, deadline, effective_timeout, is_cancelled,
+                                        cancel_device, timed_out_result, cancelled_result)
+from ota_framework.core import tracing
+
+# Matches `adb [-s <serial>] shell <command>` so the device-side part can be sent
+# over a pooled session instead of spawning a new adb process.
+ADB_SHELL_PATTERN = re.compile(r'^adb(?:\s+-s\s+(?P<serial>\S+))?\s+shell\s+(?P<command>\S.*)$', re.DOTALL)
+
+# Matches `adb [-s <serial>] push|pull <paths>` for the native transport
+ADB_TRANSFER_PATTERN = re.compile(r'^adb(?:\s+-s\s+(?P<serial>\S+))?\s+(?P<direction>push|pull)\s+(?P<paths>\S.*)$')
+
+# Matches `adb [-s <serial>] exec-out <command>`, whose raw stdout is returned by the native transport
+ADB_EXEC_OUT_PATTERN = re.compile(r'^adb(?:\s+-s\s+(?P<serial>\S+))?\s+exec-out\s+(?P<command>\S.*)$', re.DOTALL)
+
+# Matches the serial of an `adb -s <serial> ...` command
+ADB_SERIAL_PATTERN = re.compile(r'^\s*adb\s+-s\s+(?P<serial>\S+)')
+
+ADB_DEVICES_COMMAND = 'adb devices'
+
+# Seconds a process group gets to exit after SIGTERM before it is killed
+KILL_GRACE_PERIOD = 2
+
+# Device-side commands that tear down the adb connection and must not run on a
+# pooled session or a native transport
+CONNECTION_RESET_COMMANDS = ('reboot',)
+
+# Host shell operators ending the device-side part of an `adb shell` command
+HOST_OPERATORS = '|;&<>'
+
+BATCH_MARKER_PREFIX = '__OTA_BATCH__'
+BATCH_NOT_EXECUTED = 'Not executed: an earlier command in the batch failed'
+
+def with_serial(command, serial):
+    """
+    Insert `-s <serial>` after a leading `adb` unless the command already targets a device.
+    :param command: Command string, e.g. from config.constants.
+    :param serial: Device serial number, or None to leave the command unchanged.
+    :return: The command string targeting the given device.
+    """
+    if not serial:
+        return command
+    stripped = command.lstrip()
+    if not stripped.startswith('adb ') or stripped.startswith('adb -s '):
+        return command
+    return f"adb -s {serial} {stripped[4:]}"
+
+def split_host_command(command):
+    """
+    Split a command at the first shell operator outside quotes, the way the host shell
+    splits `adb shell idme print | grep flags` before adb sees it.
+    :param command: Command string after `adb shell`.
+    :return: A (head, operator, tail) tuple; operator and tail are None without an operator.
+    """
+    quote = None
+    escaped = False
+    for index, char in enumerate(command):
+        if escaped:
+            escaped = False
+        elif char == '\\' and quote != "'":
+            escaped = True
+        elif quote:
+            if char == quote:
+                quote = None
+        elif char in '\'"':
+            quote = char
+        elif char in HOST_OPERATORS:
+            operator = command[index:index + 2] if command[index:index + 2] in ('||', '&&') else char
+            return command[:index].rstrip(), operator, command[index + len(operator):].strip()
+    return command, None, None
 
 class Shell:
+    # 'subprocess' spawns one process per command, 'session' reuses a pooled `adb shell` per device,
+    # 'native' talks to the adb server socket directly without spawning adb at all,
+    # 'simulator' answers every command from the in-process FakeDeviceFarm set in Shell.simulator
+    backend = os.getenv('OTA_SHELL_BACKEND', 'subprocess')
+    # Default per-command timeout in seconds, 0 for no limit
+    command_timeout = float(os.getenv('OTA_COMMAND_TIMEOUT', '300'))
+    simulator = None
+    # Running processes per device serial, killed by cancel_device
+    _running = {}
+    _running_lock = threading.Lock()
+    _session_pool = None
+    _native_client = None
+
     @staticmethod
-    def execute_command(command, redirect_output=False, output_file=None):
+    def use_simulator(farm):
+        """
+        Send every command to a simulated device farm instead of real devices.
+        :param farm: A FakeDeviceFarm, or None to go back to the 'subprocess' backend.
+        """
+        Shell.simulator = farm
+        Shell.backend = 'simulator' if farm else 'subprocess'
+
+    @staticmethod
+    def execute_command(command, redirect_output=False, output_file=None, cwd=None, timeout=None, binary=False):
         """
         Execute a shell command.
+        The command runs in its own process group, which is killed as a whole when the
+        command times out or its device is cancelled, so no orphaned `adb` is left behind.
         :param command: Command to be executed.
         :param redirect_output: Flag to indicate if output should be redirected.
         :param output_file: File to which output should be redirected.
+        :param cwd: Directory to run the command in.
+        :param timeout: Seconds the command may run, defaults to Shell.command_timeout, 0 for no limit.
+                        An enclosing context.deadline can shorten it.
+        :param binary: Return the output as bytes, e.g. for `adb exec-out` image data.
         :return: A dictionary with 'success', 'output', and 'error' keys, or a process object if redirecting.
+                 Timed out commands also have 'timed_out' set, cancelled ones 'cancelled'.
         """
+        with tracing.span(command, category='shell', serial=current_serial()) as span:
+            command = with_serial(command, current_serial())
+            span.set(command=command)
+            result = Shell._execute_command(command, redirect_output, output_file, cwd, timeout, binary)
+            if isinstance(result, dict):
+                span.set(success=result['success'])
+                if result.get('timed_out'):
+                    span.set(timed_out=True)
+            return result
+
+    @staticmethod
+    def command_serial(command):
+        """
+        :return: The serial an adb command is sent to, falling back to the current device_context.
+        """
+        match = ADB_SERIAL_PATTERN.match(command)
+        return match.group('serial') if match else current_serial()
+
+    @staticmethod
+    def _execute_command(command, redirect_output=False, output_file=None, cwd=None, timeout=None, binary=False):
+        serial = Shell.command_serial(command)
+        if is_cancelled(serial):
+            return cancelled_result(serial)
+        timeout = effective_timeout((timeout if timeout is not None else Shell.command_timeout) or None)
+        if timeout is not None and timeout <= 0:
+            return timed_out_result(0)
+        result = Shell._run_backend(command, serial, redirect_output, output_file, cwd, timeout, binary)
+        return Shell.report_cancelled(serial, result) if isinstance(result, dict) else result
+
+    @staticmethod
+    def report_cancelled(serial, result):
+        """
+        Mark a failed result as cancelled when its device was cancelled while it ran, so every
+        backend reports work stopped by Shell.cancel_device the same way.
+        """
+        if result['success'] or result.get('cancelled') or not is_cancelled(serial):
+            return result
+        return cancelled_result(serial, result['output'], result['error'])
+
+    @staticmethod
+    def _run_backend(command, serial, redirect_output, output_file, cwd, timeout, binary):
         try:
+            if Shell.backend == 'simulator':
+                # The simulated command stops at the deadline like a real one would
+                with deadline(timeout):
+                    result = Shell.simulator.execute_command(command, cwd=cwd)
+                if binary:
+                    result['output'] = result['output'].encode('latin-1')
+                return result
             if redirect_output and output_file:
                 file = open(output_file, 'a')
-                process = subprocess.Popen(command, shell=True, stdout=file, stderr=file)
+                process = subprocess.Popen(command, shell=True, stdout=file, stderr=file, cwd=cwd,
+                                           start_new_session=True)
                 return process
-            else:
-                process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                output, error = process.communicate()
-                success = process.returncode == 0
-                return {
-                    'success': success,
-                    'output': output.decode(),
-                    'error': error.decode()
-                }
+            elif Shell.backend == 'session':
+                device_command = Shell.parse_device_command(command)
+                if device_command:
+                    serial, shell_command, host_pipe = device_command
+                    if shell_command.split()[0] in CONNECTION_RESET_COMMANDS:
+                        # The session dies with the connection, start a fresh one next time
+                        Shell.session_pool().close(serial)
+                    else:
+                        result = Shell.session_pool().run(serial, shell_command, timeout=timeout)
+                        return Shell.pipe_on_host(result, host_pipe, timeout)
+            elif Shell.backend == 'native':
+                result = Shell._execute_native(command, timeout)
+                if result is not None:
+                    if isinstance(result['output'], bytes) and not binary:
+                        result['output'] = result['output'].decode(errors='replace')
+                    return result
+            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd,
+                                       start_new_session=True)
+            Shell._track(serial, process)
+            try:
+                output, error = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                Shell.kill_process(process)
+                try:
+                    output, error = process.communicate(timeout=KILL_GRACE_PERIOD)
+                except subprocess.TimeoutExpired:
+                    output, error = b'', b''
+                tracing.annotate(exit_code=process.returncode)
+                return timed_out_result(timeout, output if binary else output.decode(errors='replace'),
+                                        error.decode(errors='replace'))
+            finally:
+                Shell._untrack(serial, process)
+            tracing.annotate(exit_code=process.returncode)
+            success = process.returncode == 0
+            return {
+                'success': success,
+                'output': output if binary else output.decode(),
+                'error': error.decode()
+            }
         except Exception as e:
             return {
                 'success': False,
                 'output': '',
                 'error': str(e)
             }
+
+    @staticmethod
+    def _track(serial, process):
+        with Shell._running_lock:
+            Shell._running.setdefault(serial, set()).add(process)
+
+    @staticmethod
+    def _untrack(serial, process):
+        with Shell._running_lock:
+            Shell._running.get(serial, set()).discard(process)
+
+    @staticmethod
+    def kill_process(process, grace=KILL_GRACE_PERIOD):
+        """
+        Stop a process started by Shell together with its whole process group:
+        SIGTERM first, SIGKILL if it is still running after `grace` seconds.
+        """
+        if not isinstance(process, subprocess.Popen):
+            # Simulated processes and native connections have no process group
+            process.terminate()
+            return
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                return
+            try:
+                process.wait(timeout=grace)
+                return
+            except subprocess.TimeoutExpired:
+                continue
+
+    @staticmethod
+    def cancel_device(serial):
+        """
+        Cancel everything running for a device: its processes are killed, its session is
+        closed and new commands for it return a 'cancelled' result until
+        context.clear_cancellation(serial) is called.
+        """
+        cancel_device(serial)
+        with Shell._running_lock:
+            processes = list(Shell._running.get(serial, ()))
+        for process in processes:
+            Shell.kill_process(process, grace=0.5)
+        if Shell._session_pool is not None:
+            Shell._session_pool.close(serial)
+
+    @staticmethod
+    def execute_batch(commands, delays=0, stop_on_error=True, timeout=None):
+        """
+        Execute several `adb shell` commands for one device in a single device round trip.
+        The commands run as one script on the device. Their output is split back out using
+        marker lines, and every command keeps its own exit code.
+        Commands that are not `adb shell` commands, or that target different devices, are run one by one.
+        :param commands: List of `adb [-s <serial>] shell <command>` strings.
+        :param delays: Seconds to sleep on the device after each command, a number or a list.
+        :param stop_on_error: Flag to stop at the first failing command.
+        :param timeout: Seconds the whole batch may run, defaults to Shell.command_timeout, 0 for no limit.
+        :return: A list with one dictionary per command with 'success', 'output', and 'error' keys.
+        """
+        with tracing.span('; '.join(commands), category='batch', serial=current_serial(), commands=len(commands)) as span:
+            results = Shell._execute_batch(commands, delays, stop_on_error, timeout)
+            span.set(success=[result['success'] for result in results])
+            return results
+
+    @staticmethod
+    def _execute_batch(commands, delays, stop_on_error, timeout):
+        if not isinstance(delays, (list, tuple)):
+            delays = [delays] * len(commands)
+        parsed = [Shell.parse_device_command(with_serial(command, current_serial())) for command in commands]
+        serials = {device_command[0] for device_command in parsed if device_command}
+        if not commands or None in parsed or len(serials) > 1 or \
+                any(device_command[1].split()[0] in CONNECTION_RESET_COMMANDS for device_command in parsed):
+            with deadline(timeout or None):
+                return Shell._execute_sequence(commands, delays, stop_on_error)
+
+        serial = serials.pop()
+        if Shell.backend == 'simulator':
+            timeout = effective_timeout((timeout if timeout is not None else Shell.command_timeout) or None)
+            # The simulated devices apply host pipes themselves
+            with deadline(timeout):
+                return Shell.simulator.execute_batch(serial, [f"{device_command[1]} | {device_command[2]}"
+                                                              if device_command[2] else device_command[1]
+                                                              for device_command in parsed], delays, stop_on_error)
+        marker = f"{BATCH_MARKER_PREFIX}{uuid.uuid4().hex}"
+        script = Shell.build_batch_script([device_command[1] for device_command in parsed], delays, stop_on_error, marker)
+        result = Shell._execute_device_script(serial, script, timeout)
+        results = Shell.split_batch_output(result, len(commands), marker)
+        return [result if result['error'] == BATCH_NOT_EXECUTED else Shell.pipe_on_host(result, device_command[2])
+                for result, device_command in zip(results, parsed)]
+
+    @staticmethod
+    def _execute_sequence(commands, delays, stop_on_error):
+        results = []
+        for index, command in enumerate(commands):
+            if results and stop_on_error and not results[-1]['success']:
+                results.append({'success': False, 'output': '', 'error': BATCH_NOT_EXECUTED})
+                continue
+            results.append(Shell.execute_command(command))
+            if delays[index]:
+                time.sleep(delays[index])
+        return results
+
+    @staticmethod
+    def build_batch_script(device_commands, delays, stop_on_error, marker):
+        """
+        Build the device-side script for a batch. Each command is wrapped in begin/end
+        marker lines on stdout and stderr; the stdout end marker carries the exit code.
+        """
+        lines = []
+        for index, command in enumerate(device_commands):
+            lines.append(f"echo {marker}:begin:{index}; echo {marker}:begin:{index} >&2")
+            lines.append(f"{{ {command}\n}} </dev/null")
+            lines.append(f"rc=$?; printf '\\n{marker}:end:{index}:%d\\n' $rc; printf '\\n{marker}:end:{index}\\n' >&2")
+            if stop_on_error:
+                lines.append("[ $rc -eq 0 ] || exit 0")
+            if delays[index]:
+                lines.append(f"sleep {delays[index]}")
+        # Run in a subshell so stopping early never exits a pooled session's shell
+        return '(\n' + '\n'.join(lines) + '\n)'
+
+    @staticmethod
+    def split_batch_output(result, count, marker):
+        """
+        Split the combined output of a batch script into per-command results.
+        """
+        stdout_pattern = re.compile(rf'{marker}:begin:(\d+)\n(.*?)\n{marker}:end:\1:(\d+)\n', re.DOTALL)
+        stderr_pattern = re.compile(rf'{marker}:begin:(\d+)\n(.*?)\n{marker}:end:\1\n', re.DOTALL)
+        outputs = {int(index): (text, int(code)) for index, text, code in stdout_pattern.findall(result['output'])}
+        errors = {int(index): text for index, text in stderr_pattern.findall(result['error'])}
+
+        results = []
+        for index in range(count):
+            if index in outputs:
+                output, exit_code = outputs[index]
+                results.append({'success': exit_code == 0, 'output': output, 'error': errors.get(index, '')})
+            elif not outputs:
+                # The script itself did not run, e.g. the device is offline
+                results.append(dict(result, success=False))
+            elif result.get('timed_out') or result.get('cancelled'):
+                # The script was stopped before reaching this command
+                results.append(dict(result, success=False, output=''))
+            else:
+                results.append({'success': False, 'output': '', 'error': BATCH_NOT_EXECUTED})
+        return results
+
+    @staticmethod
+    def _execute_device_script(serial, script, timeout=None):
+        """
+        Run a multi-line script in the device shell with the configured backend.
+        """
+        try:
+            if Shell.backend in ('session', 'native'):
+                if is_cancelled(serial):
+                    return cancelled_result(serial)
+                timeout = effective_timeout((timeout if timeout is not None else Shell.command_timeout) or None)
+                if timeout is not None and timeout <= 0:
+                    return timed_out_result(0)
+                if Shell.backend == 'session':
+                    return Shell.report_cancelled(serial, Shell.session_pool().run(serial, script, timeout=timeout))
+                return Shell.report_cancelled(serial, Shell._native_shell(serial, script, timeout))
+        except (AdbError, OSError) as e:
+            return {'success': False, 'output': '', 'error': str(e)}
+        target = f"adb -s {serial} shell" if serial else "adb shell"
+        return Shell._execute_command(f"{target} {shlex.quote(script)}", timeout=timeout)
+
+    @staticmethod
+    def start_process(command):
+        """
+        Start a long-running command with its stdout (and stderr) readable line by line.
+        :param command: Command to be executed.
+        :return: The subprocess.Popen object.
+        """
+        command = with_serial(command, current_serial())
+        if Shell.backend == 'simulator':
+            return Shell.simulator.start_process(command)
+        # A new session so Shell.kill_process can stop the whole pipeline
+        return subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+
+    @staticmethod
+    def stream(command, timeout=None):
+        """
+        Start a command and read its output line by line as it arrives, see CommandStream.
+        :param command: Command to be executed, e.g. a follow-mode `journalctl -f`.
+        :param timeout: Seconds the stream may stay open, None for no limit besides an enclosing deadline.
+        :return: A started CommandStream.
+        """
+        return CommandStream(command, timeout).start()
+
+    @staticmethod
+    def parse_device_command(command):
+        """
+        Split an `adb [-s <serial>] shell <command> [| <host command>]` string into its parts.
+        As with adb, the host shell removes the quotes of the device command and adb joins its
+        words with spaces. A pipe outside quotes belongs to the host: it is returned separately
+        so the session and native backends can apply it to the output on the host.
+        :param command: Full host-side command string.
+        :return: A (serial, device_command, host_pipe) tuple with host_pipe None without a pipe, or None
+                 if this is not an adb shell command or uses other host operators (redirections, ';', '&').
+        """
+        match = ADB_SHELL_PATTERN.match(command.strip())
+        if not match:
+            return None
+        device_part, operator, host_pipe = split_host_command(match.group('command'))
+        if operator not in (None, '|'):
+            return None
+        try:
+            words = shlex.split(device_part)
+        except ValueError:
+            return None
+        if not words:
+            return None
+        return match.group('serial'), ' '.join(words), host_pipe
+
+    @staticmethod
+    def pipe_on_host(result, host_pipe, timeout=None):
+        """
+        Feed the output of a device command through the host side of its pipeline.
+        :param result: Result dictionary of the device command.
+        :param host_pipe: Host command, e.g. `grep flags`.
+        :param timeout: Seconds the host command may run, None for no limit.
+        :return: The result of the pipeline, whose exit code is the host command's as in a shell.
+        """
+        if host_pipe is None or result.get('timed_out') or result.get('cancelled'):
+            return result
+        try:
+            process = subprocess.run(host_pipe, shell=True, input=result['output'].encode(), capture_output=True,
+                                     timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return timed_out_result(timeout, error=result['error'])
+        return {
+            'success': process.returncode == 0,
+            'output': process.stdout.decode(errors='replace'),
+            'error': result['error'] + process.stderr.decode(errors='replace')
+        }
+
+    @staticmethod
+    def _native_shell(serial, command, timeout=None):
+        """
+        Run a device command over the native adb client. The connection is tracked like a
+        process, so Shell.cancel_device stops the command by shutting the connection down.
+        """
+        connection = NativeConnection()
+        Shell._track(serial, connection)
+        try:
+            return Shell.native_client().shell(serial, command, timeout=timeout, on_connect=connection.attach)
+        finally:
+            Shell._untrack(serial, connection)
+
+    @staticmethod
+    def _execute_native(command, timeout=None):
+        """
+        Run an adb command through the native adb server client.
+        :param command: Full host-side command string.
+        :param timeout: Seconds the command may run, None for no limit.
+        :return: A result dictionary, or None if the command has no native equivalent.
+        """
+        client = Shell.native_client()
+        command = command.strip()
+        try:
+            if command == ADB_DEVICES_COMMAND:
+                lines = ''.join(f"{serial}\t{state}\n" for serial, state in client.devices())
+                return {'success': True, 'output': f"List of devices attached\n{lines}\n", 'error': ''}
+
+            device_command = Shell.parse_device_command(command)
+            if device_command:
+                serial, shell_command, host_pipe = device_command
+                if shell_command.split()[0] in CONNECTION_RESET_COMMANDS:
+                    return None
+                return Shell.pipe_on_host(Shell._native_shell(serial, shell_command, timeout), host_pipe, timeout)
+
+            match = ADB_EXEC_OUT_PATTERN.match(command)
+            if match:
+                return {'success': True, 'error': '',
+                        'output': client.exec_out(match.group('serial'), match.group('command'), timeout=timeout)}
+
+            match = ADB_TRANSFER_PATTERN.match(command)
+            if match:
+                paths = shlex.split(match.group('paths'))
+                if len(paths) < 2:
+                    return None
+                sources, destination = paths[:-1], paths[-1]
+                serial = match.group('serial')
+                results = []
+                for source in sources:
+                    if match.group('direction') == 'push':
+                        results.append(client.push(serial, source, destination))
+                    else:
+                        target = destination
+                        if len(sources) > 1 or os.path.isdir(destination):
+                            target = os.path.join(destination, os.path.basename(source))
+                        results.append(client.pull(serial, source, target))
+                return {
+                    'success': all(result['success'] for result in results),
+                    'output': '\n'.join(result['output'] for result in results if result['output']),
+                    'error': '\n'.join(result['error'] for result in results if result['error'])
+                }
+        except TimeoutError:
+            return timed_out_result(timeout)
+        except (AdbError, OSError) as e:
+            return {'success': False, 'output': '', 'error': str(e)}
+        return None
+
+    @staticmethod
+    def native_client():
+        """
+        Return the process-wide native adb server client, creating it on first use.
+        """
+        if Shell._native_client is None:
+            Shell._native_client = AdbClient()
+        return Shell._native_client
+
+    @staticmethod
+    def session_pool():
+        """
+        Return the process-wide adb shell session pool, creating it on first use.
+        """
+        if Shell._session_pool is None:
+            Shell._session_pool = AdbSessionPool()
+        return Shell._session_pool
+
+    @staticmethod
+    def close_sessions():
+        """
+        Close every pooled adb shell session.
+        """
+        if Shell._session_pool is not None:
+            Shell._session_pool.close_all()
+
+
+class NativeConnection:
+    """
+    Stands in for the process of a command run over the native adb client, so
+    Shell.kill_process can stop it by shutting its server connection down.
+    """
+    def __init__(self):
+        self.sock = None
+        self.terminated = False
+
+    def attach(self, sock):
+        self.sock = sock
+        if self.terminated:
+            self.terminate()
+
+    def terminate(self):
+        self.terminated = True
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class CommandStream:
+    """
+    Output of a running command, readable line by line while the command runs.
+
+    Only the last `tail_lines` lines are kept, so memory stays bounded however much the
+    command prints. expect() returns as soon as a line matches and then stops the command,
+    which lets follow-mode commands serve as waits without polling. The process is tracked
+    per device, so Shell.cancel_device ends the stream too.
+    """
+    def __init__(self, command, timeout=None, tail_lines=200):
+        """
+        :param command: Command to be executed.
+        :param timeout: Seconds the stream may stay open, None for no limit besides an enclosing deadline.
+        :param tail_lines: Number of recent lines kept for error reports.
+        """
+        self.command = with_serial(command, current_serial())
+        self.serial = Shell.command_serial(self.command)
+        self.timeout = timeout
+        self.tail = collections.deque(maxlen=tail_lines)
+        self.lines_read = 0
+        self.process = None
+        self.timed_out = False
+        self._end = None
+        self._lines = queue.Queue(maxsize=1000)
+        self._started = False
+
+    def start(self):
+        self._started = True
+        timeout = effective_timeout(self.timeout)
+        self._end = None if timeout is None else time.monotonic() + timeout
+        if is_cancelled(self.serial):
+            self._lines.put(None)
+            return self
+        self.process = Shell.start_process(self.command)
+        Shell._track(self.serial, self.process)
+        reader = threading.Thread(target=self._read, name='command-stream')
+        reader.daemon = True
+        reader.start()
+        return self
+
+    def _read(self):
+        for raw_line in iter(self.process.stdout.readline, b''):
+            # Blocks while the consumer is behind, which in turn pauses the command
+            self._lines.put(raw_line.decode(errors='replace').rstrip('\n'))
+        self._lines.put(None)
+
+    def readline(self, end=None):
+        """
+        Wait for the next output line.
+        :param end: Optional time.monotonic() deadline, earlier than the stream's own.
+        :return: The line without its newline, or None once the output ended or the deadline passed.
+        """
+        ends = [value for value in (end, self._end) if value is not None]
+        try:
+            line = self._lines.get(timeout=max(min(ends) - time.monotonic(), 0) if ends else None)
+        except queue.Empty:
+            self.timed_out = True
+            return None
+        if line is None:
+            # Keep the end marker for later reads
+            self._lines.put(None)
+            return None
+        self.lines_read += 1
+        self.tail.append(line)
+        return line
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if line is None:
+                return
+            yield line
+
+    def expect(self, pattern, timeout=None, close=True):
+        """
+        Read lines until one matches a regular expression.
+        :param pattern: Regular expression string or compiled pattern, searched in every line.
+        :param timeout: Seconds to wait for the match, None to wait as long as the stream is open.
+        :param close: Flag to stop the command once the pattern matched.
+        :return: A dictionary with 'success', 'output' (the matching line) and 'error' keys,
+                 plus 'match' on success. On timeout 'timed_out' is set and 'output' holds the recent lines.
+        """
+        pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        started = time.monotonic()
+        end = None if timeout is None else started + timeout
+        self.timed_out = False
+        while True:
+            line = self.readline(end)
+            if line is None:
+                break
+            match = pattern.search(line)
+            if match:
+                if close:
+                    self.close()
+                return {'success': True, 'output': line, 'error': '', 'match': match}
+        recent = '\n'.join(self.tail)
+        if self.timed_out:
+            return timed_out_result(time.monotonic() - started, recent, f"No line matched {pattern.pattern}")
+        if is_cancelled(self.serial):
+            return cancelled_result(self.serial, recent)
+        return {'success': False, 'output': recent, 'error': f"Output ended without a line matching {pattern.pattern}"}
+
+    def close(self):
+        """
+        Stop the command and its process group.
+        """
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            Shell.kill_process(self.process)
+        Shell._untrack(self.serial, self.process)
+
+    def __enter__(self):
+        if not self._started:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
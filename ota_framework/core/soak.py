@@ -0,0 +1,107 @@
+import json
+import os
+import time
+from ota_framework.core.campaign import Campaign
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_monitor import DeviceMonitor, ONLINE
+
+# Initialize the logger for this module
+logger = CustomLogger('SoakLogger')
+
+class SoakRunner:
+    """
+    Repeat the campaign flow of one upgrade path for N iterations, unattended.
+
+    Every iteration is a Campaign of its own (results in <results_dir>/<soak_id>_iterNNN/
+    and in the history database). One JSON line per iteration is appended to
+    <results_dir>/<soak_id>.jsonl as soon as the iteration ends.
+
+    An upgrade path needs the device back on the N-1 build, so by default every
+    iteration reflashes it. A reflash is a factory reset: Wi-Fi, registration,
+    dev flags, OOBE and apps are set up again, only the product name and profile
+    stay cached. With flash=False the device state carries over instead and
+    Precon skips the preconditions the device still meets.
+    """
+    def __init__(self, serials, build_name, iterations, results_dir=None, flash=True, stop_on_failure=False,
+                 soak_id=None, **campaign_options):
+        """
+        :param serials: Device serial numbers, all run in every iteration.
+        :param build_name: Upgrade path, a build key from the [builds] section of config.ini.
+        :param iterations: Number of iterations.
+        :param flash: Flash the build at the start of every iteration, which resets the device to factory state.
+        :param stop_on_failure: Stop after the first iteration in which a device failed.
+        :param campaign_options: Further keyword arguments for every Campaign.
+        """
+        self.serials = list(serials)
+        self.build_name = build_name
+        self.iterations = iterations
+        self.results_dir = results_dir or 'results'
+        self.flash = flash
+        self.stop_on_failure = stop_on_failure
+        self.soak_id = soak_id or f"soak_{build_name}_{time.strftime('%Y%m%d_%H%M%S')}"
+        self.campaign_options = campaign_options
+        self.stream_path = os.path.join(self.results_dir, f"{self.soak_id}.jsonl")
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    @staticmethod
+    def online_serials():
+        """
+        :return: Serials of every device adb currently lists as online.
+        """
+        return sorted(serial for serial, state in DeviceMonitor.shared().states().items() if state == ONLINE)
+
+    def run_iteration(self, index):
+        """
+        Run one iteration and stream its result.
+        :return: The iteration record.
+        """
+        campaign = Campaign(self.serials, self.build_name, results_dir=self.results_dir, flash=self.flash,
+                            campaign_id=f"{self.soak_id}_iter{index:03d}", **self.campaign_options)
+        start = time.monotonic()
+        results = campaign.run()
+        record = {
+            'iteration': index,
+            'campaign_id': campaign.campaign_id,
+            'duration': round(time.monotonic() - start, 3),
+            'passed': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if not result['success']),
+            'devices': {result['serial']: {'success': result['success'], 'failed_phase': result['failed_phase'],
+                                           'error': result['error'], 'phases': result['phases']}
+                        for result in results}
+        }
+        with open(self.stream_path, 'a') as file:
+            file.write(json.dumps(record) + '\n')
+        logger.info(f"Soak {self.soak_id} iteration {index}/{self.iterations}: {record['passed']} passed, "
+                    f"{record['failed']} failed in {record['duration']} seconds")
+        return record
+
+    def run(self):
+        """
+        Run every iteration.
+        :return: A summary with the iteration records and the throughput in device iterations per hour.
+        """
+        start = time.monotonic()
+        records = []
+        for index in range(1, self.iterations + 1):
+            record = self.run_iteration(index)
+            records.append(record)
+            if record['failed'] and self.stop_on_failure:
+                logger.warning(f"Stopping soak {self.soak_id} after failed iteration {index}")
+                break
+        duration = time.monotonic() - start
+        passed = sum(record['passed'] for record in records)
+        summary = {
+            'soak_id': self.soak_id,
+            'build_name': self.build_name,
+            'iterations': len(records),
+            'device_iterations_passed': passed,
+            'device_iterations_failed': sum(record['failed'] for record in records),
+            'duration': round(duration, 3),
+            'throughput_per_hour': round(passed * 3600 / duration, 2) if duration else 0,
+            'records': records
+        }
+        with open(os.path.join(self.results_dir, f"{self.soak_id}_summary.json"), 'w') as file:
+            json.dump(summary, file, indent=2)
+        logger.info(f"Soak {self.soak_id} finished: {passed} passed device iterations, "
+                    f"{summary['throughput_per_hour']} per hour")
+        return summary
@@ -0,0 +1,174 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ota_framework.core import tracing
+from ota_framework.core.custom_logger import CustomLogger
+
+# Initialize the logger for this module
+logger = CustomLogger('StepGraphLogger')
+
+# Step resources
+READ_ONLY = 'read_only'   # only reads device state, runs alongside anything but a reboot
+USB = 'usb'               # moves bulk data over adb, one at a time so transfers don't share the bandwidth
+REBOOT = 'reboot'         # reboots the device, runs alone
+
+RESOURCES = (READ_ONLY, USB, REBOOT)
+
+
+class StepGraph:
+    """
+    Runs the steps of one device as a dependency graph.
+
+    Every step declares the steps it requires and the resources it uses. A step
+    starts as soon as all its requirements succeeded and its resources are free:
+    independent steps run concurrently, a REBOOT step runs alone and USB steps
+    run one at a time. When a step fails, the steps depending on it are skipped
+    and the failure is raised once the rest of the graph finished.
+
+    run() returns a report with per-step timings and the critical path: the
+    chain of steps, through dependencies and resource waits, that determined
+    the total duration.
+    """
+    def __init__(self, name='steps', max_parallel=4):
+        """
+        :param name: Name of the graph, used in logs and trace spans.
+        :param max_parallel: Maximum number of steps running at the same time.
+        """
+        self.name = name
+        self.max_parallel = max_parallel
+        self.steps = {}
+        self.last_report = None
+
+    def add(self, name, action, requires=(), resources=(READ_ONLY,)):
+        """
+        Add a step.
+        :param name: Unique step name.
+        :param action: Callable without arguments.
+        :param requires: Names of steps that must succeed before this one starts.
+        :param resources: Resources the step uses, from RESOURCES.
+        :return: The graph itself.
+        """
+        if name in self.steps:
+            raise ValueError(f"Step '{name}' added twice")
+        unknown = [requirement for requirement in requires if requirement not in self.steps]
+        if unknown:
+            # Requirements must be added first, which also rules out cycles
+            raise ValueError(f"Step '{name}' requires unknown steps: {', '.join(unknown)}")
+        invalid = [resource for resource in resources if resource not in RESOURCES]
+        if invalid:
+            raise ValueError(f"Step '{name}' uses unknown resources: {', '.join(invalid)}")
+        self.steps[name] = {'action': action, 'requires': tuple(requires), 'resources': frozenset(resources)}
+        return self
+
+    @staticmethod
+    def _fits(resources, running):
+        if REBOOT in resources:
+            return not running
+        busy = set().union(*running) if running else set()
+        if REBOOT in busy:
+            return False
+        return not (USB in resources and USB in busy)
+
+    def run(self):
+        """
+        Run every step.
+        :return: The report, see report(); it is also kept in last_report when a step failed.
+        :raises: The exception of the first failed step, after every runnable step finished.
+        """
+        start = time.monotonic()
+        status = {name: 'pending' for name in self.steps}
+        timings = {name: {} for name in self.steps}
+        errors = {}
+        running = {}
+        # The step whose completion let the next steps start, a requirement or a resource holder
+        last_finished = None
+
+        def execute(name):
+            action = self.steps[name]['action']
+            timings[name]['start'] = time.monotonic()
+            try:
+                with tracing.span(name, category='step', graph=self.name):
+                    action()
+            finally:
+                timings[name]['end'] = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix=self.name) as executor:
+            while True:
+                for name, step in self.steps.items():
+                    if status[name] != 'pending':
+                        continue
+                    requirements = [status[requirement] for requirement in step['requires']]
+                    if any(state in ('failed', 'skipped') for state in requirements):
+                        status[name] = 'skipped'
+                        logger.warning(f"Skipping step {name}: a required step failed")
+                        continue
+                    if any(state != 'done' for state in requirements):
+                        continue
+                    timings[name].setdefault('ready', time.monotonic())
+                    if len(running) < self.max_parallel and self._fits(step['resources'],
+                                                                       [self.steps[other]['resources']
+                                                                        for other in running.values()]):
+                        status[name] = 'running'
+                        timings[name]['after'] = last_finished
+                        # Each step runs in a copy of this context: device, deadline and parent span carry over
+                        running[executor.submit(contextvars.copy_context().run, execute, name)] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                last_finished = max((running[future] for future in finished), key=lambda name: timings[name]['end'])
+                for future in finished:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        status[name] = 'done'
+                    else:
+                        status[name] = 'failed'
+                        errors[name] = error
+                        logger.error(f"Step {name} failed: {error}")
+
+        report = self.last_report = self.report(status, timings, start, time.monotonic())
+        if errors:
+            raise next(errors[name] for name in self.steps if name in errors)
+        return report
+
+    def critical_path(self, timings):
+        """
+        Walk back from the step that finished last, always to the step whose completion let the current
+        one start: a requirement, or the step holding a resource it waited for.
+        :return: The step names of the critical path, first step first.
+        """
+        finished = [name for name in self.steps if 'end' in timings[name]]
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: timings[name]['end'])]
+        while timings[path[-1]].get('after'):
+            path.append(timings[path[-1]]['after'])
+        return path[::-1]
+
+    def report(self, status, timings, start, end):
+        """
+        Build and log the run report.
+        :return: A dictionary with 'duration', 'steps' (name -> status, start and duration in seconds from the
+                 graph start, 'waited': seconds the step was ready but held back by its resources, and 'after':
+                 the step whose completion let it start),
+                 'critical_path' and 'critical_path_duration' keys.
+        """
+        steps = {}
+        for name in self.steps:
+            timing = timings[name]
+            entry = {'status': status[name]}
+            if 'start' in timing:
+                entry.update(start=round(timing['start'] - start, 3),
+                             duration=round(timing['end'] - timing['start'], 3),
+                             waited=round(timing['start'] - timing['ready'], 3), after=timing['after'])
+            steps[name] = entry
+        path = self.critical_path(timings)
+        report = {
+            'duration': round(end - start, 3),
+            'steps': steps,
+            'critical_path': path,
+            'critical_path_duration': round(sum(steps[name]['duration'] for name in path), 3)
+        }
+        logger.info(f"{self.name} finished in {report['duration']} seconds, critical path "
+                    f"{' -> '.join(path)} ({report['critical_path_duration']} seconds)")
+        return report
@@ -0,0 +1,221 @@
+import argparse
+import collections
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Span start times are kept on the monotonic clock, this offset turns them into wall clock time
+_EPOCH_OFFSET = time.time() - time.monotonic()
+
+_current_span = contextvars.ContextVar('ota_current_span', default=None)
+_span_ids = itertools.count(1)
+
+class Span:
+    """
+    One timed unit of work: a campaign phase, an action or a single shell command.
+    The serial is inherited from the parent span unless given.
+    """
+    __slots__ = ('span_id', 'parent_id', 'name', 'category', 'serial', 'start', 'end', 'attrs', 'thread')
+
+    def __init__(self, name, category, serial=None, parent=None, start=None, attrs=None):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.category = category
+        self.serial = serial or (parent.serial if parent else None)
+        self.start = time.monotonic() if start is None else start
+        self.end = None
+        self.attrs = dict(attrs or {})
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def as_dict(self):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'category': self.category,
+            'serial': self.serial,
+            'start': round(self.start + _EPOCH_OFFSET, 6),
+            'duration': round(self.duration, 6),
+            'thread': self.thread,
+            'attrs': self.attrs
+        }
+
+
+class Tracer:
+    """
+    Collects finished spans in memory and exports them as JSON lines or in the
+    Chrome trace-event format (chrome://tracing, ui.perfetto.dev).
+    Tracing is on by default, set OTA_TRACING=0 to turn it off. Only the
+    latest `max_spans` spans are kept so long runs have bounded memory.
+    """
+    def __init__(self, enabled=True, max_spans=200000):
+        self.enabled = enabled
+        self._spans = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category='action', serial=None, **attrs):
+        """
+        Time the enclosed block as a child of the current span.
+        Exceptions are recorded in the 'error' attribute and re-raised.
+        """
+        if not self.enabled:
+            yield Span(name, category, serial)
+            return
+        span = Span(name, category, serial, parent=_current_span.get(), attrs=attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=str(e) or type(e).__name__)
+            raise
+        finally:
+            span.end = time.monotonic()
+            _current_span.reset(token)
+            self.add(span)
+
+    def record(self, name, start, end, category='action', serial=None, **attrs):
+        """
+        Add an already finished span, e.g. an OTA phase rebuilt from journal timestamps.
+        :param start: Start time on the time.monotonic() clock.
+        :param end: End time on the time.monotonic() clock.
+        """
+        if not self.enabled:
+            return None
+        span = Span(name, category, serial, parent=_current_span.get(), start=start, attrs=attrs)
+        span.end = end
+        self.add(span)
+        return span
+
+    def add(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def annotate(self, **attrs):
+        """
+        Set attributes (e.g. an exit code) on the current span, if any.
+        """
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attrs)
+
+    def spans(self, serials=None, since=None):
+        """
+        :param serials: Optional collection of device serials to keep.
+        :param since: Optional time.monotonic() value, spans started before it are left out.
+        :return: The finished spans in the order they ended.
+        """
+        with self._lock:
+            return [span for span in self._spans if (serials is None or span.serial in serials)
+                    and (since is None or span.start >= since)]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def export_jsonl(self, path, serials=None, since=None):
+        """
+        Write one JSON object per span.
+        """
+        with open(path, 'w') as file:
+            for span in self.spans(serials, since):
+                file.write(json.dumps(span.as_dict(), default=str) + '\n')
+        return path
+
+    def export_chrome_trace(self, path, serials=None, since=None):
+        """
+        Write the spans as Chrome trace 'complete' events. Every device gets its own track.
+        """
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': chrome_trace_events([span.as_dict() for span in self.spans(serials, since)]),
+                       'displayTimeUnit': 'ms'}, file, default=str)
+        return path
+
+
+def chrome_trace_events(records):
+    """
+    Convert span dictionaries (as written by export_jsonl) to Chrome trace events.
+    """
+    tracks = {}
+    events = []
+    for record in sorted(records, key=lambda record: record['start']):
+        track = record['serial'] or record['thread']
+        if track not in tracks:
+            tracks[track] = len(tracks) + 1
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tracks[track],
+                           'args': {'name': track}})
+        events.append({
+            'name': record['name'],
+            'cat': record['category'],
+            'ph': 'X',
+            'ts': int(record['start'] * 1e6),
+            'dur': int(record['duration'] * 1e6),
+            'pid': 1,
+            'tid': tracks[track],
+            'args': dict(record['attrs'], serial=record['serial'], thread=record['thread'])
+        })
+    return events
+
+def summarize(records, serial=None):
+    """
+    Aggregate span dictionaries by name to answer "where did the time go".
+    Self time excludes the time spent in child spans.
+    :return: A list of dictionaries with 'name', 'category', 'count', 'total' and 'self' seconds, largest self time first.
+    """
+    records = [record for record in records if serial is None or record['serial'] == serial]
+    child_time = {}
+    for record in records:
+        if record['parent_id'] is not None:
+            child_time[record['parent_id']] = child_time.get(record['parent_id'], 0) + record['duration']
+    totals = {}
+    for record in records:
+        entry = totals.setdefault((record['category'], record['name']),
+                                  {'name': record['name'], 'category': record['category'], 'count': 0, 'total': 0, 'self': 0})
+        entry['count'] += 1
+        entry['total'] += record['duration']
+        entry['self'] += max(record['duration'] - child_time.get(record['span_id'], 0), 0)
+    return sorted(totals.values(), key=lambda entry: entry['self'], reverse=True)
+
+def load_jsonl(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+tracer = Tracer(enabled=os.getenv('OTA_TRACING', '1') != '0')
+
+def span(name, category='action', serial=None, **attrs):
+    return tracer.span(name, category, serial, **attrs)
+
+def annotate(**attrs):
+    tracer.annotate(**attrs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a trace.jsonl file: where did the time go.")
+    parser.add_argument('trace', help="Path to a trace.jsonl file written by a campaign.")
+    parser.add_argument('--serial', default=None, help="Only count spans of this device.")
+    parser.add_argument('--top', type=int, default=20, help="Number of rows to print.")
+    parser.add_argument('--chrome', default=None, help="Also convert the trace to a Chrome trace file.")
+    args = parser.parse_args()
+
+    trace_records = load_jsonl(args.trace)
+    print(f"{'category':<10} {'name':<45} {'count':>6} {'total s':>10} {'self s':>10}")
+    for row in summarize(trace_records, args.serial)[:args.top]:
+        print(f"{row['category']:<10} {row['name'][:45]:<45} {row['count']:>6} {row['total']:>10.1f} {row['self']:>10.1f}")
+    if args.chrome:
+        with open(args.chrome, 'w') as chrome_file:
+            json.dump({'traceEvents': chrome_trace_events(
+                [record for record in trace_records if args.serial is None or record['serial'] == args.serial])},
+                chrome_file)
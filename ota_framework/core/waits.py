@@ -0,0 +1,260 @@
+import asyncio
+import threading
+import time
+from ota_framework.config.constants import SystemCommands, WiFiCommands, OTACommands
+from ota_framework.core import tracing
+from ota_framework.core.async_shell import AsyncShell
+from ota_framework.core.context import effective_timeout, is_cancelled
+from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.device_monitor import DeviceMonitor
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.parsers import parse_net_state, parse_ota_status
+from ota_framework.core.shell import Shell, CommandStream, current_serial
+
+# Initialize the logger for this module
+logger = CustomLogger('WaitsLogger')
+
+# Every finished wait is recorded here so runs can report where the waiting time went
+_wait_history = []
+_history_lock = threading.Lock()
+
+# States reported by `systemctl is-system-running` once boot has finished
+BOOT_COMPLETED_STATES = ('running', 'degraded')
+
+def _finish_wait(description, timeout, value, error, start, attempts):
+    end = time.monotonic()
+    elapsed = end - start
+    tracing.tracer.record(f"wait {description}", start, end, category='wait', attempts=attempts, success=bool(value))
+    result = {
+        'success': bool(value),
+        'output': value if value else '',
+        'error': '' if value else (error or f"Timed out after {timeout if timeout is not None else round(elapsed, 1)} "
+                                            f"seconds waiting for {description}"),
+        'elapsed': elapsed,
+        'attempts': attempts
+    }
+    record = {'description': description, 'serial': current_serial(), 'success': result['success'],
+              'elapsed': round(elapsed, 3), 'attempts': attempts}
+    with _history_lock:
+        _wait_history.append(record)
+    if result['success']:
+        logger.info(f"Wait for {description} finished in {elapsed:.1f} seconds after {attempts} attempts")
+    else:
+        logger.error(f"Wait for {description} failed after {elapsed:.1f} seconds: {result['error']}")
+    return result
+
+def wait_until(condition, timeout, description, initial_interval=0.5, max_interval=5, backoff=1.5):
+    """
+    Poll a condition until it is true or the deadline passes.
+    The polling interval starts at `initial_interval` and grows by `backoff` up to `max_interval`.
+    The wait also ends early when the enclosing context.deadline passes or the device is cancelled.
+    :param condition: Callable returning a truthy value once the wait is over. Exceptions count as not ready.
+    :param timeout: Overall deadline in seconds, None to wait until the condition holds or the
+                    enclosing context.deadline passes.
+    :param description: Name of the wait, used in logs and the wait history.
+    :return: A dictionary with 'success', 'output', 'error', 'elapsed' and 'attempts' keys.
+    """
+    start = time.monotonic()
+    limit = effective_timeout(timeout)
+    deadline = None if limit is None else start + limit
+    interval = initial_interval
+    attempts = 0
+    value, error = None, ''
+    while True:
+        if is_cancelled():
+            value, error = None, f"Cancelled while waiting for {description}"
+            break
+        attempts += 1
+        try:
+            value = condition()
+            error = ''
+        except Exception as e:
+            value, error = None, str(e)
+        if value:
+            break
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            break
+        time.sleep(interval if remaining is None else min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+    return _finish_wait(description, timeout, value, error, start, attempts)
+
+async def async_wait_until(condition, timeout, description, initial_interval=0.5, max_interval=5, backoff=1.5):
+    """
+    Coroutine counterpart of wait_until.
+    :param condition: Coroutine function returning a truthy value once the wait is over.
+    """
+    start = time.monotonic()
+    limit = effective_timeout(timeout)
+    deadline = None if limit is None else start + limit
+    interval = initial_interval
+    attempts = 0
+    value, error = None, ''
+    while True:
+        if is_cancelled():
+            value, error = None, f"Cancelled while waiting for {description}"
+            break
+        attempts += 1
+        try:
+            value = await condition()
+            error = ''
+        except Exception as e:
+            value, error = None, str(e)
+        if value:
+            break
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            break
+        await asyncio.sleep(interval if remaining is None else min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+    return _finish_wait(description, timeout, value, error, start, attempts)
+
+def wait_for_output(command, pattern, timeout, description=None):
+    """
+    Wait for a line matching `pattern` in the output of a (typically follow-mode) command,
+    without polling. The command is stopped as soon as the line shows up.
+    :param command: Command to stream, e.g. `adb shell journalctl -f -n 0`.
+    :param pattern: Regular expression searched in every output line.
+    :param timeout: Overall deadline in seconds.
+    :return: A dictionary with 'success', 'output' (the matching line), 'error', 'elapsed' and 'attempts' keys.
+    """
+    description = description or f"output matching {pattern}"
+    start = time.monotonic()
+    with CommandStream(command, timeout=timeout) as stream:
+        result = stream.expect(pattern)
+    if result['success']:
+        return _finish_wait(description, timeout, result['output'], '', start, stream.lines_read)
+    error = None if result.get('timed_out') else result['error']
+    return _finish_wait(description, timeout, None, error, start, stream.lines_read)
+
+def wait_for_journal(pattern, timeout=300):
+    """
+    Wait for a new journal line matching `pattern`. Lines logged before the call are not seen.
+    """
+    return wait_for_output(SystemCommands.JOURNAL_FOLLOW, pattern, timeout, f"journal line matching {pattern}")
+
+def get_wait_history():
+    """
+    :return: A copy of the recorded waits, oldest first.
+    """
+    with _history_lock:
+        return list(_wait_history)
+
+def clear_wait_history():
+    with _history_lock:
+        _wait_history.clear()
+
+def _device_state():
+    return Shell.execute_command(SystemCommands.DEVICE_STATE)['output'].strip()
+
+def _monitor_wait(wait, timeout, description):
+    """
+    Wait on the shared DeviceMonitor instead of polling `adb get-state`.
+    :param wait: Callable taking the monitor and a timeout, returning True once the wait is over.
+    :return: The wait result, or None when the device tracking feed is not available.
+    """
+    monitor = DeviceMonitor.shared()
+    if not monitor.connected:
+        return None
+    start = time.monotonic()
+    reached = wait(monitor, timeout)
+    if not reached and not monitor.connected:
+        return None
+    state = monitor.state()
+    return _finish_wait(description, timeout, (state or 'absent') if reached else None, None, start, 1)
+
+def wait_for_device(timeout=120):
+    """
+    Wait until adb reports the device in the 'device' state.
+    """
+    result = _monitor_wait(lambda monitor, timeout: monitor.wait_for_online(timeout=timeout), timeout, 'device')
+    return result or wait_until(lambda: _device_state() == 'device', timeout, 'device')
+
+def wait_for_device_offline(timeout=60):
+    """
+    Wait until the device drops off adb, e.g. after a reboot command.
+    """
+    result = _monitor_wait(lambda monitor, timeout: monitor.wait_for_offline(timeout=timeout), timeout, 'device offline')
+    return result or wait_until(lambda: _device_state() != 'device', timeout, 'device offline',
+                                initial_interval=0.25, max_interval=1)
+
+def wait_for_boot_completed(timeout=300):
+    """
+    Wait until the device is reachable and systemd reports boot as finished.
+    """
+    def booted():
+        result = Shell.execute_command(SystemCommands.BOOT_COMPLETED)
+        state = result['output'].strip()
+        return state if state in BOOT_COMPLETED_STATES else None
+    return wait_until(booted, timeout, 'boot completed', initial_interval=1)
+
+def reboot_marker():
+    """
+    :return: A marker to take right before issuing a reboot and pass to wait_for_reboot,
+             or None when the device tracking feed is not available.
+    """
+    monitor = DeviceMonitor.shared()
+    return monitor.mark() if monitor.connected else None
+
+def wait_for_reboot(offline_timeout=60, boot_timeout=300, since=None):
+    """
+    Wait for a reboot to take effect: the device first goes offline, then boots completely.
+    Without the offline step a check right after `reboot` can still see the old boot.
+    The device snapshot is invalidated, e.g. an OTA reboot changes the software version and boot slots.
+    :param since: Optional reboot_marker() taken before the reboot; a device that already went
+                  offline and came back since then is noticed instead of waited for.
+    """
+    offline = None
+    if since is not None:
+        offline = _monitor_wait(lambda monitor, timeout: monitor.wait_for_reconnect(since, timeout=timeout),
+                                offline_timeout, 'device reconnect')
+    if offline is None:
+        offline = wait_for_device_offline(timeout=offline_timeout)
+    if not offline['success']:
+        logger.warning("Device never went offline, checking boot state anyway.")
+    DeviceSnapshot.invalidate_device()
+    return wait_for_boot_completed(timeout=boot_timeout)
+
+def wait_for_ota_state(state, timeout=900):
+    """
+    Wait until `ace mw ota show_status` reports the given state.
+    :param state: Expected OTA state (e.g. 'REBOOT_REQUIRED').
+    """
+    def reached():
+        output = Shell.execute_command(OTACommands.SHOW_OTA_STATUS)['output']
+        return output if parse_ota_status(output).state == state else None
+    return wait_until(reached, timeout, f"OTA state {state}", initial_interval=2, max_interval=15)
+
+def wait_for_net_state(state='CONNECTED', timeout=60):
+    """
+    Wait until the Wi-Fi network state matches.
+    :param state: Expected networkState value.
+    """
+    def reached():
+        output = Shell.execute_command(WiFiCommands.VALIDATE)['output']
+        return output if parse_net_state(output) == state else None
+    return wait_until(reached, timeout, f"network state {state}")
+
+async def async_wait_for_boot_completed(timeout=300):
+    """
+    Coroutine counterpart of wait_for_boot_completed.
+    """
+    async def booted():
+        result = await AsyncShell.execute_command(SystemCommands.BOOT_COMPLETED)
+        state = result['output'].strip()
+        return state if state in BOOT_COMPLETED_STATES else None
+    return await async_wait_until(booted, timeout, 'boot completed', initial_interval=1)
+
+async def async_wait_for_reboot(offline_timeout=60, boot_timeout=300):
+    """
+    Coroutine counterpart of wait_for_reboot.
+    """
+    async def offline():
+        result = await AsyncShell.execute_command(SystemCommands.DEVICE_STATE)
+        return result['output'].strip() != 'device'
+    offline_result = await async_wait_until(offline, offline_timeout, 'device offline',
+                                            initial_interval=0.25, max_interval=1)
+    if not offline_result['success']:
+        logger.warning("Device never went offline, checking boot state anyway.")
+    DeviceSnapshot.invalidate_device()
+    return await async_wait_for_boot_completed(timeout=boot_timeout)
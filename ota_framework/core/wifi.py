@@ -1,6 +1,7 @@
-import time
 from ota_framework.config.constants import WiFiCommands
 from ota_framework.core.custom_logger import CustomLogger
+from ota_framework.core.parsers import parse_net_state, parse_scan_results
+from ota_framework.core.retry import RetryPolicy
 from ota_framework.core.shell import Shell
 
 # Initialize the logger for this module
@@ -16,47 +17,68 @@ class WiFi:
         :param password: WiFi password
         :return: A dictionary with 'success', 'output', and 'error' keys.
         """
-        commands = [
+        scan = [
             (WiFiCommands.SCAN, "Scanning for WiFi networks"),
             (WiFiCommands.GET_SCAN_RESULTS, "Getting scan results"),
+        ]
+        setup = [
             (WiFiCommands.ADD_NETWORK.format(ssid=ssid, password=password), "Adding WiFi network"),
             (WiFiCommands.GET_CONFIG, "Getting WiFi configuration"),
             (WiFiCommands.CONNECT_WIFI.format(ssid=ssid), "Connecting to WiFi"),
             (WiFiCommands.SAVE_CONFIG, "Saving WiFi configuration")
         ]
-        
-        for command, description in commands:
+
+        # The scan and the setup each go to the device in one round trip, stopping at the first failure
+        result = WiFi.run_steps(scan)
+        if not result['success']:
+            return result
+        if ssid not in [network.ssid for network in parse_scan_results(result['output'])]:
+            result = dict(result, success=False, error=f"WiFi SSID {ssid} not found in the scan results")
+            logger.error(result['error'])
+            return result
+
+        result = WiFi.run_steps(setup)
+        if not result['success']:
+            return result
+
+        return WiFi.validate_connection(ssid)
+
+    @staticmethod
+    def run_steps(steps):
+        """
+        Run (command, description) steps in one device round trip, stopping at the first failure.
+        :return: The result of the last step run.
+        """
+        results = Shell.execute_batch([command for command, _ in steps])
+        for (command, description), result in zip(steps, results):
             logger.info(description)
-            result = Shell.execute_command(command)
             if not result['success']:
                 logger.error(f"Failed at step: {description}")
                 return result
-
-        return WiFi.validate_connection(ssid)
+        return results[-1]
 
     @staticmethod
     @logger.log_decorator(level='info')
-    def validate_connection(ssid, retries=5, delay=5):
+    def validate_connection(ssid, retries=None, delay=None):
         """
         Validate if the device is connected to the WiFi network.
-        Retry the validation up to `retries` times if it fails.
+        Retries follow the 'wifi_validation' policy from config.ini.
         :param ssid: WiFi SSID
-        :param retries: Number of retry attempts
-        :param delay: Delay between retry attempts
+        :param retries: Optional override of the maximum number of attempts
+        :param delay: Optional override of the initial delay between attempts
         :return: A dictionary with 'success', 'output', and 'error' keys.
         """
-        for attempt in range(1, retries + 1):
-            logger.info(f"Validating connection to WiFi SSID: {ssid}, Attempt: {attempt}")
+        def validate():
             result = Shell.execute_command(WiFiCommands.VALIDATE)
-            if 'networkState: CONNECTED' in result['output']:
-                result['success'] = True
-                logger.info(f"Successfully connected to WiFi SSID: {ssid} on attempt {attempt}")
-                return result
-            else:
-                logger.error(f"Validation failed on attempt {attempt}. Retrying after {delay} seconds...")
-                time.sleep(delay)
-        
-        result['success'] = False
-        result['error'] = f"Failed to validate connection to WiFi SSID: {ssid} after {retries} attempts. Output: {result['output']}"
+            result['success'] = parse_net_state(result['output']) == 'CONNECTED'
+            return result
+
+        policy = RetryPolicy.for_device('wifi_validation', max_attempts=retries, initial_delay=delay)
+        result = policy.run(validate, description=f"Validating connection to WiFi SSID: {ssid}")
+        if result['success']:
+            logger.info(f"Successfully connected to WiFi SSID: {ssid} on attempt {result['attempts']}")
+            return result
+
+        result['error'] = f"Failed to validate connection to WiFi SSID: {ssid} after {result['attempts']} attempts. Output: {result['output']}"
         logger.error(result['error'])
         return result
@@ -1,3 +1,75 @@
+import os
+import sys
+import pytest
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.fake_device import FakeDeviceFarm, LatencyProfile
+from ota_framework.core.results_store import ResultsStore
+from ota_framework.core.shell import Shell, device_context
+
+# Set by run.py: the history database run that receives the timing of every test
+_results_store = ResultsStore(os.environ['OTA_RESULTS_DB']) if os.getenv('OTA_RUN_ID') else None
+
+@pytest.fixture
+def fake_adb(tmp_path):
+    """
+    Stand-in for the adb binary: `adb [-s <serial>] shell [<command>]` runs the command, or an
+    interactive shell, in a local sh. The shell has no PATH, so a host pipe that ends up on the
+    "device" (e.g. `| grep`) fails.
+    """
+    script = tmp_path / 'adb'
+    script.write_text('#!/bin/sh\n'
+                      '[ "$1" = "-s" ] && shift 2\n'
+                      'shift\n'
+                      'if [ $# -gt 0 ]; then PATH=/nonexistent exec /bin/sh -c "$*"; fi\n'
+                      'PATH=/nonexistent exec /bin/sh\n')
+    script.chmod(0o755)
+    return str(script)
+
+@pytest.fixture
+def simulated_farm():
+    """
+    Factory for a FakeDeviceFarm answering every Shell command: `simulated_farm(count, **kwargs)` takes the
+    FakeDeviceFarm.create arguments, with a fast latency by default. The simulator is removed and the device
+    snapshots are forgotten after the test.
+    """
+    farms = []
+
+    def create(count=1, latency=None, **kwargs):
+        farm = FakeDeviceFarm.create(count, latency=latency or LatencyProfile(scale=0.001), **kwargs)
+        for serial in farm.devices:
+            DeviceSnapshot.invalidate_device(serial, fields=DeviceSnapshot.FIELDS)
+        Shell.use_simulator(farm)
+        farms.append(farm)
+        return farm
+    yield create
+    Shell.use_simulator(None)
+    for farm in farms:
+        for serial in farm.devices:
+            DeviceSnapshot.invalidate_device(serial, fields=DeviceSnapshot.FIELDS)
+
+@pytest.fixture
+def simulated_device(simulated_farm):
+    """
+    The single device SIM0000 of a simulated farm, the target of every adb command of the test.
+    """
+    farm = simulated_farm()
+    with device_context('SIM0000'):
+        yield farm.devices['SIM0000']
+
+def pytest_addoption(parser):
+    parser.addoption("--pause-between-tests", action="store_true", default=False,
+                     help="Wait for Enter after every test case (interactive runs only).")
+
 def pytest_runtest_makereport(item, call):
-    if not item.config.getoption("capture"):
+    # Only pause when asked for and somebody can answer, so unattended and soak runs never block
+    if call.when == 'call' and item.config.getoption("pause_between_tests") and sys.stdin.isatty():
         input("Press Enter to continue to the next test case...")
+
+def pytest_runtest_logreport(report):
+    if _results_store and not report.skipped and (report.when == 'call' or report.failed):
+        _results_store.record_phase(os.environ['OTA_RUN_ID'], None, report.nodeid, report.duration,
+                                    report.passed, started=getattr(report, 'start', None))
+
+def pytest_sessionfinish(session, exitstatus):
+    if _results_store:
+        _results_store.close()
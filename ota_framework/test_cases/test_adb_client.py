@@ -0,0 +1,102 @@
+import threading
+import time
+import pytest
+from ota_framework.core.adb_client import AdbClient, AdbError
+from ota_framework.core.fake_adb_server import FakeAdbServer
+from ota_framework.core.context import clear_cancellation, deadline, device_context
+from ota_framework.core.shell import Shell
+
+SERIAL = 'G070VM1234567890'
+
+def fake_handler(serial, command):
+    if command == 'ace mw wifi get_net_state':
+        return 0, b'networkState: CONNECTED\n', b''
+    if command == 'false':
+        return 1, b'', b'command failed\n'
+    if command.startswith('sleep '):
+        time.sleep(float(command.split()[1]))
+        return 0, b'slept\n', b''
+    return 127, b'', f"sh: {command}: not found\n".encode()
+
+@pytest.fixture
+def server():
+    with FakeAdbServer(devices={SERIAL: 'device'}, handler=fake_handler) as fake_server:
+        yield fake_server
+
+@pytest.fixture
+def client(server):
+    return AdbClient(port=server.port, timeout=5)
+
+def test_host_services(client):
+    assert client.version() == FakeAdbServer.VERSION
+    assert client.devices() == [(SERIAL, 'device')]
+
+def test_shell_keeps_streams_and_exit_code(client):
+    result = client.shell(SERIAL, 'ace mw wifi get_net_state')
+    assert result == {'success': True, 'output': 'networkState: CONNECTED\n', 'error': ''}
+
+    result = client.shell(None, 'false')
+    assert result == {'success': False, 'output': '', 'error': 'command failed\n'}
+
+def test_unknown_device_fails(client):
+    with pytest.raises(AdbError):
+        client.shell('missing', 'true')
+
+def test_push_and_pull_roundtrip(client, server, tmp_path):
+    local = tmp_path / 'app.vpkg'
+    local.write_bytes(b'\x00vpkg' * 50000)
+    assert client.push(SERIAL, str(local), '/data/app.vpkg')['success']
+    assert server.files[(SERIAL, '/data/app.vpkg')] == local.read_bytes()
+
+    pulled = tmp_path / 'pulled.vpkg'
+    assert client.pull(SERIAL, '/data/app.vpkg', str(pulled))['success']
+    assert pulled.read_bytes() == local.read_bytes()
+    assert not client.pull(SERIAL, '/data/missing', str(pulled))['success']
+
+def test_track_devices_reports_changes(client, server):
+    updates = client.track_devices()
+    assert next(updates) == [(SERIAL, 'device')]
+    server.set_device_state(SERIAL, 'offline')
+    assert next(updates) == [(SERIAL, 'offline')]
+    updates.close()
+
+def test_shell_native_backend(client, monkeypatch):
+    monkeypatch.setattr(Shell, 'backend', 'native')
+    monkeypatch.setattr(Shell, '_native_client', client)
+    result = Shell.execute_command(f"adb -s {SERIAL} shell ace mw wifi get_net_state")
+    assert result['success'] and 'CONNECTED' in result['output']
+    assert f"{SERIAL}\tdevice" in Shell.execute_command("adb devices")['output']
+
+def test_shell_timeout_is_per_command(server):
+    # Silent commands may outlast the connection timeout
+    client = AdbClient(port=server.port, timeout=0.2)
+    assert client.shell(SERIAL, 'sleep 0.5')['output'] == 'slept\n'
+
+    start = time.monotonic()
+    result = client.shell(SERIAL, 'sleep 3', timeout=0.3)
+    assert result['timed_out'] and not result['success']
+    assert time.monotonic() - start < 2
+
+def test_native_backend_honours_deadline_and_cancel(client, monkeypatch):
+    monkeypatch.setattr(Shell, 'backend', 'native')
+    monkeypatch.setattr(Shell, '_native_client', client)
+    with deadline(0.3):
+        assert Shell.execute_command(f"adb -s {SERIAL} shell sleep 3")['timed_out']
+
+    results = []
+
+    def run():
+        with device_context(SERIAL):
+            results.append(Shell.execute_command("adb shell sleep 3"))
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    time.sleep(0.3)
+    try:
+        start = time.monotonic()
+        Shell.cancel_device(SERIAL)
+        worker.join(timeout=2)
+        assert not worker.is_alive() and time.monotonic() - start < 2
+        assert results[0]['cancelled'] and not results[0]['success']
+    finally:
+        clear_cancellation(SERIAL)
@@ -0,0 +1,63 @@
+import time
+from ota_framework.core.adb_session import AdbShellSession, AdbSessionPool
+from ota_framework.core.shell import Shell
+
+def test_session_splits_output_and_exit_codes(fake_adb):
+    session = AdbShellSession('G070VM1234', adb_path=fake_adb)
+    try:
+        assert session.run("echo 'networkState: CONNECTED'") == {'success': True,
+                                                                  'output': 'networkState: CONNECTED\n', 'error': ''}
+        process = session.process
+        result = session.run('echo partial; echo oops >&2; /bin/sh -c "exit 3"')
+        assert result == {'success': False, 'output': 'partial\n', 'error': 'oops\n'}
+        # Sentinel-like text from the command does not end its output early
+        result = session.run(f"echo {AdbShellSession.SENTINEL_PREFIX}; printf 'no newline'")
+        assert result['output'] == f"{AdbShellSession.SENTINEL_PREFIX}\nno newline"
+        assert session.process is process
+    finally:
+        session.close()
+
+def test_session_timeout_closes_and_restarts(fake_adb):
+    session = AdbShellSession(adb_path=fake_adb)
+    try:
+        start = time.monotonic()
+        result = session.run('echo started; /bin/sleep 5', timeout=0.3)
+        assert result['timed_out'] and not result['success'] and 'started' in result['output']
+        assert time.monotonic() - start < 3
+        assert session.process is None
+        assert session.run('echo back')['output'] == 'back\n'
+    finally:
+        session.close()
+
+def test_pool_reuses_one_session_per_serial(fake_adb):
+    pool = AdbSessionPool(adb_path=fake_adb)
+    try:
+        first = pool.get('A')
+        assert pool.get('A') is first and pool.get('B') is not first
+        pool.run('A', 'true')
+        process = first.process
+        pool.run('A', 'true')
+        assert first.process is process
+        pool.close('A')
+        assert not first.is_alive() and pool.get('A') is not first
+    finally:
+        pool.close_all()
+
+def test_session_backend_runs_host_pipes_on_host(fake_adb, monkeypatch):
+    monkeypatch.setattr(Shell, 'backend', 'session')
+    monkeypatch.setattr(Shell, '_session_pool', AdbSessionPool(adb_path=fake_adb))
+    try:
+        result = Shell.execute_command("adb -s A shell \"printf 'serial: 1\\ndev_flags: 0x440\\n'\" | grep flags")
+        assert result['success'] and result['output'] == 'dev_flags: 0x440\n'
+        assert not Shell.execute_command("adb -s A shell echo serial | grep flags")['success']
+        # The host shell removes the outer quotes and the device shell the inner ones
+        assert Shell.execute_command("adb -s A shell \"echo 'a  b'\"")['output'] == 'a  b\n'
+    finally:
+        Shell.close_sessions()
+
+def test_parse_device_command_splits_host_side():
+    assert Shell.parse_device_command("adb -s A shell idme print | grep flags") == ('A', 'idme print', 'grep flags')
+    assert Shell.parse_device_command("adb shell vdcm set key 'true'") == (None, 'vdcm set key true', None)
+    assert Shell.parse_device_command("adb shell 'ps | grep ota'") == (None, 'ps | grep ota', None)
+    assert Shell.parse_device_command("adb shell cat /proc/version > version.txt") is None
+    assert Shell.parse_device_command("adb push a b") is None
@@ -0,0 +1,62 @@
+import os
+import time
+from ota_framework.core import app_deploy
+from ota_framework.core.app_deploy import AppDeployer, file_digest
+from ota_framework.core.shell import device_context
+
+def test_file_digest_is_cached_by_mtime(tmp_path, monkeypatch):
+    app = tmp_path / 'SettingsSysTestApp.vpkg'
+    app.write_bytes(b'vpkg-1')
+    first = file_digest(str(app))
+
+    def no_rehash(*args):
+        raise AssertionError("unchanged file hashed again")
+    monkeypatch.setattr(app_deploy.hashlib, 'sha256', no_rehash)
+    assert file_digest(str(app)) == first
+
+    monkeypatch.undo()
+    app.write_bytes(b'vpkg-2')
+    os.utime(app, ns=(0, os.stat(app).st_mtime_ns + 10 ** 9))
+    assert file_digest(str(app)) != first
+
+def test_deploy_skips_identical_packages(simulated_farm, tmp_path):
+    apps = {}
+    for name in ('settings_app', 'carousel_app'):
+        path = tmp_path / f"{name}.vpkg"
+        path.write_bytes(name.encode() * 1000)
+        apps[name] = str(path)
+    farm = simulated_farm(2)
+    device = farm.devices['SIM0001']
+    deployer = AppDeployer(apps=apps)
+    with device_context('SIM0001'):
+        results = deployer.deploy_all()
+        assert all(result['pushed'] and result['installed'] for result in results.values())
+        assert device.installed_apps == {'com.amazon.systemtest.settings_app.main',
+                                         'com.amazon.systemtest.carousel_app.main'}
+
+        checksums = len([command for command in device.commands if 'sha256sum' in command])
+        results = deployer.deploy_all()
+        assert all(result['success'] and not result['pushed'] and not result['installed']
+                   for result in results.values())
+        assert len([command for command in device.commands if 'sha256sum' in command]) == checksums + 2
+
+        # A reflash drops the installs and the KVS but the packages stay in /data: install without pushing
+        device.flash(device.software_version)
+        while not device.is_booted():
+            time.sleep(0.01)
+        result = deployer.deploy('settings_app')
+        assert result['installed'] and not result['pushed']
+
+        # Same package id installed from another artifact: push and install the new one
+        with open(apps['carousel_app'], 'wb') as file:
+            file.write(b'carousel_app v2' * 1000)
+        result = deployer.deploy('carousel_app')
+        assert result['pushed'] and result['installed']
+        assert deployer.deploy('carousel_app')['installed'] is False
+
+        # The check follows the configured package id, not the artifact name
+        renamed = AppDeployer(apps=apps, packages={'settings_app': 'com.amazon.systemtest.settings.main'})
+        assert renamed.deploy('settings_app')['installed']
+
+        assert not deployer.deploy('missing_app')['success']
+    assert not farm.devices['SIM0000'].installed_apps
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import time
+from ota_framework.config.constants import OTACommands, WiFiConstants
+from ota_framework.core.async_actions import AsyncDeviceActions, AsyncOTA, AsyncRegistration, AsyncWiFi, run_on_devices
+from ota_framework.core.async_shell import AsyncShell
+from ota_framework.core.context import cancel_device, clear_cancellation, device_context
+from ota_framework.core.device_monitor import DeviceMonitor
+from ota_framework.core.fake_device import LatencyProfile
+from ota_framework.core.ota_journal import OTAPhase
+from ota_framework.core.retry import RetryPolicy, clear_retry_metrics, get_retry_metrics
+
+def test_async_shell_runs_plain_and_shell_commands():
+    async def run():
+        return await asyncio.gather(AsyncShell.execute_command('echo plain'),
+                                    AsyncShell.execute_command("printf 'a\\nb\\n' | grep b"),
+                                    AsyncShell.execute_command('false'))
+    plain, piped, failing = asyncio.run(run())
+    assert plain == {'success': True, 'output': 'plain\n', 'error': ''}
+    assert piped['success'] and piped['output'] == 'b\n'
+    assert not failing['success']
+
+def test_async_shell_timeout_kills_whole_pipeline(tmp_path):
+    marker = tmp_path / 'grandchild_alive'
+    start = time.monotonic()
+    result = asyncio.run(AsyncShell.execute_command(f"sh -c 'sleep 1; touch {marker}' & wait", timeout=0.2))
+    assert result['timed_out'] and not result['success']
+    assert time.monotonic() - start < 1
+    time.sleep(1.5)
+    assert not marker.exists()
+
+def test_async_shell_cancel(tmp_path):
+    marker = tmp_path / 'grandchild_alive'
+
+    async def run():
+        task = asyncio.create_task(AsyncShell.execute_command(f"sh -c 'sleep 1; touch {marker}' & wait"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        return await asyncio.gather(task, return_exceptions=True)
+    assert isinstance(asyncio.run(run())[0], asyncio.CancelledError)
+    time.sleep(1.5)
+    assert not marker.exists()
+
+    cancel_device('SIM0077')
+    try:
+        with device_context('SIM0077'):
+            assert asyncio.run(AsyncShell.execute_command('echo never'))['cancelled']
+    finally:
+        clear_cancellation('SIM0077')
+
+def test_async_actions_on_simulated_devices(simulated_farm):
+    clear_retry_metrics()
+    farm = simulated_farm(2, latency=LatencyProfile(scale=0.005))
+
+    async def validate(serial):
+        return await AsyncWiFi.validate_connection(WiFiConstants.SSID, retries=2, delay=0.01)
+    assert [result['attempts'] for result in asyncio.run(run_on_devices(list(farm.devices), validate))] == [2, 2]
+
+    async def connect(serial):
+        return await AsyncWiFi.connect(WiFiConstants.SSID, WiFiConstants.PASSWORD)
+    results = asyncio.run(run_on_devices(list(farm.devices), connect))
+    assert all(result['success'] and result['attempts'] == 1 for result in results)
+    assert all(device.connected_ssid == WiFiConstants.SSID for device in farm.devices.values())
+
+    with device_context('SIM0000'):
+        missing = asyncio.run(AsyncWiFi.connect('Office-5G', 'secret'))
+    assert not missing['success'] and 'Office-5G' not in farm.devices['SIM0000'].saved_networks
+
+    with device_context('SIM0000'):
+        registration = asyncio.run(AsyncRegistration.validate_registration('tester', retries=3, delay=0.01))
+    assert not registration['success'] and registration['attempts'] == 3
+    metrics = get_retry_metrics()
+    assert metrics['wifi_validation']['calls'] == 4 and metrics['wifi_validation']['failures'] == 2
+    assert metrics['registration_validation']['attempts'] == 3
+
+def test_async_check_device_online_follows_the_policy(simulated_device, tmp_path, monkeypatch):
+    for_device = RetryPolicy.for_device
+    monkeypatch.setattr(RetryPolicy, 'for_device', staticmethod(
+        lambda name, **overrides: for_device(name, **dict(overrides, deadline=0.3))))
+    actions = AsyncDeviceActions(logs_dir=str(tmp_path))
+    try:
+        assert asyncio.run(actions.check_device_online())
+        simulated_device.online = False
+        assert DeviceMonitor.shared().wait_for_offline('SIM0000', timeout=5)
+        start = time.monotonic()
+        assert not asyncio.run(actions.check_device_online())
+        assert time.monotonic() - start < 2
+    finally:
+        DeviceMonitor.stop_shared()
+
+def test_async_log_collection_follows_journal(simulated_farm, tmp_path):
+    device = simulated_farm(latency=LatencyProfile(scale=0.005)).devices['SIM0000']
+
+    async def collect():
+        ota = AsyncOTA(delay=0, log_folder=str(tmp_path))
+        await ota.start_log_collection()
+        device.journal("Downloading update package")
+        device.journal("Install complete, reboot required")
+        result = await ota.wait_for_installation(timeout=5)
+        await ota.stop_log_collection()
+        return ota, result
+    with device_context('SIM0000'):
+        ota, result = asyncio.run(collect())
+    assert result['success'] and result['output'] == OTAPhase.REBOOT_PENDING
+    ota.journal_monitor.thread.join(timeout=2)
+    assert not ota.journal_monitor.thread.is_alive()
+    with open(ota.log_file) as file:
+        assert 'Downloading update package' in file.read()
+
+def test_async_log_collection_stop_kills_pipeline(tmp_path, monkeypatch):
+    marker = tmp_path / 'pipeline_alive'
+    monkeypatch.setattr(OTACommands, 'OTA_LOG_COMMAND',
+                        f"sh -c 'echo ace_otad: started; sleep 1; touch {marker}' | grep --line-buffered ace_otad")
+
+    async def collect():
+        ota = AsyncOTA(delay=0, log_folder=str(tmp_path))
+        await ota.start_log_collection()
+        await asyncio.sleep(0.3)
+        await ota.stop_log_collection()
+        return ota
+    ota = asyncio.run(collect())
+    assert ota.journal_monitor.process.poll() is not None
+    time.sleep(1.5)
+    assert not marker.exists()
+    with open(os.path.join(str(tmp_path), 'default_ota_logs.txt')) as file:
+        assert 'ace_otad: started' in file.read()
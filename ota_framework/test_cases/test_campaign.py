@@ -0,0 +1,41 @@
+import json
+import os
+from ota_framework.core.campaign import Campaign
+from ota_framework.core.fake_device import LatencyProfile
+
+def run_campaign(farm, tmp_path, **kwargs):
+    campaign = Campaign(list(farm.devices), 'n_1_to_n', results_dir=str(tmp_path), flash=False, ota_wait=60,
+                        campaign_id='campaign', results_store=False, **kwargs)
+    return campaign, campaign.run()
+
+def test_campaign_reports_each_device(simulated_farm, tmp_path):
+    farm = simulated_farm(2, latency=LatencyProfile(scale=0.002))
+    farm.devices['SIM0001'].ota_fail_phase = 'VERIFYING'
+    campaign, (passed, failed) = run_campaign(farm, tmp_path)
+
+    assert passed['success'] and passed['failed_phase'] is None and not passed['error']
+    assert list(passed['phases']) == ['perform_setup', 'start_ota_process', 'wait_for_ota', 'wait_for_reboot',
+                                      'post_ota_actions']
+    assert (passed['initial_version'], passed['final_version']) == ('5076', '5077')
+    assert passed['ota_progress']['final_state'] and passed['post_ota_steps']['critical_path']
+
+    # The failing device stops at its OTA and skips the later phases
+    assert not failed['success'] and failed['failed_phase'] == 'wait_for_ota'
+    assert 'OTA failed' in failed['error'] and list(failed['phases'])[-1] == 'wait_for_ota'
+    assert failed['final_version'] is None and farm.devices['SIM0001'].software_version == '5076'
+
+    with open(os.path.join(campaign.results_dir, 'summary.json')) as file:
+        summary = json.load(file)
+    assert (summary['passed'], summary['failed']) == (1, 1)
+    assert [device['serial'] for device in summary['devices']] == ['SIM0000', 'SIM0001']
+    for result in (passed, failed):
+        with open(os.path.join(result['results_dir'], 'result.json')) as file:
+            assert json.load(file) == result
+
+def test_phase_deadline_fails_the_phase(simulated_farm, tmp_path):
+    # Connecting to wifi alone takes longer than the whole setup phase may
+    farm = simulated_farm(1, latency=LatencyProfile(scale=0.002, wifi_connect=1000))
+    _, (result,) = run_campaign(farm, tmp_path, phase_timeouts={'perform_setup': 0.3})
+    assert not result['success'] and result['failed_phase'] == 'perform_setup'
+    assert list(result['phases']) == ['perform_setup'] and result['phases']['perform_setup'] < 1.5
+    assert not [command for command in farm.devices['SIM0000'].commands if 'ota' in command]
@@ -0,0 +1,30 @@
+import threading
+import time
+from ota_framework.core import waits
+from ota_framework.core.shell import CommandStream, Shell
+
+def test_expect_returns_on_match_and_stops_command():
+    start = time.monotonic()
+    with Shell.stream("echo scanning; echo 'networkState: CONNECTED'; sleep 10") as stream:
+        result = stream.expect(r'networkState: (\w+)')
+        assert result['success'] and result['match'].group(1) == 'CONNECTED'
+        assert stream.process.poll() is not None
+    assert time.monotonic() - start < 5
+
+def test_expect_reports_end_and_timeout_with_recent_lines():
+    with CommandStream('seq 1 5000', tail_lines=3) as stream:
+        result = stream.expect('DEVICE_REGISTERED')
+    assert not result['success'] and result['output'] == '4998\n4999\n5000'
+    assert stream.lines_read == 5000
+
+    with CommandStream('echo started; sleep 10') as stream:
+        result = stream.expect('never', timeout=0.3)
+    assert result['timed_out'] and result['output'] == 'started'
+
+def test_wait_for_journal_on_simulated_device(simulated_device):
+    device = simulated_device
+    timer = threading.Timer(0.2, device.journal, args=("Install complete, reboot required",))
+    timer.start()
+    result = waits.wait_for_journal(r'reboot required', timeout=5)
+    assert result['success'] and 'ace_otad' in result['output']
+    assert not device._journal_listeners
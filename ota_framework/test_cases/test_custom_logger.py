@@ -0,0 +1,43 @@
+import os
+from ota_framework.core.context import device_context
+from ota_framework.core.custom_logger import CustomLogger, _QueueHandler
+
+def test_repeated_loggers_share_one_handler():
+    first = CustomLogger('DedupTestLogger')
+    CustomLogger('DedupTestLogger')
+    assert sum(isinstance(handler, _QueueHandler) for handler in first.logger.handlers) == 1
+
+def test_device_records_go_to_device_log(tmp_path):
+    logger = CustomLogger('DeviceFileTestLogger')
+    device_log = str(tmp_path / 'device.log')
+    CustomLogger.set_device_log_file('SIM0042', device_log)
+    result = {'success': True}
+    with device_context('SIM0042'):
+        logger.info("Result: %s", result)
+    result['success'] = False
+    logger.info("Outside any device")
+    assert CustomLogger.flush()
+    with open(device_log) as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("- INFO - [SIM0042] Result: {'success': True}")
+    assert os.path.exists(os.path.join('logs', 'project.log'))
+
+def test_structured_decorator_logs_bounded_fields(tmp_path):
+    logger = CustomLogger('StructuredTestLogger')
+    device_log = str(tmp_path / 'device.log')
+    CustomLogger.set_device_log_file('SIM0043', device_log)
+
+    @logger.log_decorator(level='info', structured=True, max_payload=10)
+    def scan():
+        return {'success': True, 'output': 'a0:b1 Guest\n' * 50, 'error': ''}
+
+    with device_context('SIM0043'):
+        scan()
+    assert CustomLogger.flush()
+    with open(device_log) as file:
+        lines = file.read().splitlines()
+    assert len(lines) == 1
+    assert 'function=test_structured_decorator_logs_bounded_fields.<locals>.scan duration=' in lines[0]
+    assert 'success=True output_size=600 output_hash=' in lines[0]
+    assert lines[0].endswith('output=a0:b1 Gues... [590 more characters]')
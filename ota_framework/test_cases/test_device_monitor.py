@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from ota_framework.core.adb_client import AdbClient
+from ota_framework.core.device_monitor import DeviceMonitor, parse_devices_output, is_listed_online
+from ota_framework.core.fake_adb_server import FakeAdbServer
+from ota_framework.core.fake_device import FakeDeviceFarm, LatencyProfile
+
+SERIAL = 'G070VM1234567890'
+OTHER = 'G070VM0987654321'
+
+@pytest.fixture
+def server():
+    with FakeAdbServer(devices={SERIAL: 'device', OTHER: 'unauthorized'}) as fake_server:
+        yield fake_server
+
+@pytest.fixture
+def monitor(server):
+    with DeviceMonitor(AdbClient(port=server.port, timeout=5), heartbeat=0.05) as device_monitor:
+        assert device_monitor.wait_connected(5)
+        yield device_monitor
+
+def test_parse_devices_output_matches_serials_exactly():
+    output = (f"* daemon started successfully\nList of devices attached\n"
+              f"{SERIAL}\tdevice\n{OTHER}\tunauthorized\nemulator-5554\toffline\n\n")
+    devices = parse_devices_output(output)
+    assert devices == [(SERIAL, 'device'), (OTHER, 'unauthorized'), ('emulator-5554', 'offline')]
+    assert is_listed_online(devices, SERIAL)
+    assert not is_listed_online(devices, OTHER)
+    assert not is_listed_online(devices, 'missing')
+    # Without a serial adb needs exactly one device
+    assert not is_listed_online(devices)
+    assert not is_listed_online(parse_devices_output("List of devices attached\n\n"))
+
+def test_state_table_follows_track_devices(monitor, server):
+    assert monitor.states() == {SERIAL: 'device', OTHER: 'unauthorized'}
+    assert monitor.is_online(SERIAL) and not monitor.is_online(OTHER)
+
+    server.set_device_state(OTHER, 'device')
+    assert monitor.wait_for_online(OTHER, timeout=5)
+    server.set_device_state(SERIAL, 'recovery')
+    assert monitor.wait_for_state(SERIAL, ('recovery',), timeout=5)
+    assert not monitor.is_online(SERIAL)
+    assert not monitor.wait_for_online(SERIAL, timeout=0.1)
+
+def test_reconnect_after_reboot(monitor, server):
+    since = monitor.mark()
+    server.set_device_state(SERIAL, None)
+    assert monitor.wait_for_offline(SERIAL, timeout=5)
+    server.set_device_state(SERIAL, 'device')
+    # The reboot already finished, the marker still reports it
+    assert monitor.wait_for_reconnect(since, SERIAL, timeout=5)
+    assert not monitor.wait_for_reconnect(monitor.mark(), SERIAL, timeout=0.1)
+
+    since = monitor.mark()
+    server.set_device_state(SERIAL, 'offline')
+    assert monitor.wait_for_state(SERIAL, ('offline',), timeout=5)
+    server.set_device_state(SERIAL, 'device')
+    assert asyncio.run(monitor.async_wait_for_reconnect(since, SERIAL, timeout=5))
+
+def test_lost_feed_is_reported(server):
+    device_monitor = DeviceMonitor(AdbClient(port=server.port, timeout=5), heartbeat=0.05, reconnect_delay=10).start()
+    assert device_monitor.wait_connected(5)
+    server.stop()
+    assert not device_monitor.wait_for_online('missing', timeout=5)
+    assert not device_monitor.connected
+    device_monitor.stop(timeout=0)
+
+def test_simulator_farm_feed():
+    farm = FakeDeviceFarm.create(2, LatencyProfile(0.01))
+    with DeviceMonitor(farm, heartbeat=0.05) as device_monitor:
+        assert device_monitor.wait_connected(5)
+        since = device_monitor.mark()
+        farm.device('SIM0001').reboot()
+        assert device_monitor.wait_for_reconnect(since, 'SIM0001', timeout=5)
+        assert device_monitor.is_online('SIM0000')
@@ -0,0 +1,92 @@
+import time
+import pytest
+from ota_framework.config.constants import Profiles, SystemCommands
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.shell import Shell, with_serial
+
+@pytest.fixture
+def batches(monkeypatch):
+    """
+    Record the device commands of every Shell.execute_batch call.
+    """
+    calls = []
+    execute_batch = Shell.execute_batch
+
+    def record(commands, *args, **kwargs):
+        calls.append(list(commands))
+        return execute_batch(commands, *args, **kwargs)
+    monkeypatch.setattr(Shell, 'execute_batch', record)
+    return calls
+
+def test_get_refreshes_only_the_requested_field(simulated_farm, batches):
+    simulated_farm()
+    snapshot = DeviceSnapshot('SIM0000')
+    assert snapshot.get('software_version') == '5076'
+    assert batches == [[with_serial(SystemCommands.SHOW_OS_RELEASE, 'SIM0000')]]
+    assert snapshot.get('software_version') == '5076' and len(batches) == 1
+    assert not snapshot.is_fresh('net_state')
+
+    # The profile comes with the product name query
+    assert snapshot.get('profile') == Profiles.MULTIMODAL and snapshot.product_name == 'galileo'
+    assert len(batches) == 2 and len(batches[1]) == 1
+
+def test_fields_expire_after_their_ttl(simulated_farm, batches):
+    device = simulated_farm().devices['SIM0000']
+    snapshot = DeviceSnapshot('SIM0000', ttls={'net_state': 0.05})
+    snapshot.refresh()
+    assert len(batches) == 1 and len(batches[0]) == len(DeviceSnapshot.QUERIES)
+    assert snapshot.net_state.state == 'DISCONNECTED'
+    device.connected_ssid = 'Guest'
+    assert snapshot.get('net_state').state == 'DISCONNECTED'
+    time.sleep(0.06)
+    assert not snapshot.is_fresh('net_state') and snapshot.is_fresh('dev_flags')
+    assert snapshot.is_fresh('product_name')
+    assert snapshot.get('net_state') == ('CONNECTED', 'Guest') and len(batches[1]) == 1
+
+def test_invalidate_device(simulated_farm):
+    simulated_farm()
+    snapshot = DeviceSnapshot.for_device('SIM0000')
+    assert DeviceSnapshot.for_device('SIM0000') is snapshot
+    snapshot.refresh()
+    DeviceSnapshot.invalidate_device('SIM0000', fields=['dev_flags'])
+    assert not snapshot.is_fresh('dev_flags') and snapshot.is_fresh('software_version')
+    # A reboot or flash keeps the hardware identity
+    DeviceSnapshot.invalidate_device('SIM0000')
+    assert [field for field in DeviceSnapshot.FIELDS if snapshot.is_fresh(field)] == ['product_name', 'profile']
+    DeviceSnapshot.invalidate_device('SIM0000', fields=DeviceSnapshot.FIELDS)
+    assert not any(snapshot.is_fresh(field) for field in DeviceSnapshot.FIELDS)
+    # Unknown devices are ignored
+    DeviceSnapshot.invalidate_device('SIM9999')
+
+@pytest.mark.parametrize('product_name, profile', [(Profiles.TV, Profiles.TV), ('baklava', Profiles.MULTIMODAL),
+                                                   ('unknown', None)])
+def test_profile_follows_product_name(simulated_farm, product_name, profile):
+    simulated_farm(product_name=product_name)
+    snapshot = DeviceSnapshot('SIM0000').refresh(['profile'])
+    assert snapshot.product_name == product_name and snapshot.profile == profile
+    assert snapshot.is_fresh('profile')
+
+def test_failed_refresh_forgets_the_old_values(simulated_farm):
+    device = simulated_farm(product_name=Profiles.TV).devices['SIM0000']
+    snapshot = DeviceSnapshot('SIM0000').refresh()
+    assert snapshot.is_fresh('product_name') and snapshot.profile == Profiles.TV
+
+    device.online = False
+    snapshot.refresh(['product_name', 'software_version'])
+    for field in ('product_name', 'profile', 'software_version'):
+        assert getattr(snapshot, field) is None and not snapshot.is_fresh(field)
+    # Fields that were not queried keep their values
+    assert snapshot.is_fresh('dev_flags')
+
+    device.online = True
+    snapshot.refresh(['software_version'])
+    assert not snapshot.is_fresh('profile')
+    assert snapshot.refresh(['profile']).profile == Profiles.TV
+
+def test_missing_value_is_unknown(simulated_farm):
+    device = simulated_farm().devices['SIM0000']
+    # The kvs key is not set yet: the query succeeds without a value
+    snapshot = DeviceSnapshot('SIM0000').refresh(['user_setup_complete'])
+    assert snapshot.user_setup_complete is None and not snapshot.is_fresh('user_setup_complete')
+    device.kvs['user_setup_complete'] = '1'
+    assert snapshot.get('user_setup_complete') == '1' and snapshot.is_fresh('user_setup_complete')
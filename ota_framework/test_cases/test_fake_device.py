@@ -0,0 +1,33 @@
+from ota_framework.config.constants import DeviceCommands, OTACommands, SystemCommands, WiFiCommands, WiFiConstants
+from ota_framework.core.device_snapshot import parse_software_version
+from ota_framework.core.ota_journal import OTAJournalMonitor, OTAJournalParser, OTAPhase
+from ota_framework.core.shell import Shell, device_context
+
+def test_simulator_answers_constant_commands(simulated_farm):
+    farm = simulated_farm(2)
+    with device_context('SIM0001'):
+        assert parse_software_version(Shell.execute_command(SystemCommands.SHOW_OS_RELEASE)['output']) == '5076'
+        assert 'dev_flags: 0' in Shell.execute_command(DeviceCommands.FLAG_CHECK)['output']
+        results = Shell.execute_batch([
+            WiFiCommands.ADD_NETWORK.format(ssid=WiFiConstants.SSID, password=WiFiConstants.PASSWORD),
+            WiFiCommands.CONNECT_WIFI.format(ssid=WiFiConstants.SSID),
+            WiFiCommands.VALIDATE,
+        ])
+    assert all(result['success'] for result in results)
+    assert 'networkState: CONNECTED' in results[-1]['output']
+    assert farm.devices['SIM0000'].connected_ssid is None
+    assert not Shell.execute_command('adb -s SIM0000 shell no_such_tool')['success']
+
+def test_simulated_ota_updates_version_and_slot(simulated_farm, tmp_path):
+    device = simulated_farm().devices['SIM0000']
+    parser = OTAJournalParser()
+    monitor = OTAJournalMonitor(OTACommands.OTA_LOG_COMMAND, str(tmp_path / 'ota.log'), parser)
+    try:
+        monitor.start()
+        results = Shell.execute_batch([OTACommands.FORCE_SYNC_OTA, OTACommands.START_OTA])
+        assert all(result['success'] for result in results)
+        assert parser.wait_for_phase(OTAPhase.REBOOT_PENDING, timeout=10)
+        assert device.software_version == '5077'
+        assert device.active_slot == '_b'
+    finally:
+        monitor.stop()
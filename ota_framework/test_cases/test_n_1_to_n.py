@@ -3,11 +3,12 @@ import time
 import pytest
 from ota_framework.core.custom_logger import CustomLogger
 from ota_framework.core.test_config import TestConfig 
+from ota_framework.core import waits
 
 # Initialize the logger
 logger = CustomLogger('n_1_to_n_ota', log_file_name='test_n_1_to_n.log')
 
-# Mark the test to repeat 10 times
+# For repeated unattended runs use the soak mode: python run.py n_1_to_n --soak 10
 @pytest.mark.skipif(os.getenv('DISABLE_N_1_TO_N_OTA') == '1', reason="Test case is active")
 def test_n_1_to_n_ota():
     logger.info(f"DISABLE_N_1_TO_N_OTA value: {os.getenv('DISABLE_N_1_TO_N_OTA')}")
@@ -23,7 +24,7 @@ def test_n_1_to_n_ota():
         # # Flash build
         # logger.info("Starting build flash.")
         # flash.flash_build(build_name)
-        # time.sleep(200)
+        # assert waits.wait_for_boot_completed(timeout=600)['success'], "Device did not boot after flashing"
         
         # Perform device setup prior to OTA
         # setup.perform_setup()
@@ -32,7 +33,8 @@ def test_n_1_to_n_ota():
         # logger.info("Starting OTA process.")
         # ota.start_ota_process()
         # logger.info("Waiting for OTA to download & install")
-        # time.sleep(9 * 60)
+        # assert ota.wait_for_installation(timeout=15 * 60)['success'], "OTA did not install"
+        # assert waits.wait_for_reboot()['success'], "Device did not reboot after OTA install"
         
         # Perform post OTA actions
         logger.info("Performing post OTA actions.")
@@ -0,0 +1,57 @@
+import threading
+from ota_framework.core.ota_journal import OTAJournalParser, OTAPhase
+
+JOURNAL = [
+    "Oct 18 10:00:01 galileo ace_otad[812]: forceSync requested",
+    "Oct 18 10:00:03 galileo ace_otad[812]: Download started for package 5077",
+    "Oct 18 10:02:40 galileo ace_otad[812]: Download progress 50%",
+    "Oct 18 10:04:10 galileo ace_otad[812]: Verifying package signature",
+    "Oct 18 10:04:30 galileo ace_otad[812]: Installing update to slot _b",
+    "Oct 18 10:07:55 galileo ace_otad[812]: Install complete, reboot required",
+]
+
+def test_phases_follow_journal():
+    parser = OTAJournalParser()
+    seen = []
+    parser.on_phase(lambda phase, line: seen.append(phase))
+    future = parser.phase_future(OTAPhase.REBOOT_PENDING)
+    for line in JOURNAL:
+        parser.feed(line)
+    assert seen == [OTAPhase.SYNCED, OTAPhase.DOWNLOADING, OTAPhase.VERIFYING,
+                    OTAPhase.INSTALLING, OTAPhase.REBOOT_PENDING]
+    assert future.result(timeout=0) == OTAPhase.REBOOT_PENDING
+    assert parser.wait_for_phase(OTAPhase.INSTALLING, timeout=0)
+
+def test_phases_never_move_backwards():
+    parser = OTAJournalParser()
+    parser.feed(JOURNAL[4])
+    assert parser.feed(JOURNAL[1]) is None
+    assert parser.phase == OTAPhase.INSTALLING
+
+def test_failure_is_final_and_fails_waiters():
+    parser = OTAJournalParser()
+    future = parser.phase_future(OTAPhase.REBOOT_PENDING)
+    parser.feed(JOURNAL[1])
+    parser.feed("Oct 18 10:03:00 galileo ace_otad[812]: Download failed, error code: 7")
+    assert parser.phase == OTAPhase.FAILED
+    assert not parser.wait_for_phase(OTAPhase.REBOOT_PENDING, timeout=0)
+    assert future.exception(timeout=0) is not None
+    assert parser.feed(JOURNAL[5]) is None
+
+def test_futures_settle_once_under_concurrent_feeding():
+    for _ in range(20):
+        parser = OTAJournalParser()
+        futures = []
+        cancelled = parser.phase_future(OTAPhase.DONE)
+        cancelled.cancel()
+
+        def request():
+            for _ in range(50):
+                futures.append(parser.phase_future(OTAPhase.DOWNLOADING))
+        requester = threading.Thread(target=request)
+        requester.start()
+        for line in JOURNAL:
+            parser.feed(line)
+        requester.join()
+        assert all(future.result(timeout=0) for future in futures)
+        assert not parser._futures
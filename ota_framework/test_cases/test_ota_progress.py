@@ -0,0 +1,68 @@
+import json
+import math
+import time
+from ota_framework.config.constants import OTACommands
+from ota_framework.core.fake_device import LatencyProfile
+from ota_framework.core.ota_progress import OTAProgressMonitor
+from ota_framework.core.shell import Shell, device_context
+
+def test_progress_monitor_follows_download_and_install(simulated_farm, tmp_path):
+    farm = simulated_farm(2, latency=LatencyProfile(scale=0.002))
+    farm.devices['SIM0001'].ota_fail_phase = 'VERIFYING'
+    monitors = {}
+    for serial in farm.devices:
+        with device_context(serial):
+            Shell.execute_batch([OTACommands.FORCE_SYNC_OTA, OTACommands.START_OTA])
+            monitors[serial] = OTAProgressMonitor(output_file=str(tmp_path / f"{serial}.jsonl"),
+                                                  min_interval=0.02, max_interval=0.1).start()
+    assert all(monitor.wait(10) for monitor in monitors.values())
+
+    summary = monitors['SIM0000'].summary()
+    assert summary['final_state'] == 'REBOOT_REQUIRED' and summary['error_code'] == 0
+    assert {'DOWNLOADING', 'INSTALLING'} <= set(summary['phase_durations'])
+    assert summary['average_throughput'] > 0 and summary['peak_throughput'] > 0
+    assert any(sample['eta'] is not None for sample in monitors['SIM0000'].samples)
+    with open(tmp_path / 'SIM0000.jsonl') as file:
+        lines = [json.loads(line) for line in file]
+    assert len(lines) == summary['samples'] and lines[-1]['serial'] == 'SIM0000'
+    # Adaptive polling: far fewer polls than the run time divided by min_interval
+    assert summary['polls'] < 100
+
+    failed = monitors['SIM0001'].summary()
+    assert failed['final_state'] == 'FAILED' and failed['error_code'] == 7
+
+    # No progress while downloading: reported as stalled
+    device = farm.devices['SIM0000']
+    device.ota_state = 'DOWNLOADING'
+    with device_context('SIM0000'):
+        monitor = OTAProgressMonitor(stall_timeout=0.05)
+        monitor.poll()
+        time.sleep(0.06)
+        assert not monitor.poll()[1]
+    assert monitor.stalled
+
+    # Installing reports no bytes, only its time budget counts
+    device.ota_state = 'INSTALLING'
+    with device_context('SIM0000'):
+        monitor = OTAProgressMonitor(stall_timeout=0.05, state_timeouts={'INSTALLING': 0.2})
+        monitor.poll()
+        time.sleep(0.06)
+        monitor.poll()
+        assert not monitor.stalled
+        time.sleep(0.15)
+        monitor.poll()
+    assert monitor.stalled
+
+def test_normal_ota_is_not_reported_as_stalled(simulated_farm):
+    # Real proportions at 1/500 speed: the install takes longer than the download stall timeout
+    scale = 0.002
+    simulated_farm(latency=LatencyProfile(scale=scale))
+    with device_context('SIM0000'):
+        Shell.execute_batch([OTACommands.FORCE_SYNC_OTA, OTACommands.START_OTA])
+        monitor = OTAProgressMonitor(min_interval=0.02, max_interval=0.1, stall_timeout=120 * scale,
+                                     state_timeouts={'VERIFYING': 300 * scale, 'INSTALLING': 900 * scale}).start()
+        assert monitor.wait(10)
+    summary = monitor.summary()
+    assert summary['final_state'] == 'REBOOT_REQUIRED' and not summary['stalled']
+    assert summary['phase_durations']['INSTALLING'] > 120 * scale
+    assert all(math.copysign(1, duration) > 0 for duration in summary['phase_durations'].values())
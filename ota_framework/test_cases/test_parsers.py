@@ -0,0 +1,67 @@
+import random
+import time
+from ota_framework.core import parsers
+from ota_framework.core.parsers import (parse_software_version, parse_product_name, parse_dev_flags,
+                                        parse_dev_flags_value, parse_boot_slots, parse_net_status, parse_registration,
+                                        parse_scan_results, parse_ota_status, parse_devconf, BootSlot, OTAStatus)
+
+SAMPLES = {
+    parse_software_version: "'com.amazon.devconf/system/device-info/software-version' = '5076'\n",
+    parse_product_name: "PRODUCT_NAME=galileo\nDEVICE_TYPE=A1EXAMPLE\nDEVICE_SERIAL_NUMBER=SIM0000\n",
+    parse_dev_flags: "serial: SIM0000\nproductid: galileo\ndev_flags: 0x440\nmac_addr: 00:11:22:33:44:55\n",
+    parse_boot_slots: "Slot Bootable Successful Active\n_a Yes Yes No\n_b Yes Yes Yes\n",
+    parse_net_status: "networkState: CONNECTED\nssid: Guest\n",
+    parse_registration: "DEVICE_REGISTERED user=acs-qa\n",
+    parse_scan_results: ("bssid / frequency / signal level / flags / ssid\n"
+                         "a0:b1:c2:d3:e4:f6  2437  -60  [WPA2-PSK-CCMP][ESS]  Lab 2G\n"
+                         "a0:b1:c2:d3:e4:f5  5180  -45  [WPA2-PSK-CCMP][ESS]  Guest\n"),
+    parse_ota_status: "state: DOWNLOADING\ntargetVersion: 5077\nbytesDownloaded: 1048576\ntotalBytes: 734003200\n"
+                      "errorCode: 0\n",
+}
+
+def test_parsers_return_typed_records():
+    assert parse_software_version(SAMPLES[parse_software_version]) == '5076'
+    assert parse_product_name(SAMPLES[parse_product_name]) == 'galileo'
+    assert parse_dev_flags_value(SAMPLES[parse_dev_flags]) == 0x440
+    assert parse_boot_slots(SAMPLES[parse_boot_slots])['_b'] == BootSlot('_b', 'Yes', 'Yes', 'Yes')
+    assert parse_net_status(SAMPLES[parse_net_status]) == ('CONNECTED', 'Guest')
+    assert parse_registration(SAMPLES[parse_registration]) == 'DEVICE_REGISTERED'
+    scan = parse_scan_results(SAMPLES[parse_scan_results])
+    assert [(result.ssid, result.signal) for result in scan] == [('Guest', -45), ('Lab 2G', -60)]
+    assert parse_ota_status(SAMPLES[parse_ota_status]) == OTAStatus('DOWNLOADING', '5077', 1048576, 734003200, 0)
+    assert parse_devconf("'com.amazon.devconf/system/oobe/oobe-complete' successfully set to 'true'\n").value == 'true'
+
+def test_parsers_reject_lookalikes():
+    # A substring test for 'dev_flags: 0' accepted 0x440 as flag 0
+    assert parse_dev_flags_value("dev_flags: 0x440\n") != 0
+    assert parse_dev_flags_value("dev_flags: 0\n") == 0
+    assert parse_dev_flags_value("dev_flags: zero\n") is None
+    assert parse_boot_slots("Slot Bootable Successful Active\n_a Yes\n_b Yes Yes Yes\n") == {
+        '_b': BootSlot('_b', 'Yes', 'Yes', 'Yes')}
+    assert parse_software_version("'some/other/key' = '5076'\n") is None
+    assert parse_ota_status("state: IDLE\nbytesDownloaded: many\n") == OTAStatus('IDLE', None, None, None, None)
+    assert parse_net_status("error: timeout\n") == (None, None)
+
+def test_parsers_survive_fuzzed_output():
+    rng = random.Random(2024)
+    tokens = ['dev_flags', ':', '=', "'", '0x', '440', '_a', '_b', 'Yes', 'No', 'PRODUCT_NAME', 'state',
+              'networkState', 'DEVICE_', 'a0:b1:c2:d3:e4:f5', '-45', '\n', ' ', '\t', '\x00', 'é', '[ESS]']
+    outputs = [''.join(rng.choice(tokens) for _ in range(rng.randint(0, 40))) for _ in range(2000)]
+    for sample in SAMPLES.values():
+        for _ in range(200):
+            cut = rng.randint(0, len(sample))
+            outputs.append(sample[:cut] + rng.choice(tokens) + sample[cut + 1:])
+    for parser in list(SAMPLES) + [parse_dev_flags_value, parse_devconf]:
+        for output in outputs:
+            parser(output)
+
+def test_parsers_are_fast():
+    start = time.perf_counter()
+    for _ in range(2000):
+        for parser, sample in SAMPLES.items():
+            parser(sample)
+    elapsed = time.perf_counter() - start
+    # 16000 command outputs; a generous bound that still catches a pathological grammar
+    assert elapsed < 2, elapsed
+    assert all(isinstance(value, type(parsers.SCAN_ROW_PATTERN)) for name, value in vars(parsers).items()
+               if name.endswith('_PATTERN'))
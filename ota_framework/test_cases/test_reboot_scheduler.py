@@ -0,0 +1,22 @@
+from ota_framework.core.device_actions import DeviceActions
+from ota_framework.core.flags import Flags
+from ota_framework.core.reboot_scheduler import RebootScheduler
+
+def test_staged_steps_share_one_reboot(simulated_device, tmp_path):
+    device = simulated_device
+    scheduler = RebootScheduler()
+    assert Flags.set_flag_440(scheduler=scheduler)['success']
+    assert DeviceActions(logs_dir=str(tmp_path)).check_and_complete_oobe_based_on_profile(scheduler=scheduler)
+    # Nothing written or rebooted until the commit
+    assert device.boot_count == 0 and device.dev_flags == '0x0' and not device.kvs
+
+    result = scheduler.commit()
+    assert result['success'], result['error']
+    assert set(result['steps']) == {'dev_flags 0x440', 'oobe'}
+    assert device.boot_count == 1
+    assert device.dev_flags == '0x440' and device.kvs['user_setup_complete'] == '1'
+    assert scheduler.commit()['steps'] == {}
+
+    # Without a scheduler a step still reboots on its own
+    assert Flags.set_flag_0()['success']
+    assert device.boot_count == 2
@@ -0,0 +1,55 @@
+import time
+from ota_framework.core.results_store import ResultsStore
+
+def device_result(serial, success=True, failed_phase=None):
+    phases = {'perform_setup': 1.5, 'start_ota_process': 0.5, 'wait_for_ota': 30.0}
+    if success:
+        phases['post_ota_actions'] = 4.0
+    return {'serial': serial, 'success': success, 'error': '' if success else 'OTA failed: error code 7',
+            'failed_phase': failed_phase, 'initial_version': '5076', 'final_version': '5077' if success else None,
+            'product_name': 'galileo', 'phases': phases}
+
+def spans(serial, start):
+    return [
+        {'name': 'wait_for_ota', 'category': 'phase', 'start': start, 'duration': 30.0, 'attrs': {}},
+        {'name': 'ota downloading', 'category': 'ota_phase', 'start': start, 'duration': 20.0, 'attrs': {}},
+        {'name': 'ota installing', 'category': 'ota_phase', 'start': start + 22, 'duration': 8.0, 'attrs': {}},
+        {'name': 'adb shell ace mw ota start', 'category': 'shell', 'start': start, 'duration': 0.2,
+         'attrs': {'command': f"adb -s {serial} shell ace mw ota start", 'success': True}},
+    ]
+
+def test_records_runs_and_answers_trends(tmp_path):
+    with ResultsStore(str(tmp_path / 'history.db'), batch_size=5) as store:
+        for index in range(3):
+            run_id = store.start_run('campaign', 'n_1_to_n', run_id=f"run{index}", started=1000 + index)
+            store.record_device(run_id, device_result('SIM0000'), spans('SIM0000', 1000 + index))
+            store.record_device(run_id, device_result('SIM0001', False, 'wait_for_ota'), spans('SIM0001', 1000))
+            store.finish_run(run_id, 40.0, passed=1, failed=1)
+
+        runs = store.recent_runs(limit=2)
+        assert [run['run_id'] for run in runs] == ['run2', 'run1']
+        assert runs[0]['status'] == 'failed' and runs[0]['passed'] == 1
+
+        trend = store.phase_trend('wait_for_ota', name='n_1_to_n', product_name='galileo')
+        assert [row['run_id'] for row in trend] == ['run0', 'run1', 'run2']
+        assert trend[0]['devices'] == 2 and trend[0]['average'] == 30.0
+
+        summary = store.ota_summary(product_name='galileo')
+        assert len(summary) == 2
+        assert {(row['to_version'], row['successes']) for row in summary} == {('5077', 3), (None, 0)}
+        assert summary[0]['download'] == 20.0
+
+        commands = store.slowest_commands('run0')
+        assert commands[0]['count'] == 2 and commands[0]['command'] == 'adb shell ace mw ota start'
+
+def test_trend_query_is_fast_on_large_history(tmp_path):
+    with ResultsStore(str(tmp_path / 'history.db'), batch_size=10000) as store:
+        for index in range(1000):
+            run_id = store.start_run('campaign', 'n_1_to_n', run_id=f"run{index:04d}", started=index)
+            store.record_device(run_id, device_result('SIM0000'))
+            store.finish_run(run_id, 40.0, passed=1, failed=0)
+        start = time.monotonic()
+        trend = store.phase_trend('wait_for_ota', name='n_1_to_n', product_name='galileo', limit=500)
+        elapsed = time.monotonic() - start
+    assert len(trend) == 500 and trend[-1]['run_id'] == 'run0999'
+    assert elapsed < 0.5
@@ -0,0 +1,61 @@
+import pytest
+from ota_framework.core import retry
+from ota_framework.core.parsers import parse_net_state
+from ota_framework.core.retry import RetryPolicy, clear_retry_metrics, get_retry_metrics
+
+def test_retries_until_success_and_records_metrics():
+    clear_retry_metrics()
+    outputs = iter(['networkState: DISCONNECTED', 'networkState: DISCONNECTED', 'networkState: CONNECTED'])
+    policy = RetryPolicy('test_policy', max_attempts=5, initial_delay=0.01, backoff=2, jitter=0)
+
+    def validate():
+        output = next(outputs)
+        return {'success': parse_net_state(output) == 'CONNECTED', 'output': output, 'error': ''}
+
+    result = policy.run(validate)
+    assert result['success'] and result['attempts'] == 3
+    metrics = get_retry_metrics()['test_policy']
+    assert metrics['calls'] == 1 and metrics['attempts'] == 3 and metrics['successes'] == 1
+    assert metrics['waited'] == pytest.approx(0.03, abs=0.001)
+
+def test_deadline_and_exceptions():
+    policy = RetryPolicy('deadline_policy', max_attempts=100, initial_delay=0.05, backoff=1, jitter=0, deadline=0.2)
+    result = policy.run(lambda: {'success': False, 'output': '', 'error': 'offline'})
+    assert not result['success'] and result['attempts'] < 10
+
+    calls = []
+    def flaky():
+        calls.append(1)
+        raise ValueError('adb: device offline')
+    with pytest.raises(ValueError):
+        RetryPolicy('raising_policy', max_attempts=3, initial_delay=0, jitter=0).run(flaky)
+    assert len(calls) == 3
+
+def test_profile_sections_override_defaults():
+    default = RetryPolicy.for_device('wifi_validation', product_name='unknown')
+    override = RetryPolicy.for_device('wifi_validation', product_name='galileo', max_attempts=2)
+    assert default.max_attempts == 8 and default.deadline == 60
+    assert override.max_attempts == 2 and override.initial_delay == default.initial_delay
+
+def test_none_in_config_means_no_limit(tmp_path, monkeypatch):
+    config = tmp_path / 'config.ini'
+    config.write_text("[retry:unbounded]\nmax_attempts = none\nmax_delay = none\ninitial_delay = 0.01\n"
+                      "backoff = none\njitter = 0\ndeadline = 0.3\n")
+    monkeypatch.setattr(retry, 'CONFIG_PATH', str(config))
+    policy = RetryPolicy.for_device('unbounded', product_name='galileo')
+    assert policy.max_attempts is None and policy.max_delay is None and policy.backoff == 2
+    assert policy.delay(12) == pytest.approx(0.01 * 2 ** 11)
+
+    policy.backoff = 1
+    result = policy.run(lambda: {'success': False, 'output': '', 'error': 'offline'})
+    # Only the deadline ends the retries
+    assert not result['success'] and result['attempts'] > 10
+
+def test_unbounded_policy_is_rejected(tmp_path, monkeypatch):
+    config = tmp_path / 'config.ini'
+    config.write_text("[retry:forever]\nmax_attempts = none\ndeadline = none\n")
+    monkeypatch.setattr(retry, 'CONFIG_PATH', str(config))
+    with pytest.raises(ValueError):
+        RetryPolicy.for_device('forever', product_name='galileo')
+    # A deadline passed by the caller bounds it again
+    assert RetryPolicy.for_device('forever', product_name='galileo', deadline=1).max_attempts is None
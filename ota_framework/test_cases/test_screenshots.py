@@ -0,0 +1,38 @@
+import time
+from ota_framework.core.fake_device import fake_png
+from ota_framework.core.screenshots import ScreenshotCapture, frame_difference, frame_signature
+from ota_framework.core.shell import device_context
+
+def test_frame_difference():
+    assert frame_difference(frame_signature(fake_png(1)), frame_signature(fake_png(1))) == 0
+    assert frame_difference(frame_signature(fake_png(1)), frame_signature(fake_png(2))) > 0.5
+    assert frame_signature(b'not a png') is None
+
+def test_capture_streams_per_device_files(simulated_farm, tmp_path):
+    farm = simulated_farm(2)
+    captures = {}
+    for serial in farm.devices:
+        with device_context(serial):
+            captures[serial] = ScreenshotCapture(str(tmp_path))
+            first = captures[serial].capture('setup')
+            second = captures[serial].capture('setup')
+        assert first['success'] and second['success']
+        assert first['output'].endswith(f"{serial}_setup_001.png")
+        assert second['output'].endswith(f"{serial}_setup_002.png")
+        # Streamed over exec-out: nothing is left on the device
+        assert not farm.devices[serial].files
+    assert len(list(tmp_path.iterdir())) == 4
+
+    device = farm.devices['SIM0000']
+    capture = ScreenshotCapture(str(tmp_path / 'ota'), serial='SIM0000', skip_duplicates=True)
+    assert not capture.capture('ota')['duplicate']
+    assert capture.capture('ota')['duplicate']
+    device.ota_state = 'DOWNLOADING'
+    assert capture.burst('ota', 2, interval=0)[0]['output'].endswith('SIM0000_ota_002.png')
+
+    with capture.periodic(0.01, step='periodic'):
+        time.sleep(0.1)
+        device.ota_state = 'INSTALLING'
+        time.sleep(0.1)
+    assert len([path for path in capture.saved if '_periodic_' in path]) == 1
+    assert device.screenshots > 10
@@ -0,0 +1,41 @@
+import pytest
+from ota_framework.config.constants import WiFiConstants
+from ota_framework.core.device_setup import DeviceSetup
+from ota_framework.core.ota_precon import Precon
+from ota_framework.core.setup_planner import SetupPlanner
+
+def test_planner_runs_only_missing_steps(simulated_device, tmp_path):
+    device = simulated_device
+    device.dev_flags = '0x440'
+    precon = Precon(logs_dir=str(tmp_path))
+    state = dict(DeviceSetup.PRE_OTA_STATE, **DeviceSetup.POST_OTA_STATE)
+    state['dev_flags'] = '0x440'
+    planner = SetupPlanner(precon, state)
+    plan = planner.plan()
+    assert [entry['step'] for entry in plan if entry['run']] == ['wifi', 'registration', 'alexa', 'oobe']
+    assert 'SKIP dev_flags' in planner.report(plan)
+
+    result = planner.execute(plan)
+    assert result['skipped'] == ['dev_flags']
+    assert device.connected_ssid and device.registered_user and device.kvs['user_setup_complete'] == '1'
+    boots = device.boot_count
+
+    # A second run finds everything in place: nothing runs, no reboot
+    device.commands.clear()
+    result = SetupPlanner(precon, state).execute()
+    assert result['ran'] == []
+    assert device.boot_count == boots
+    assert not [command for command in device.commands if ' set ' in command or 'connect' in command]
+
+    with pytest.raises(ValueError):
+        SetupPlanner(precon, {'bluetooth': True})
+
+def test_wifi_step_runs_on_another_network(simulated_device, tmp_path):
+    device = simulated_device
+    device.saved_networks['Lab-2G'] = 'lab-password'
+    device.connected_ssid = 'Lab-2G'
+    planner = SetupPlanner(Precon(logs_dir=str(tmp_path)), {'wifi': True})
+    plan = planner.plan()
+    assert plan[0]['run'] and 'Lab-2G' in plan[0]['current']
+    assert planner.execute(plan)['ran'] == ['wifi']
+    assert device.connected_ssid == WiFiConstants.SSID
@@ -0,0 +1,63 @@
+import os
+import pytest
+from ota_framework.core.adb_session import AdbSessionPool
+from ota_framework.core.context import device_context
+from ota_framework.core.shell import BATCH_MARKER_PREFIX, BATCH_NOT_EXECUTED, Shell
+
+@pytest.fixture(params=['subprocess', 'session'])
+def device_shell(request, fake_adb, monkeypatch):
+    """
+    Run batches through the real marker script on a local sh standing in for the device.
+    """
+    if request.param == 'subprocess':
+        monkeypatch.setenv('PATH', f"{os.path.dirname(fake_adb)}:{os.environ['PATH']}")
+    else:
+        monkeypatch.setattr(Shell, 'backend', 'session')
+        monkeypatch.setattr(Shell, '_session_pool', AdbSessionPool(adb_path=fake_adb))
+    with device_context('A'):
+        yield
+    Shell.close_sessions()
+
+def test_batch_splits_output_and_exit_codes(device_shell):
+    results = Shell.execute_batch(['adb shell echo one', 'adb shell printf two', 'adb shell "echo oops >&2; false"'],
+                                  stop_on_error=False)
+    assert results == [{'success': True, 'output': 'one\n', 'error': ''},
+                       {'success': True, 'output': 'two', 'error': ''},
+                       {'success': False, 'output': '', 'error': 'oops\n'}]
+
+def test_batch_stops_on_error(device_shell):
+    results = Shell.execute_batch(['adb shell echo one', 'adb shell false', 'adb shell echo never'])
+    assert [result['success'] for result in results] == [True, False, False]
+    assert results[2] == {'success': False, 'output': '', 'error': BATCH_NOT_EXECUTED}
+
+def test_batch_keeps_marker_like_output(device_shell):
+    lookalike = f"{BATCH_MARKER_PREFIX}0:end:0:0"
+    results = Shell.execute_batch([f"adb shell echo {lookalike}", f"adb shell \"echo {BATCH_MARKER_PREFIX}; false\"",
+                                   'adb shell echo last'], stop_on_error=False)
+    assert results[0] == {'success': True, 'output': f"{lookalike}\n", 'error': ''}
+    assert results[1] == {'success': False, 'output': f"{BATCH_MARKER_PREFIX}\n", 'error': ''}
+    assert results[2]['output'] == 'last\n'
+
+def test_batch_applies_host_pipes(device_shell):
+    results = Shell.execute_batch(["adb shell \"printf 'serial: 1\\ndev_flags: 0x440\\n'\" | grep flags",
+                                   'adb shell echo ok'])
+    assert results[0]['output'] == 'dev_flags: 0x440\n' and results[1]['output'] == 'ok\n'
+
+def test_split_batch_output_without_markers():
+    marker = f"{BATCH_MARKER_PREFIX}abc"
+    offline = {'success': False, 'output': '', 'error': "error: device 'A' not found\n"}
+    assert Shell.split_batch_output(offline, 2, marker) == [offline, offline]
+
+    # Stopped while the second command ran: the first result is kept, the rest carries the timeout
+    stopped = {'success': False, 'output': f"{marker}:begin:0\nup\n\n{marker}:end:0:0\n{marker}:begin:1\npart",
+               'error': f"{marker}:begin:0\n\n{marker}:end:0\n", 'timed_out': True}
+    results = Shell.split_batch_output(stopped, 3, marker)
+    assert results[0] == {'success': True, 'output': 'up\n', 'error': ''}
+    assert results[1]['timed_out'] and results[2]['timed_out'] and not results[1]['output']
+
+def test_build_batch_script_stops_and_sleeps():
+    script = Shell.build_batch_script(['echo a', 'echo b'], [0, 2], True, 'M')
+    assert script.startswith('(\n') and script.endswith('\n)')
+    assert script.count('[ $rc -eq 0 ] || exit 0') == 2
+    assert 'sleep 2' in script and 'sleep 0' not in script
+    assert '[ $rc' not in Shell.build_batch_script(['echo a'], [0], False, 'M')
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import pytest
+from ota_framework.core.adb_client import AdbClient
+from ota_framework.core.adb_session import AdbSessionPool
+from ota_framework.core.context import clear_cancellation, deadline, device_context
+from ota_framework.core.fake_adb_server import FakeAdbServer
+from ota_framework.core.fake_device import FakeDeviceFarm, LatencyProfile
+from ota_framework.core.shell import Shell
+
+def test_timeout_kills_whole_process_group(tmp_path):
+    marker = tmp_path / 'grandchild_alive'
+    start = time.monotonic()
+    # The inner sleep is a grandchild of the shell, it must die with the group
+    result = Shell.execute_command(f"sh -c 'sleep 3; touch {marker}' & wait", timeout=0.5)
+    assert time.monotonic() - start < 3
+    assert result['timed_out'] and not result['success']
+    time.sleep(3.5)
+    assert not marker.exists()
+
+def test_deadline_caps_command_timeout():
+    with deadline(0.3):
+        result = Shell.execute_command('sleep 5', timeout=60)
+        assert result['timed_out']
+        assert Shell.execute_batch(['sleep 1', 'true'])[0]['timed_out']
+
+def test_cancel_device_stops_running_and_new_commands():
+    results = []
+
+    def run():
+        with device_context('SIM0099'):
+            results.append(Shell.execute_command('adb -s SIM0099 shell true 2>/dev/null || sleep 5'))
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    time.sleep(0.3)
+    try:
+        Shell.cancel_device('SIM0099')
+        worker.join(timeout=3)
+        assert not worker.is_alive()
+        assert results[0]['cancelled']
+        with device_context('SIM0099'):
+            assert Shell.execute_command('true')['cancelled']
+    finally:
+        clear_cancellation('SIM0099')
+
+SERIAL = 'SIM0000'
+
+@pytest.fixture(params=['subprocess', 'session', 'native', 'simulator'])
+def slow_command(request, fake_adb, monkeypatch):
+    """
+    Set up one Shell backend and yield an `adb shell` command that runs for seconds.
+    """
+    if request.param == 'subprocess':
+        monkeypatch.setenv('PATH', f"{os.path.dirname(fake_adb)}:{os.environ['PATH']}")
+        yield 'adb shell /bin/sleep 5'
+    elif request.param == 'session':
+        monkeypatch.setattr(Shell, 'backend', 'session')
+        monkeypatch.setattr(Shell, '_session_pool', AdbSessionPool(adb_path=fake_adb))
+        yield 'adb shell /bin/sleep 5'
+        Shell.close_sessions()
+    else:
+        farm = FakeDeviceFarm.create(1, latency=LatencyProfile(scale=1, wifi_scan=5))
+        if request.param == 'simulator':
+            Shell.use_simulator(farm)
+            yield 'adb shell ace mw wifi scan'
+            Shell.use_simulator(None)
+        else:
+            with FakeAdbServer(devices={SERIAL: 'device'}, handler=farm.adb_handler) as server:
+                monkeypatch.setattr(Shell, 'backend', 'native')
+                monkeypatch.setattr(Shell, '_native_client', AdbClient(port=server.port, timeout=5))
+                yield 'adb shell ace mw wifi scan'
+
+def test_every_backend_honours_deadline_and_cancel(slow_command):
+    with device_context(SERIAL):
+        start = time.monotonic()
+        with deadline(0.3):
+            result = Shell.execute_command(slow_command)
+        assert result['timed_out'] and not result['success']
+        assert time.monotonic() - start < 2
+
+    results = []
+
+    def run():
+        with device_context(SERIAL):
+            results.append(Shell.execute_command(slow_command))
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    time.sleep(0.3)
+    try:
+        start = time.monotonic()
+        Shell.cancel_device(SERIAL)
+        worker.join(timeout=3)
+        assert not worker.is_alive() and time.monotonic() - start < 2
+        assert results[0]['cancelled'] and not results[0]['success']
+        with device_context(SERIAL):
+            assert Shell.execute_command(slow_command)['cancelled']
+    finally:
+        clear_cancellation(SERIAL)
+
+def test_simulated_batch_stops_at_deadline(simulated_farm):
+    simulated_farm(latency=LatencyProfile(scale=1, wifi_scan=5))
+    with device_context(SERIAL), deadline(0.3):
+        results = Shell.execute_batch(['adb shell ace mw wifi get_net_state', 'adb shell ace mw wifi scan',
+                                       'adb shell ace mw wifi get_net_state'])
+    assert results[0]['success']
+    assert results[1]['timed_out'] and results[2]['timed_out'] and not results[2]['output']
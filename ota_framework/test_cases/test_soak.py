@@ -0,0 +1,79 @@
+import json
+import os
+from ota_framework.core.device_snapshot import DeviceSnapshot
+from ota_framework.core.fake_device import LatencyProfile
+from ota_framework.core.flash_sequence import DeviceFlasher
+from ota_framework.core.ota_precon import Precon
+from ota_framework.core.soak import SoakRunner
+
+def test_precon_skips_met_preconditions(simulated_device, tmp_path):
+    device = simulated_device
+    precon = Precon(logs_dir=str(tmp_path))
+    precon.wifi_setup()
+    precon.reg_device()
+    assert any('wifi connect' in command for command in device.commands)
+
+    device.commands.clear()
+    DeviceSnapshot.invalidate_device()
+    precon.wifi_setup()
+    precon.reg_device()
+    precon.flag()
+    assert not [command for command in device.commands if 'wifi connect' in command or 'map -u' in command
+                or 'idme dev_flags' in command]
+    assert device.boot_count == 0
+
+# Wi-Fi and registration setup, only issued for a device that is not connected and registered yet.
+# The dev flags are no example: every OTA flow sets them to 0 before and to 0x440 after the update.
+SETUP_COMMANDS = ('wifi connect', 'map -u')
+
+def test_soak_streams_every_iteration(simulated_farm, tmp_path, monkeypatch):
+    farm = simulated_farm(2, latency=LatencyProfile(scale=0.002))
+    # Stand-in for flashing the N-1 build: the simulated flashimage.py puts the device back on 5076
+    monkeypatch.setattr(DeviceFlasher, 'flash_build',
+                        lambda self, build_name, serial=None: self.flash_device(str(tmp_path / '5076'), serial=serial))
+    commands = []
+    run_iteration = SoakRunner.run_iteration
+
+    def record_commands(self, index):
+        for device in farm.devices.values():
+            device.commands.clear()
+        record = run_iteration(self, index)
+        commands.append(list(farm.devices['SIM0000'].commands))
+        return record
+    monkeypatch.setattr(SoakRunner, 'run_iteration', record_commands)
+    runner = SoakRunner(list(farm.devices), 'n_1_to_n', 2, results_dir=str(tmp_path), flash_wait=30, ota_wait=60)
+    summary = runner.run()
+    with open(runner.stream_path) as file:
+        records = [json.loads(line) for line in file]
+    assert [record['iteration'] for record in records] == [1, 2]
+    assert summary['device_iterations_passed'] == 4, records
+    assert summary['throughput_per_hour'] > 0
+
+    # The reflash resets the setup, only the product name survives it
+    assert all(any(step in command for command in commands[1]) for step in SETUP_COMMANDS)
+    assert any('device_info' in command for command in commands[0])
+    assert not any('device_info' in command for command in commands[1])
+
+    # Every iteration exports its own spans only
+    for record in records:
+        with open(os.path.join(str(tmp_path), record['campaign_id'], 'trace.jsonl')) as file:
+            spans = [json.loads(line) for line in file]
+        assert sorted(span['name'] for span in spans if span['category'] == 'device') == ['SIM0000', 'SIM0001']
+        with open(os.path.join(str(tmp_path), record['campaign_id'], 'SIM0000', 'trace.json')) as file:
+            events = json.load(file)['traceEvents']
+        assert [event['name'] for event in events if event.get('cat') == 'device'] == ['SIM0000']
+
+def test_soak_without_flash_skips_met_preconditions(simulated_farm, tmp_path):
+    device = simulated_farm(latency=LatencyProfile(scale=0.002)).devices['SIM0000']
+    commands = []
+    runner = SoakRunner(['SIM0000'], 'n_1_to_n', 2, results_dir=str(tmp_path), flash=False, ota_wait=60)
+    for index in (1, 2):
+        # Rolled back to the N-1 slot, the post-OTA check expects the update on _b
+        device.active_slot = '_a'
+        device.commands.clear()
+        assert runner.run_iteration(index)['passed'] == 1
+        commands.append(list(device.commands))
+    setup = [[command for command in iteration if any(step in command for step in SETUP_COMMANDS)]
+             for iteration in commands]
+    assert setup[0] and not setup[1]
+    assert len(commands[1]) < len(commands[0])
@@ -0,0 +1,52 @@
+import threading
+import time
+import pytest
+from ota_framework.core.step_graph import StepGraph, USB, REBOOT
+
+def test_graph_runs_independent_steps_concurrently():
+    intervals = {}
+    lock = threading.Lock()
+
+    def step(name, seconds):
+        def run():
+            start = time.monotonic()
+            time.sleep(seconds)
+            with lock:
+                intervals[name] = (start, time.monotonic())
+        return run
+
+    def overlap(first, second):
+        return intervals[first][0] < intervals[second][1] and intervals[second][0] < intervals[first][1]
+
+    graph = StepGraph('test')
+    graph.add('verify', step('verify', 0.05))
+    graph.add('boot_utility', step('boot_utility', 0.2), requires=['verify'])
+    graph.add('screenshot', step('screenshot', 0.1), requires=['verify'], resources=[USB])
+    graph.add('push_app', step('push_app', 0.1), requires=['verify'], resources=[USB])
+    graph.add('setup', step('setup', 0.1), requires=['screenshot'], resources=[REBOOT])
+    report = graph.run()
+
+    assert overlap('boot_utility', 'screenshot')
+    assert not overlap('screenshot', 'push_app')
+    assert not any(overlap('setup', other) for other in intervals if other != 'setup')
+    assert all(step['status'] == 'done' for step in report['steps'].values())
+    assert report['critical_path'][0] == 'verify' and report['critical_path'][-1] == 'setup'
+    assert report['duration'] < 0.05 + 0.1 + 0.1 + 0.1 + 0.2
+
+def test_failed_step_skips_dependents():
+    ran = []
+
+    def fail():
+        raise AssertionError("version did not change")
+
+    graph = StepGraph('test')
+    graph.add('verify', fail)
+    graph.add('screenshot', lambda: ran.append('screenshot'), requires=['verify'])
+    graph.add('independent', lambda: ran.append('independent'))
+    with pytest.raises(AssertionError, match='version did not change'):
+        graph.run()
+    assert ran == ['independent']
+    assert graph.last_report['steps']['screenshot']['status'] == 'skipped'
+
+    with pytest.raises(ValueError):
+        StepGraph().add('screenshot', print, requires=['verify'])
@@ -0,0 +1,39 @@
+import json
+from ota_framework.core.shell import Shell, device_context
+from ota_framework.core.tracing import Tracer, chrome_trace_events, summarize, tracer
+
+def test_spans_nest_and_inherit_serial():
+    local = Tracer()
+    with local.span('SIM0000', category='device', serial='SIM0000') as device:
+        with local.span('perform_setup', category='phase') as phase:
+            local.annotate(exit_code=0)
+    assert phase.parent_id == device.span_id
+    assert phase.serial == 'SIM0000'
+    assert phase.attrs == {'exit_code': 0}
+    assert [span.name for span in local.spans(['SIM0000'])] == ['perform_setup', 'SIM0000']
+
+def test_failed_span_records_error():
+    local = Tracer()
+    try:
+        with local.span('flash', category='phase'):
+            raise ValueError('no build')
+    except ValueError:
+        pass
+    assert local.spans()[0].attrs['error'] == 'no build'
+
+def test_shell_commands_are_traced_and_exported(tmp_path):
+    tracer.clear()
+    with device_context('SIM0001'), tracer.span('SIM0001', category='device', serial='SIM0001'):
+        Shell.execute_command('true')
+    records = [span.as_dict() for span in tracer.spans(['SIM0001'])]
+    command = next(record for record in records if record['category'] == 'shell')
+    assert command['name'] == 'true' and command['attrs']['exit_code'] == 0
+
+    rows = summarize(records, 'SIM0001')
+    assert {row['name'] for row in rows} == {'true', 'SIM0001'}
+    events = chrome_trace_events(records)
+    assert events[0]['ph'] == 'M' and events[0]['args']['name'] == 'SIM0001'
+    assert all(event['tid'] == 1 for event in events)
+    path = tracer.export_chrome_trace(str(tmp_path / 'trace.json'), ['SIM0001'])
+    with open(path) as file:
+        assert len(json.load(file)['traceEvents']) == 3
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from ota_framework.core import waits
+from ota_framework.core.context import cancel_device, clear_cancellation, deadline, device_context
+from ota_framework.core.device_monitor import DeviceMonitor
+from ota_framework.core.device_snapshot import DeviceSnapshot
+
+def test_wait_until_backs_off_up_to_max_interval():
+    calls = []
+
+    def condition():
+        calls.append(time.monotonic())
+        return len(calls) == 6 and 'ready'
+    result = waits.wait_until(condition, 5, 'backoff', initial_interval=0.02, max_interval=0.08, backoff=2)
+    assert result['success'] and result['output'] == 'ready' and result['attempts'] == 6
+    gaps = [later - earlier for earlier, later in zip(calls, calls[1:])]
+    for gap, expected in zip(gaps, [0.02, 0.04, 0.08, 0.08, 0.08]):
+        assert expected <= gap < expected + 0.04
+
+def test_wait_until_reports_last_error_on_timeout():
+    def condition():
+        raise Exception("device offline")
+    result = waits.wait_until(condition, 0.1, 'failing', initial_interval=0.02)
+    assert not result['success'] and result['error'] == 'device offline' and result['attempts'] > 1
+
+def test_wait_until_without_timeout():
+    calls = []
+    assert waits.wait_until(lambda: calls.append(1) or len(calls) == 3, None, 'no limit', initial_interval=0.01)['success']
+
+    start = time.monotonic()
+    with deadline(0.2):
+        result = waits.wait_until(lambda: False, None, 'never', initial_interval=0.05)
+    assert not result['success'] and 'Timed out' in result['error'] and time.monotonic() - start < 1
+
+    async def condition():
+        calls.append(1)
+        return len(calls) == 5
+    assert asyncio.run(waits.async_wait_until(condition, None, 'async no limit', initial_interval=0.01))['success']
+
+def test_wait_until_stops_on_cancel():
+    with device_context('SIM0042'):
+        threading.Timer(0.1, cancel_device, args=('SIM0042',)).start()
+        try:
+            result = waits.wait_until(lambda: False, 5, 'cancelled', initial_interval=0.02)
+        finally:
+            clear_cancellation('SIM0042')
+    assert not result['success'] and result['error'].startswith('Cancelled') and result['elapsed'] < 1
+
+def test_reboot_waits_use_the_device_monitor(simulated_device):
+    device = simulated_device
+    try:
+        monitor = DeviceMonitor.shared()
+        assert monitor.connected
+        device.reboot()
+        offline = waits.wait_for_device_offline(timeout=5)
+        assert offline['success'] and offline['attempts'] == 1
+        assert waits.wait_for_device(timeout=5)['success']
+
+        # The reboot finished before the wait started, the marker still reports it
+        snapshot = DeviceSnapshot.for_device().refresh()
+        since = waits.reboot_marker()
+        device.reboot()
+        while device.boot_count < 2 or not device.is_booted():
+            time.sleep(0.01)
+        start = time.monotonic()
+        result = waits.wait_for_reboot(offline_timeout=5, since=since)
+        assert result['success'] and time.monotonic() - start < 2
+        assert not snapshot.is_fresh('software_version') and snapshot.is_fresh('product_name')
+        history = [record['description'] for record in waits.get_wait_history()[-2:]]
+        assert history == ['device reconnect', 'boot completed']
+    finally:
+        DeviceMonitor.stop_shared()
+
+def test_ota_state_wait_matches_the_whole_state(simulated_device):
+    simulated_device.ota_state = 'INSTALLING'
+    assert not waits.wait_for_ota_state('INSTALL', timeout=0.3)['success']
+    assert waits.wait_for_ota_state('INSTALLING', timeout=5)['success']
@@ -0,0 +1,11 @@
+from ota_framework.config.constants import WiFiConstants
+from ota_framework.core.wifi import WiFi
+
+def test_connect_adds_only_scanned_networks(simulated_device):
+    device = simulated_device
+    result = WiFi.connect('Office-5G', 'secret')
+    assert not result['success'] and 'Office-5G not found' in result['error']
+    assert not device.saved_networks and not [command for command in device.commands if 'add_network' in command]
+
+    assert WiFi.connect(WiFiConstants.SSID, WiFiConstants.PASSWORD)['success']
+    assert device.connected_ssid == WiFiConstants.SSID
@@ -1,7 +1,9 @@
+import argparse
 import subprocess
 import os
 import time
-import sys
+from ota_framework.core.results_store import ResultsStore, default_path
+from ota_framework.core.soak import SoakRunner
 
 def run_tests(test_case_name):
     # Ensure the results directory exists
@@ -10,22 +12,68 @@ def run_tests(test_case_name):
     # Generate a unique filename based on the test case name and timestamp
     timestamp = time.strftime("%Y%m%d_%H%M%S")
     report_filename = f"results/{test_case_name}_report_{timestamp}.html"
+
+    # Record the run in the history database, conftest.py adds the per-test timings
+    database = default_path('results')
+    store = ResultsStore(database) if database else None
+    env = dict(os.environ)
+    if store:
+        run_id = store.start_run('pytest', test_case_name, report=report_filename)
+        env.update(OTA_RUN_ID=run_id, OTA_RESULTS_DB=database)
     
     # Run pytest and generate the report
+    start = time.monotonic()
     result = subprocess.run(
         ["pytest", f"--html={report_filename}", "--self-contained-html"],
-        check=True
+        env=env
     )
+
+    if store:
+        counts = store.query("SELECT SUM(success) AS passed, COUNT(*) - SUM(success) AS failed "
+                             "FROM phases WHERE run_id = ?", (run_id,))[0]
+        store.finish_run(run_id, round(time.monotonic() - start, 3), counts['passed'], counts['failed'],
+                         status='passed' if result.returncode == 0 else 'failed')
+        store.close()
     
     if result.returncode != 0:
         raise Exception("Tests failed")
     
     print(f"Report saved to {report_filename}")
 
+def run_soak(build_name, iterations, serials=None, flash=True, stop_on_failure=False):
+    """
+    Run the upgrade path `build_name` for N unattended iterations, printing every iteration as it ends.
+    :param flash: Reflash the N-1 build before every iteration. False keeps the device state between
+                  iterations, so preconditions the device still meets are skipped.
+    """
+    serials = serials or SoakRunner.online_serials()
+    if not serials:
+        raise Exception("No online devices found for the soak run")
+    runner = SoakRunner(serials, build_name, iterations, flash=flash, stop_on_failure=stop_on_failure)
+    print(f"Soak {runner.soak_id}: {iterations} iterations of {build_name} on {', '.join(serials)}, "
+          f"streaming to {runner.stream_path}")
+    summary = runner.run()
+    print(f"{summary['device_iterations_passed']} passed, {summary['device_iterations_failed']} failed, "
+          f"{summary['throughput_per_hour']} device iterations per hour")
+    if summary['device_iterations_failed']:
+        raise Exception("Soak iterations failed")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the OTA test cases, once or as an unattended soak.")
+    parser.add_argument('test_case_name', help="Test case name for the report, or the build name "
+                                               "([builds] in config.ini) of the upgrade path with --soak.")
+    parser.add_argument('--soak', type=int, default=None, metavar='N', help="Run N iterations of the upgrade path.")
+    parser.add_argument('--serials', default=None, help="Comma separated serials for --soak, default all online devices.")
+    parser.add_argument('--skip-flash', action='store_true',
+                        help="Do not flash the build before every iteration, so met preconditions are skipped.")
+    parser.add_argument('--stop-on-failure', action='store_true', help="Stop the soak after a failed iteration.")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python script_name.py <test_case_name>")
-        sys.exit(1)
-    
-    test_case_name = sys.argv[1]
-    run_tests(test_case_name)
+    args = parse_args()
+    if args.soak:
+        run_soak(args.test_case_name, args.soak,
+                 serials=[serial.strip() for serial in args.serials.split(',')] if args.serials else None,
+                 flash=not args.skip_flash, stop_on_failure=args.stop_on_failure)
+    else:
+        run_tests(args.test_case_name)